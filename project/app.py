@@ -11,14 +11,14 @@ from project.investmentAdvisorStack import InvestmentAdvisorStack
 
 app = cdk.App()
 
-# Financial Analysis stack with S3 bucket and Lambda layer
+# Financial Analysis stack with S3 bucket and Lambda layers
 financial_analysis_stack = FinancialAnalysisStack(app, "FinancialAnalysisStack")
 
 # Portfolio Architect stack with Lambda function
-portfolio_architect_stack = PortfolioArchitectStack(app, "PortfolioArchitectStack", yfinance_layer=financial_analysis_stack.yfinance_layer)
+portfolio_architect_stack = PortfolioArchitectStack(app, "PortfolioArchitectStack", yfinance_layer=financial_analysis_stack.yfinance_layer, shared_layer=financial_analysis_stack.shared_layer)
 
 # Risk Manager stack with Lambda function
-risk_manager_stack = RiskManagerStack(app, "RiskManagerStack", yfinance_layer=financial_analysis_stack.yfinance_layer)
+risk_manager_stack = RiskManagerStack(app, "RiskManagerStack", yfinance_layer=financial_analysis_stack.yfinance_layer, shared_layer=financial_analysis_stack.shared_layer)
 
 # Investment Advisor stack with Bedrock prompt
 InvestmentAdvisorStack(app, "InvestmentAdvisorStack", financial_analyst_prompt_arn= financial_analysis_stack.financial_analyst_prompt.attr_arn, financial_analyst_reflection_prompt_arn= financial_analysis_stack.financial_analyst_reflection_prompt.attr_arn, portfolio_architect_agent_id= portfolio_architect_stack.portfolio_architect_agent.attr_agent_id , risk_manager_agent_id= risk_manager_stack.risk_manager_agent.attr_agent_id, portfolio_architect_agent_alias_id= portfolio_architect_stack.portfolio_architect_agent_alias.attr_agent_alias_id ,risk_manager_agent_alias_id= risk_manager_stack.risk_manager_agent_alias.attr_agent_alias_id)
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+from botocore.exceptions import ClientError
+from catalog_pack import load_catalog_bytes, load_catalog_file
+
+
+class CatalogCache:
+    """Product catalog kept for the life of a warm container.
+
+    The catalog only changes on deploy, so it is fetched once and then revalidated
+    with a conditional GET (If-None-Match) every `revalidate_seconds`. If S3 cannot
+    be reached on a cold start, the copy bundled with the function is served instead.
+
+    `keys` and `fallback_paths` are tried in order, so a catalog pack can be
+    preferred with the JSON catalog behind it: a key that is missing or does not
+    load moves on to the next one. Products are either a CatalogPack or the
+    parsed JSON.
+    """
+
+    def __init__(self, s3, bucket_name, keys, fallback_paths, revalidate_seconds=300):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.keys = keys
+        self.fallback_paths = fallback_paths
+        self.revalidate_seconds = revalidate_seconds
+        self.products = None
+        self.key = None
+        self.etag = None
+        self.checked_at = 0.0
+        self.stats = {"hit": 0, "miss": 0, "revalidated": 0, "fallback": 0}
+
+    def get(self):
+        if self.products is not None and time.monotonic() - self.checked_at < self.revalidate_seconds:
+            return self._record("hit")
+
+        # Revalidate the object the catalog came from; otherwise look for the first one that loads
+        error = None
+        for key in [self.key] if self.etag else self.keys:
+            request = {"Bucket": self.bucket_name, "Key": key}
+            if self.etag:
+                request["IfNoneMatch"] = self.etag
+
+            try:
+                response = self.s3.get_object(**request)
+                products = load_catalog_bytes(response['Body'].read())
+            except ClientError as e:
+                status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+                if status == 304:
+                    self.checked_at = time.monotonic()
+                    return self._record("revalidated")
+                if status != 404:
+                    return self._fall_back(e)
+                error = e
+                continue
+            except ValueError as e:
+                print(f"Error loading catalog {key}: {e}")
+                error = e
+                continue
+            except Exception as e:
+                return self._fall_back(e)
+
+            self.products = products
+            self.key = key
+            self.etag = response.get('ETag')
+            self.checked_at = time.monotonic()
+            return self._record("miss")
+
+        return self._fall_back(error)
+
+    def _fall_back(self, error):
+        print(f"Error reading catalog from S3: {error}")
+        if self.products is None:
+            # Keep etag unset so the next call does a full GET instead of revalidating the bundled copy
+            self.products = self._load_bundled()
+        self.checked_at = time.monotonic()
+        return self._record("fallback")
+
+    def _load_bundled(self):
+        for path in self.fallback_paths[:-1]:
+            try:
+                return load_catalog_file(path)
+            except (OSError, ValueError) as e:
+                print(f"Error loading bundled catalog {path}: {e}")
+        return load_catalog_file(self.fallback_paths[-1])
+
+    def _record(self, outcome):
+        self.stats[outcome] += 1
+        print(f"Catalog cache {outcome}: {json.dumps(self.stats)}")
+        return self.products
+
+
+def bundled_catalog_path(file_name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+
+
+def catalog_entries(products):
+    """{ticker: description or product fields} for either a {ticker: description} map or a list of products with a "ticker" field"""
+    if isinstance(products, dict) and isinstance(products.get('financial_products'), list):
+        return {
+            product['ticker']: {key: value for key, value in product.items() if key != 'ticker'}
+            for product in products['financial_products'] if product.get('ticker')
+        }
+    if isinstance(products, dict) and 'error' not in products:
+        return {ticker: description for ticker, description in products.items() if isinstance(description, str)}
+    return {}
+
+
+def catalog_tickers(products):
+    """Tickers listed in the catalog"""
+    return list(catalog_entries(products))
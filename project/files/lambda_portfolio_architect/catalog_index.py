@@ -0,0 +1,106 @@
+import re
+from bisect import bisect_left
+import numpy as np
+
+
+WORD = re.compile(r'[a-z0-9]+')
+FILTER_FIELDS = ('type', 'risk_level')
+# Text matches in the product name weigh more than matches in its description
+TEXT_FIELDS = {'name': 2.0, 'description': 1.0}
+
+
+def tokenize(text):
+    return WORD.findall(str(text or '').lower())
+
+
+def catalog_products(products):
+    """Catalog as a list of product dicts, for either a list of products or a {ticker: description} map"""
+    if isinstance(products, dict) and isinstance(products.get('financial_products'), list):
+        return [product for product in products['financial_products'] if isinstance(product, dict)]
+    if isinstance(products, dict) and 'error' not in products:
+        return [{"ticker": ticker, "description": description} for ticker, description in products.items() if isinstance(description, str)]
+    return []
+
+
+def _postings(values):
+    # value -> sorted array of the positions of the products that have it
+    positions = {}
+    for position, value in enumerate(values):
+        for key in value:
+            positions.setdefault(key, []).append(position)
+    return {key: np.array(sorted(set(found)), dtype=np.int64) for key, found in positions.items()}
+
+
+class CatalogIndex:
+    """Posting-list index over the product catalog, built once per catalog version.
+
+    type and risk_level map each (lowercased) value to the sorted positions of
+    the products that have it, and minimum_investment is kept sorted so a
+    maximum is a single bisect. Words of the name and description map to
+    positions as well; a query word matches every indexed word it is a prefix
+    of, so "tech" finds "technology". Filters are intersected as sorted arrays,
+    so a query only ever touches the products that can match it.
+    """
+
+    def __init__(self, products):
+        self.source = products
+        self.products = catalog_products(products)
+        self.postings = {
+            field: _postings([str(product.get(field, '')).strip().lower()] for product in self.products)
+            for field in FILTER_FIELDS
+        }
+
+        investments = sorted(
+            (float(product['minimum_investment']), position) for position, product in enumerate(self.products)
+            if isinstance(product.get('minimum_investment'), (int, float))
+        )
+        self.investment_values = np.array([value for value, _ in investments], dtype=np.float64)
+        self.investment_positions = np.array([position for _, position in investments], dtype=np.int64)
+
+        self.words = {field: _postings(tokenize(product.get(field)) for product in self.products) for field in TEXT_FIELDS}
+        self.vocabulary = sorted(set().union(*(words.keys() for words in self.words.values())))
+
+    @classmethod
+    def from_parts(cls, source, products, postings, investment_values, investment_positions, words, vocabulary):
+        """Index over prebuilt parts (see catalog_pack), without rebuilding them from the products"""
+        index = cls.__new__(cls)
+        index.source, index.products, index.postings = source, products, postings
+        index.investment_values, index.investment_positions = investment_values, investment_positions
+        index.words, index.vocabulary = words, vocabulary
+        return index
+
+    def _matching(self, field, values):
+        found = [self.postings[field][value] for value in values if value in self.postings[field]]
+        return np.unique(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+    def _prefix_matches(self, prefix, field):
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + '\uffff')
+        found = [self.words[field][word] for word in self.vocabulary[start:end] if word in self.words[field]]
+        return np.unique(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+    def search(self, types=None, risk_levels=None, max_minimum_investment=None, text=None, top_k=20, offset=0):
+        """(page of matching products, number of matches): top_k products from offset, best text matches first, then catalog order"""
+        candidates = None
+        for field, values in (('type', types), ('risk_level', risk_levels)):
+            if values:
+                matching = self._matching(field, [str(value).strip().lower() for value in values])
+                candidates = matching if candidates is None else np.intersect1d(candidates, matching, assume_unique=True)
+        if candidates is None:
+            candidates = np.arange(len(self.products), dtype=np.int64)
+
+        if max_minimum_investment is not None:
+            affordable = np.zeros(len(self.products), dtype=bool)
+            affordable[self.investment_positions[:np.searchsorted(self.investment_values, float(max_minimum_investment), side='right')]] = True
+            candidates = candidates[affordable[candidates]]
+
+        scores = np.zeros(len(candidates))
+        for word in tokenize(text):
+            hits = {field: np.isin(candidates, self._prefix_matches(word, field)) for field in TEXT_FIELDS}
+            # Every query word has to match the name or the description
+            keep = np.logical_or.reduce(list(hits.values()))
+            scores = scores[keep] + sum(weight * hits[field][keep] for field, weight in TEXT_FIELDS.items())
+            candidates = candidates[keep]
+
+        ranked = candidates[np.lexsort((candidates, -scores))]
+        return [self.products[position] for position in ranked[offset:offset + top_k]], len(ranked)
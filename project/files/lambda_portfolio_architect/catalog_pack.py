@@ -0,0 +1,209 @@
+"""Compact binary form of the product catalog, with its CatalogIndex prebuilt.
+
+Parsing the JSON catalog and indexing it dominates a cold start once the
+catalog holds thousands of products. A pack is built once at deploy time and
+read without parsing: its arrays are views straight into the file (memory
+mapped) or into the bytes read from S3, and a product is only decoded from its
+JSON record when a query returns it.
+
+Layout (little endian):
+
+    b"CATPACK1" | uint32 header length | JSON header | padding to 8 bytes | payload
+
+The header holds the catalog shape, the sorted keys of every posting list,
+the sha256 of the payload and the dtype, length and offset of each array in
+the payload. Posting lists are stored as one positions array per field plus
+the offsets where each key's positions start.
+
+Build:
+    python catalog_pack.py available_products_en.json available_products_en.catpack
+"""
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import numpy as np
+from catalog_index import FILTER_FIELDS, TEXT_FIELDS, CatalogIndex
+
+
+MAGIC = b'CATPACK1'
+VERSION = 1
+ALIGNMENT = 8
+# Product positions fit in 32 bits, which halves the size of the posting lists
+POSITION = np.int32
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def _flatten(postings, keys):
+    # Positions of every key back to back, and where each key's run starts
+    runs = [postings.get(key, np.array([], dtype=POSITION)) for key in keys]
+    offsets = np.zeros(len(keys) + 1, dtype=POSITION)
+    offsets[1:] = np.cumsum([len(run) for run in runs])
+    positions = np.concatenate(runs).astype(POSITION) if runs else np.array([], dtype=POSITION)
+    return offsets, positions
+
+
+def pack_catalog(catalog):
+    """Pack bytes of a catalog in either JSON shape ({"financial_products": [...]} or {ticker: description})"""
+    index = CatalogIndex(catalog)
+    listed = isinstance(catalog, dict) and isinstance(catalog.get('financial_products'), list)
+    records = [json.dumps(product, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for product in index.products]
+
+    arrays = {
+        'records/offsets': np.concatenate([[0], np.cumsum([len(record) for record in records])]).astype(np.int64),
+        'records/data': np.frombuffer(b''.join(records), dtype=np.uint8),
+        'investment/values': index.investment_values,
+        'investment/positions': index.investment_positions.astype(POSITION),
+    }
+    keys = {field: sorted(index.postings[field]) for field in FILTER_FIELDS}
+    for field in FILTER_FIELDS:
+        arrays[f'postings/{field}/offsets'], arrays[f'postings/{field}/positions'] = _flatten(index.postings[field], keys[field])
+    for field in TEXT_FIELDS:
+        arrays[f'words/{field}/offsets'], arrays[f'words/{field}/positions'] = _flatten(index.words[field], index.vocabulary)
+
+    payload, layout = bytearray(), {}
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name], dtype=np.asarray(arrays[name]).dtype.newbyteorder('<'))
+        payload.extend(b'\0' * (_aligned(len(payload)) - len(payload)))
+        layout[name] = [array.dtype.str, len(array), len(payload)]
+        payload.extend(array.tobytes())
+
+    header = json.dumps({
+        "version": VERSION,
+        "shape": "products" if listed else "map",
+        # Top-level fields besides the product list, kept so the JSON document can be rebuilt
+        "document": {key: value for key, value in catalog.items() if key != 'financial_products'} if listed else {},
+        "count": len(records),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "keys": {**keys, "vocabulary": index.vocabulary},
+        "arrays": layout,
+    }, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    return prefix + b'\0' * (_aligned(len(prefix)) - len(prefix)) + bytes(payload)
+
+
+def is_pack(data):
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+class PackedRecords:
+    """Read-only sequence of the pack's products, each decoded from its JSON record on access"""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return json.loads(self.data[self.offsets[position]:self.offsets[position + 1]].tobytes())
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+
+class CatalogPack:
+    """Catalog read from pack bytes (or a memory map of them) without copying its arrays.
+
+    The payload checksum is verified on load, so a truncated or corrupted pack
+    raises ValueError and the caller can fall back to the JSON catalog.
+    """
+
+    def __init__(self, buffer, verify=True):
+        if not is_pack(buffer):
+            raise ValueError("Not a catalog pack")
+        header_size = struct.unpack_from('<I', buffer, len(MAGIC))[0]
+        header_start = len(MAGIC) + 4
+        header = json.loads(bytes(buffer[header_start:header_start + header_size]).decode('utf-8'))
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported catalog pack version {header.get('version')}")
+
+        start = _aligned(header_start + header_size)
+        if verify and hashlib.sha256(memoryview(buffer)[start:]).hexdigest() != header["sha256"]:
+            raise ValueError("Catalog pack checksum mismatch")
+
+        self.buffer = buffer
+        self.header = header
+        self.checksum = header["sha256"]
+        self.arrays = {
+            name: np.frombuffer(buffer, dtype=np.dtype(dtype), count=length, offset=start + offset)
+            for name, (dtype, length, offset) in header["arrays"].items()
+        }
+        self.products = PackedRecords(self.arrays['records/offsets'], self.arrays['records/data'])
+        self._index = None
+        self._document = None
+
+    @classmethod
+    def open(cls, path, verify=True):
+        # The map stays open for as long as the pack's arrays are in use
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), verify)
+
+    def _postings(self, prefix, keys):
+        offsets, positions = self.arrays[f'{prefix}/offsets'], self.arrays[f'{prefix}/positions']
+        return {key: positions[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys) if offsets[i + 1] > offsets[i]}
+
+    def index(self):
+        """CatalogIndex over the prebuilt posting lists"""
+        if self._index is None:
+            keys = self.header["keys"]
+            self._index = CatalogIndex.from_parts(
+                source=self,
+                products=self.products,
+                postings={field: self._postings(f'postings/{field}', keys[field]) for field in FILTER_FIELDS},
+                investment_values=self.arrays['investment/values'],
+                investment_positions=self.arrays['investment/positions'],
+                words={field: self._postings(f'words/{field}', keys['vocabulary']) for field in TEXT_FIELDS},
+                vocabulary=keys['vocabulary'],
+            )
+        return self._index
+
+    def document(self):
+        """The catalog as the JSON document it was built from"""
+        if self._document is None:
+            products = list(self.products)
+            if self.header["shape"] == "products":
+                self._document = {**self.header["document"], "financial_products": products}
+            else:
+                self._document = {product['ticker']: product['description'] for product in products}
+        return self._document
+
+
+def load_catalog_bytes(data):
+    """Catalog from an object body: a CatalogPack for pack bytes, otherwise the parsed JSON"""
+    return CatalogPack(data) if is_pack(data) else json.loads(data.decode('utf-8'))
+
+
+def load_catalog_file(path):
+    """Catalog from a file: packs are memory mapped, anything else is parsed as JSON"""
+    with open(path, 'rb') as f:
+        packed = is_pack(f.read(len(MAGIC)))
+    if packed:
+        return CatalogPack.open(path)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def catalog_document(catalog):
+    """The JSON document of a catalog, whether it was loaded from a pack or from JSON"""
+    return catalog.document() if isinstance(catalog, CatalogPack) else catalog
+
+
+def build(source_path, pack_path):
+    with open(source_path, encoding='utf-8') as f:
+        packed = pack_catalog(json.load(f))
+    with open(pack_path, 'wb') as f:
+        f.write(packed)
+    return CatalogPack(packed).checksum
+
+
+if __name__ == "__main__":
+    checksum = build(sys.argv[1], sys.argv[2])
+    print(f"Wrote {sys.argv[2]} (sha256 {checksum})")
@@ -0,0 +1,68 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+PERIOD_PATTERN = re.compile(r'^(\d+)(d|wk|mo|y)$')
+PERIOD_UNITS = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+MAX_LOOKBACK_YEARS = 10
+INTERVALS = {'1d': None, '1wk': 'W', '1mo': 'M'}
+
+
+def period_start(period, end_date):
+    """Start date for a lookback such as "100d", "26wk", "6mo" or "5y" ending at end_date"""
+    match = PERIOD_PATTERN.match(str(period).strip().lower())
+    if not match:
+        raise ValueError(f"Invalid period '{period}', expected e.g. 100d, 26wk, 6mo or 5y")
+
+    start = (pd.Timestamp(end_date) - pd.DateOffset(**{PERIOD_UNITS[match.group(2)]: int(match.group(1))})).date()
+    earliest = (pd.Timestamp(end_date) - pd.DateOffset(years=MAX_LOOKBACK_YEARS)).date()
+    if start < earliest:
+        raise ValueError(f"Period '{period}' is longer than the {MAX_LOOKBACK_YEARS}y maximum")
+    return start
+
+
+def minmax_indices(values, max_points):
+    """Indices of at most max_points values that keep the shape of the series.
+
+    The first and last points are always kept; the points in between are split
+    into equal buckets and each bucket contributes its minimum and maximum, so
+    peaks and troughs (and therefore drawdowns) survive downsampling. All buckets
+    are evaluated at once on a padded 2-D view instead of looping over them.
+    """
+    n = len(values)
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    if max_points < 4:
+        return np.unique(np.linspace(0, n - 1, max(max_points, 1)).round().astype(int))
+
+    inner = np.asarray(values[1:-1], dtype=float)
+    buckets = (max_points - 2) // 2
+    edges = np.linspace(0, len(inner), buckets + 1).astype(int)
+    positions = edges[:-1, None] + np.arange(np.diff(edges).max())[None, :]
+    valid = positions < edges[1:, None]
+    padded = inner[np.minimum(positions, len(inner) - 1)]
+
+    rows = np.arange(buckets)
+    lows = positions[rows, np.where(valid, padded, np.inf).argmin(axis=1)]
+    highs = positions[rows, np.where(valid, padded, -np.inf).argmax(axis=1)]
+    return np.unique(np.concatenate([[0], lows + 1, highs + 1, [n - 1]]))
+
+
+def shape_series(prices, interval='1d', max_points=None):
+    """Resample a {date: close} series to interval, then cap it at max_points"""
+    if interval not in INTERVALS:
+        raise ValueError(f"Invalid interval '{interval}', expected one of {', '.join(INTERVALS)}")
+    if not prices or (interval == '1d' and max_points is None):
+        return prices
+
+    series = pd.Series(prices)
+    series.index = pd.DatetimeIndex(series.index)
+    series = series.sort_index()
+
+    if INTERVALS[interval]:
+        # Keep the last real trading day of each week/month so dates stay valid closes
+        series = series.groupby(series.index.to_period(INTERVALS[interval])).tail(1)
+
+    series = series.iloc[minmax_indices(series.to_numpy(), max_points)]
+    return {day.strftime('%Y-%m-%d'): price for day, price in series.items()}
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from portfolio_analytics import TRADING_DAYS_PER_YEAR
+
+
+MOVING_AVERAGE_WINDOWS = (50, 200)
+RSI_WINDOW = 14
+VOLATILITY_WINDOW = 20
+
+
+def right_aligned_matrix(history, length=None):
+    """Stack the last `length` closes (default: all) of every {date: close} series into a (tickers x length) matrix.
+
+    Each row ends with its own latest close and is NaN-padded on the left, so
+    tickers on different trading calendars (or with short histories) share a
+    column layout without forward-filling prices that never traded.
+    """
+    length = length or max((len(prices) for prices in history.values()), default=0)
+    matrix = np.full((len(history), length), np.nan)
+    for row, prices in enumerate(history.values()):
+        closes = np.fromiter((price for _, price in sorted(prices.items())), dtype=float)[-length:]
+        if len(closes):
+            matrix[row, -len(closes):] = closes
+    return matrix
+
+
+def wilder_rsi(prices, window=RSI_WINDOW):
+    """Latest RSI of each row using Wilder's smoothing (an EMA with alpha = 1 / window)"""
+    changes = pd.DataFrame(np.diff(prices, axis=1).T)
+    gains = changes.clip(lower=0).ewm(alpha=1 / window, adjust=False).mean().iloc[-1].to_numpy()
+    losses = (-changes).clip(lower=0).ewm(alpha=1 / window, adjust=False).mean().iloc[-1].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(losses > 0, 100 - 100 / (1 + gains / losses), 100.0)
+    return np.where(np.isfinite(prices).sum(axis=1) > window, rsi, np.nan)
+
+
+def latest_indicators(prices):
+    """Latest indicator values for every row of a right-aligned (tickers x days) close matrix.
+
+    Indicators that need more history than a row has are NaN. The distance from
+    the 52-week high is also the current drawdown from peak.
+    """
+    available = np.isfinite(prices).sum(axis=1)
+    last = prices[:, -1]
+
+    indicators = {"last_close": last}
+    for window in MOVING_AVERAGE_WINDOWS:
+        indicators[f"sma_{window}"] = np.where(available >= window, np.nanmean(prices[:, -window:], axis=1), np.nan)
+    indicators[f"rsi_{RSI_WINDOW}"] = wilder_rsi(prices)
+
+    returns = np.diff(prices[:, -VOLATILITY_WINDOW - 1:], axis=1) / prices[:, -VOLATILITY_WINDOW - 1:-1]
+    indicators[f"volatility_{VOLATILITY_WINDOW}d"] = np.where(
+        available > VOLATILITY_WINDOW, np.std(returns, axis=1, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan
+    )
+
+    peaks = np.fmax.accumulate(prices, axis=1)
+    indicators["max_drawdown"] = np.nanmin(prices / peaks - 1, axis=1)
+    indicators["from_52w_high"] = last / np.nanmax(prices, axis=1) - 1
+    indicators["from_52w_low"] = last / np.nanmin(prices, axis=1) - 1
+    return indicators
+
+
+def trend_summary(last_close, sma_short, sma_long, rsi):
+    """Compact trend labels from the moving-average stack and RSI"""
+    if np.isnan(sma_long) or np.isnan(sma_short):
+        trend = "insufficient history"
+    elif last_close > sma_short > sma_long:
+        trend = "uptrend"
+    elif last_close < sma_short < sma_long:
+        trend = "downtrend"
+    else:
+        trend = "sideways"
+
+    if np.isnan(rsi):
+        momentum = "unknown"
+    elif rsi >= 70:
+        momentum = "overbought"
+    elif rsi <= 30:
+        momentum = "oversold"
+    else:
+        momentum = "neutral"
+    return {"trend": trend, "momentum": momentum}
@@ -1,11 +1,84 @@
 import os
 import json
-import yfinance as yf
+import numpy as np
 import boto3
-from datetime import datetime, timedelta
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from catalog import CatalogCache, bundled_catalog_path, catalog_entries, catalog_tickers
+from catalog_index import CatalogIndex
+from catalog_pack import CatalogPack, catalog_document
+from price_store import PriceStore
+from market_data import provider_from_environment
+from session_memo import SessionMemo
+from deadline import Deadline, DeadlineExceeded
+from response_budget import ResponseBudget
+from series_codec import encode_series
+from downsample import minmax_indices, period_start, shape_series
+from market_calendar import DATA_SETTLE_DELAY, last_completed_session, trading_days_between
+from indicators import MOVING_AVERAGE_WINDOWS, RSI_WINDOW, VOLATILITY_WINDOW, latest_indicators, right_aligned_matrix, trend_summary
+from portfolio_analytics import (
+    TRADING_DAYS_PER_YEAR, aligned_price_matrix, backtest, backtest_metrics, daily_returns, efficient_portfolio,
+    integer_percentages, normalize_weights, portfolio_statistics, rebalance_starts, shrinkage_covariance,
+    simulate_terminal_values
+)
 
 
-s3 = boto3.client('s3')
+# Short timeouts so a slow S3 on a cold start falls back to the bundled catalog quickly
+S3_TIMEOUT_SECONDS = float(os.environ.get('CATALOG_S3_TIMEOUT_SECONDS', '2'))
+s3 = boto3.client('s3', config=Config(connect_timeout=S3_TIMEOUT_SECONDS, read_timeout=S3_TIMEOUT_SECONDS, retries={'max_attempts': 1}))
+catalog_cache = None
+catalog_index = None
+price_store = None
+data_provider = None
+# Annualized mean returns and shrunk covariance per (tickers, period), valid until the next market close
+covariance_cache = {}
+
+# Price store documents are separate S3 objects, so whole-catalog requests read them in parallel.
+# Reads, writes and Yahoo downloads run on long-lived workers so they can be given a time budget;
+# store I/O has its own workers so Yahoo requests still running past their budget can't starve it.
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', '16'))
+fetch_executor = None
+store_executor = None
+# Seconds each price store pass and the Yahoo download may take before the call carries on without them
+PRICE_FETCH_TIMEOUT_SECONDS = float(os.environ.get('PRICE_FETCH_TIMEOUT_SECONDS', '15'))
+# Relative change of the last stored close, refetched with every incremental download, that means
+# Yahoo has re-adjusted the history for a split or dividend and the stored closes must be replaced
+ADJUSTMENT_TOLERANCE = float(os.environ.get('PRICE_ADJUSTMENT_TOLERANCE', '0.0001'))
+# Time kept back from the Lambda timeout to build and return the response
+DEADLINE_RESERVE_SECONDS = float(os.environ.get('DEADLINE_RESERVE_SECONDS', '2'))
+# Deadline of the current invocation; unbounded outside of lambda_handler
+deadline = Deadline()
+# Upper bound on the serialized get_products_with_data response handed back to the agent
+MAX_PRODUCTS_WITH_DATA_BYTES = int(os.environ.get('MAX_PRODUCTS_WITH_DATA_BYTES', '20000'))
+
+# Repeated calls with the same arguments within an agent session are answered from memory
+tool_memo = SessionMemo(
+    ttl_seconds=float(os.environ.get('TOOL_MEMO_TTL_SECONDS', '300')),
+    max_entries=int(os.environ.get('TOOL_MEMO_MAX_ENTRIES', '512'))
+)
+MEMOIZED_FUNCTIONS = {
+    'get_available_products', 'get_products_with_data', 'get_product_data', 'get_product_data_batch',
+    'get_product_indicators', 'get_portfolio_statistics', 'backtest_allocation', 'optimize_allocation',
+    'simulate_portfolio'
+}
+
+# Outputs over the agent's response budget are downsampled, trimmed and paginated
+response_budget = ResponseBudget(
+    max_bytes=int(os.environ.get('MAX_RESPONSE_BYTES', '20000')),
+    max_tokens=int(os.environ.get('MAX_RESPONSE_TOKENS', '0')),
+    low_value_fields=('id',),
+    select_indices=minmax_indices
+)
+
+# Products returned per get_available_products page unless the caller asks for another top_k
+CATALOG_TOP_K = int(os.environ.get('CATALOG_TOP_K', '20'))
+# Functions that page their own results: continuation tokens carry the offset of their next page
+PAGINATED_FUNCTIONS = {'get_available_products'}
+
+MAX_SIMULATION_PATHS = 200000
+# Equity curves are only returned when comparing a handful of allocations
+MAX_BACKTEST_CURVES = 10
 
 
 def get_named_parameter(event, name):
@@ -16,55 +89,676 @@ def get_named_parameter(event, name):
     return None
 
 
-def get_available_products():
-    bucket_name = os.environ['S3_BUCKET_NAME']
-    file_name = 'available_products_en.json'
-    
+def parse_tickers(value):
+    # Array parameters arrive from the agent as a string, e.g. '["SPY", "QQQ"]' or 'SPY, QQQ'
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.strip('[]').split(',')
+    if isinstance(value, str):
+        value = [value]
+
+    tickers = []
+    for ticker in value or []:
+        ticker = str(ticker).strip().strip('"\'')
+        if ticker and ticker not in tickers:
+            tickers.append(ticker)
+    return tickers
+
+
+def parse_allocation(value):
+    # Object parameters arrive as a JSON string, e.g. '{"SPY": 50, "QQQ": 30, "TLT": 20}'
+    allocation = json.loads(value) if isinstance(value, str) else value
+    if not isinstance(allocation, dict) or not allocation:
+        raise ValueError("Allocation must be a non-empty object of ticker to weight")
+    return {str(ticker).strip(): float(weight) for ticker, weight in allocation.items()}
+
+
+def parse_allocations(value):
+    """Allocations to compare as (tickers, weight rows): one object, a list of objects,
+    or {"tickers": [...], "weights": [[...], ...]}"""
+    allocations = json.loads(value) if isinstance(value, str) else value
+    if isinstance(allocations, dict) and "tickers" in allocations and "weights" in allocations:
+        tickers = [str(ticker).strip() for ticker in allocations["tickers"]]
+        rows = [dict(zip(tickers, row)) for row in allocations["weights"]]
+    else:
+        rows = [parse_allocation(allocation) for allocation in (allocations if isinstance(allocations, list) else [allocations])]
+        tickers = list(dict.fromkeys(ticker for row in rows for ticker in row))
+    if not rows:
+        raise ValueError("At least one allocation is required")
+    return tickers, rows
+
+
+def get_catalog_cache():
+    global catalog_cache
+    if catalog_cache is None:
+        # The packed catalog loads without parsing; the JSON catalog stays behind it as a fallback
+        file_names = ['available_products_en.catpack', 'available_products_en.json']
+        catalog_cache = CatalogCache(
+            s3,
+            os.environ['S3_BUCKET_NAME'],
+            file_names,
+            [bundled_catalog_path(file_name) for file_name in file_names],
+            revalidate_seconds=float(os.environ.get('CATALOG_REVALIDATE_SECONDS', '300'))
+        )
+    return catalog_cache
+
+
+def load_catalog():
     try:
-        response = s3.get_object(Bucket=bucket_name, Key=file_name)
-        content = response['Body'].read().decode('utf-8')
-        products = json.loads(content)
-        return products
-    
+        return catalog_document(get_catalog_cache().get())
+
     except Exception as e:
         print(f"Error reading from S3: {e}")
         return {"error": str(e)}
 
 
-def get_product_data(ticker):
+def get_catalog_index():
+    # Rebuilt only when the catalog cache picks up a new version of the catalog
+    global catalog_index
+    products = get_catalog_cache().get()
+    if catalog_index is None or catalog_index.source is not products:
+        catalog_index = products.index() if isinstance(products, CatalogPack) else CatalogIndex(products)
+    return catalog_index
+
+
+def get_available_products(types=None, risk_levels=None, max_minimum_investment=None, query=None, top_k=None, offset=0):
     try:
-        end_date = datetime.today().date()
-        start_date = end_date - timedelta(days=100)
+        top_k = int(top_k) if top_k not in (None, '') else CATALOG_TOP_K
+        if top_k < 1:
+            raise ValueError("top_k must be a positive integer")
+        max_minimum_investment = float(max_minimum_investment) if max_minimum_investment not in (None, '') else None
+        offset = int(offset or 0)
 
-        product_data = {}
-        etf = yf.Ticker(ticker)
-        hist = etf.history(start=start_date, end=end_date)
+        products, total = get_catalog_index().search(types, risk_levels, max_minimum_investment, query, top_k, offset)
+        output = {"products": products, "total_matches": total}
+        if offset + len(products) < total:
+            output["next_offset"] = offset + len(products)
+        return output
 
-        # Store closing prices for each asset
-        product_data[ticker] = {
-            date.strftime('%Y-%m-%d'): round(price, 2) for date, price in hist['Close'].items()
+    except Exception as e:
+        print(f"Error querying the product catalog: {e}")
+        return {"error": str(e)}
+
+
+def get_price_store():
+    global price_store
+    if price_store is None:
+        price_store = PriceStore.from_environment()
+    return price_store
+
+
+def get_data_provider():
+    global data_provider
+    if data_provider is None:
+        data_provider = provider_from_environment()
+    return data_provider
+
+
+def get_fetch_executor():
+    global fetch_executor
+    if fetch_executor is None:
+        fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    return fetch_executor
+
+
+def get_store_executor():
+    global store_executor
+    if store_executor is None:
+        store_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    return store_executor
+
+
+def log_connection_stats():
+    if data_provider is not None:
+        print(f"Market data connections: {json.dumps(data_provider.connection_stats())}")
+
+
+def history_end_date():
+    # Exclusive end of the price window: the day after the last completed session, so a day's
+    # close is picked up once Yahoo has settled it and nothing is refetched over weekends or holidays
+    return last_completed_session(settle=DATA_SETTLE_DELAY) + timedelta(days=1)
+
+
+def get_close_history(tickers, start_date, end_date):
+    """Closing prices in [start_date, end_date) per ticker, fetching only dates missing from the price store"""
+    store = get_price_store()
+    last_day = end_date - timedelta(days=1)
+
+    def load(ticker):
+        try:
+            return store.load(ticker)
+        except Exception as e:
+            print(f"Error reading price history for {ticker}: {e}")
+            return {"ticker": ticker, "covered_from": None, "checked_through": None, "prices": {}}
+
+    executor = get_store_executor()
+    loads = {ticker: executor.submit(load, ticker) for ticker in tickers}
+    deadline.wait(loads.values(), PRICE_FETCH_TIMEOUT_SECONDS)
+    documents, unloaded = {}, set()
+    for ticker, future in loads.items():
+        if future.done():
+            documents[ticker] = future.result()
+        else:
+            # Fetched from Yahoo like a new ticker, but never saved over the stored history it couldn't read
+            future.cancel()
+            unloaded.add(ticker)
+            documents[ticker] = {"ticker": ticker, "covered_from": None, "checked_through": None, "prices": {}}
+
+    # Work out where each ticker's stored history stops; a longer lookback than stored means a full refetch
+    missing_from = {}
+    for ticker, document in documents.items():
+        covered_from, checked_through = document.get('covered_from'), document['checked_through']
+        if checked_through is None or checked_through < start_date.isoformat() or covered_from is None or covered_from > start_date.isoformat():
+            missing_from[ticker] = start_date
+        elif checked_through < last_day.isoformat():
+            missing_from[ticker] = date.fromisoformat(checked_through) + timedelta(days=1)
+
+    def fetch(missing):
+        # Incremental downloads start at the last stored close, so a re-adjusted history shows up as a changed close
+        starts = [
+            date.fromisoformat(max(documents[ticker]['prices'])) if missing_start > start_date and documents[ticker]['prices'] else missing_start
+            for ticker, missing_start in missing.items()
+        ]
+        fetch_start = min(starts)
+        print(f"Price store: {len(tickers) - len(missing)} up to date, fetching {len(missing)} from {fetch_start}")
+        try:
+            return deadline.run(
+                get_fetch_executor(), f"price history for {', '.join(missing)}",
+                lambda: get_data_provider().batch_history(list(missing), fetch_start, end_date),
+                PRICE_FETCH_TIMEOUT_SECONDS
+            )
+        except DeadlineExceeded as e:
+            # Serve the stored prices; the output is marked incomplete
+            print(f"Error fetching price history: {e}")
+            return {}
+
+    def readjusted(document, series):
+        # Yahoo back-adjusts every past close after a split or dividend; stored closes are then on another scale
+        last_stored = max(document['prices'])
+        closes = {day.strftime('%Y-%m-%d'): price for day, price in series.items()}
+        if last_stored not in closes:
+            return True
+        stored = document['prices'][last_stored]
+        return abs(round(float(closes[last_stored]), 4) - stored) > max(abs(stored) * ADJUSTMENT_TOLERANCE, 1e-4)
+
+    updated = []
+    while missing_from:
+        fetched = fetch(missing_from)
+        refetch = {}
+        for ticker, missing_start in missing_from.items():
+            series = fetched.get(ticker)
+            document = documents[ticker]
+            if missing_start > start_date and document['prices'] and series is not None and not series.empty and readjusted(document, series):
+                print(f"Price history of {ticker} was re-adjusted upstream; fetching it again from {start_date}")
+                documents[ticker] = {"ticker": ticker, "covered_from": None, "checked_through": None, "prices": {}}
+                refetch[ticker] = start_date
+                continue
+
+            if series is None or series.empty:
+                # An empty answer only proves there is nothing to fetch when the gap has no trading sessions;
+                # otherwise leave the marker alone so the next call retries
+                if trading_days_between(missing_start, end_date) > 0:
+                    continue
+                fetched_through = last_day
+            else:
+                # Yahoo may not have every session up to end_date yet; only what it returned is checked
+                fetched_through = max(series.index.max().date(), missing_start - timedelta(days=1))
+                if trading_days_between(fetched_through + timedelta(days=1), end_date) == 0:
+                    fetched_through = last_day
+
+            for day, price in (series.items() if series is not None else []):
+                document['prices'][day.strftime('%Y-%m-%d')] = round(float(price), 4)
+            if missing_start == start_date:
+                document['covered_from'] = min(document.get('covered_from') or start_date.isoformat(), start_date.isoformat())
+            document['checked_through'] = fetched_through.isoformat()
+            updated.append(ticker)
+        missing_from = refetch
+
+    if updated:
+        def save(ticker):
+            try:
+                store.save(ticker, documents[ticker])
+            except Exception as e:
+                print(f"Error writing price history for {ticker}: {e}")
+
+        # Writes still running at the deadline finish in the background
+        saves = [executor.submit(save, ticker) for ticker in updated if ticker not in unloaded]
+        deadline.wait(saves, PRICE_FETCH_TIMEOUT_SECONDS)
+
+    start_key, end_key = start_date.isoformat(), end_date.isoformat()
+    return {
+        ticker: {
+            day: price for day, price in sorted(document['prices'].items()) if start_key <= day < end_key
         }
+        for ticker, document in documents.items()
+    }
+
 
-        return product_data
+def build_price_response(tickers, fmt, period, interval, max_points):
+    end_date = history_end_date()
+    start_date = period_start(period, end_date)
+    max_points = int(max_points) if max_points not in (None, '') else None
+    if max_points is not None and max_points < 1:
+        raise ValueError("max_points must be a positive integer")
+
+    history = get_close_history(tickers, start_date, end_date)
+    return {
+        ticker: encode_series(shape_series({day: round(price, 2) for day, price in prices.items()}, interval, max_points), fmt)
+        for ticker, prices in history.items()
+    }
+
+
+def get_product_data(ticker, fmt='dates', period='100d', interval='1d', max_points=None):
+    try:
+        # Store closing prices for each asset
+        return build_price_response([ticker], fmt, period, interval, max_points)
 
     except Exception as e:
         print(f"Error fetching asset prices: {e}")
         return {"error": str(e)}
 
 
-def lambda_handler(event, context):
-    action_group = event.get('actionGroup', '')
-    message_version = event.get('messageVersion', '')
-    function = event.get('function', '')
+def get_product_data_batch(tickers, fmt='dates', period='100d', interval='1d', max_points=None):
+    if not tickers:
+        return {"error": "No tickers provided"}
+
+    try:
+        return build_price_response(tickers, fmt, period, interval, max_points)
+
+    except Exception as e:
+        print(f"Error fetching asset prices: {e}")
+        return {"error": str(e)}
+
+
+def get_products_with_data():
+    try:
+        products = catalog_entries(load_catalog())
+        if not products:
+            return {"error": "No products with tickers in the catalog"}
+
+        end_date = history_end_date()
+        history = get_close_history(list(products), period_start('1y', end_date), end_date)
+        available = {ticker: prices for ticker, prices in history.items() if prices}
+
+        summaries = {}
+        if available:
+            matrix = right_aligned_matrix(available)
+            indicators = latest_indicators(matrix)
+            first = matrix[np.arange(len(matrix)), np.isfinite(matrix).argmax(axis=1)]
+            returns = np.diff(matrix, axis=1) / matrix[:, :-1]
+            with np.errstate(invalid='ignore'):
+                volatility = np.nanstd(returns, axis=1, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+            for i, ticker in enumerate(available):
+                summaries[ticker] = {
+                    "return_1y_pct": round(float(matrix[i, -1] / first[i] - 1) * 100, 2),
+                    "volatility_pct": round(float(volatility[i]) * 100, 2) if np.isfinite(volatility[i]) else None,
+                    "max_drawdown_1y_pct": round(float(indicators["max_drawdown"][i]) * 100, 2),
+                    "from_52w_high_pct": round(float(indicators["from_52w_high"][i]) * 100, 2),
+                    **trend_summary(*(float(indicators[name][i]) for name in (
+                        "last_close", f"sma_{MOVING_AVERAGE_WINDOWS[0]}", f"sma_{MOVING_AVERAGE_WINDOWS[1]}", f"rsi_{RSI_WINDOW}"
+                    )))
+                }
+
+        # Add products in catalog order until the response would outgrow the agent's budget
+        output = {"products": {}, "missing": [ticker for ticker in products if ticker not in available], "omitted": []}
+        size = len(json.dumps(output, ensure_ascii=False))
+        for ticker, description in products.items():
+            entry = {"description": description, **summaries.get(ticker, {})}
+            entry_size = len(json.dumps({ticker: entry}, ensure_ascii=False))
+            if size + entry_size > MAX_PRODUCTS_WITH_DATA_BYTES:
+                output["omitted"].append(ticker)
+                continue
+            output["products"][ticker] = entry
+            size += entry_size
+        return output
+
+    except Exception as e:
+        print(f"Error fetching products with data: {e}")
+        return {"error": str(e)}
+
+
+def get_portfolio_statistics(tickers, period='1y', risk_free_rate=0.0):
+    if not tickers:
+        return {"error": "No tickers provided"}
 
+    try:
+        end_date = history_end_date()
+        history = get_close_history(tickers, period_start(period, end_date), end_date)
+        dates, tickers, prices, missing = aligned_price_matrix(history)
+        if len(dates) < 3:
+            return {"error": "Not enough overlapping price history", "missing": missing}
+
+        stats = portfolio_statistics(prices, float(risk_free_rate or 0))
+
+        return {
+            "period": period,
+            "start": dates[0].strftime('%Y-%m-%d'),
+            "end": dates[-1].strftime('%Y-%m-%d'),
+            "trading_days": len(dates),
+            "statistics": {
+                ticker: {
+                    "annualized_return_pct": round(float(stats["annualized_return"][i]) * 100, 2),
+                    "volatility_pct": round(float(stats["volatility"][i]) * 100, 2),
+                    "max_drawdown_pct": round(float(stats["max_drawdown"][i]) * 100, 2),
+                    "sharpe_ratio": round(float(stats["sharpe_ratio"][i]), 2)
+                }
+                for i, ticker in enumerate(tickers)
+            },
+            "correlation": {
+                "tickers": tickers,
+                "matrix": np.round(stats["correlation"], 2).tolist()
+            },
+            "missing": missing
+        }
+
+    except Exception as e:
+        print(f"Error computing portfolio statistics: {e}")
+        return {"error": str(e)}
+
+
+def get_product_indicators(tickers):
+    if not tickers:
+        return {"error": "No tickers provided"}
+
+    try:
+        # A year of closes covers the 52-week range and warms up the 200-day average
+        end_date = history_end_date()
+        history = get_close_history(tickers, period_start('1y', end_date), end_date)
+        available = {ticker: prices for ticker, prices in history.items() if prices}
+        missing = [ticker for ticker in history if ticker not in available]
+        if not available:
+            return {"error": f"No price history for: {', '.join(missing)}"}
+
+        indicators = latest_indicators(right_aligned_matrix(available))
+        short, long = (f"sma_{window}" for window in MOVING_AVERAGE_WINDOWS)
+        rsi, volatility = f"rsi_{RSI_WINDOW}", f"volatility_{VOLATILITY_WINDOW}d"
+
+        def value(name, i, scale=1):
+            number = float(indicators[name][i])
+            return round(number * scale, 2) if np.isfinite(number) else None
+
+        output = {}
+        for i, (ticker, prices) in enumerate(available.items()):
+            output[ticker] = {
+                "as_of": max(prices),
+                "last_close": value("last_close", i),
+                short: value(short, i),
+                long: value(long, i),
+                rsi: value(rsi, i),
+                f"{volatility}_pct": value(volatility, i, 100),
+                "max_drawdown_1y_pct": value("max_drawdown", i, 100),
+                "from_52w_high_pct": value("from_52w_high", i, 100),
+                "from_52w_low_pct": value("from_52w_low", i, 100),
+                **trend_summary(*(float(indicators[name][i]) for name in ("last_close", short, long, rsi)))
+            }
+        return {"indicators": output, "missing": missing}
+
+    except Exception as e:
+        print(f"Error computing indicators: {e}")
+        return {"error": str(e)}
+
+
+def simulate_portfolio(allocation, amount, target_amount, n_paths=20000, seed=None, period='3y'):
+    try:
+        allocation = parse_allocation(allocation)
+        amount, target_amount = float(amount), float(target_amount)
+        n_paths = int(n_paths or 20000)
+        if not 0 < n_paths <= MAX_SIMULATION_PATHS:
+            raise ValueError(f"n_paths must be between 1 and {MAX_SIMULATION_PATHS}")
+        seed = int(seed) if seed not in (None, '') else None
+
+        end_date = history_end_date()
+        history = get_close_history(list(allocation), period_start(period, end_date), end_date)
+        dates, tickers, prices, missing = aligned_price_matrix(history)
+        if missing:
+            return {"error": f"No price history for: {', '.join(missing)}"}
+        if len(dates) < 20:
+            return {"error": "Not enough overlapping price history"}
+
+        portfolio_returns = daily_returns(prices) @ normalize_weights(allocation, tickers)
+        outcomes = simulate_terminal_values(portfolio_returns, amount, n_paths, seed=seed)
+        percentiles = np.percentile(outcomes, [5, 25, 50, 75, 95])
+
+        return {
+            "amount": amount,
+            "target_amount": target_amount,
+            "horizon": "1y",
+            "paths": n_paths,
+            "history": f"{dates[0].strftime('%Y-%m-%d')} to {dates[-1].strftime('%Y-%m-%d')}",
+            "probability_of_reaching_target_pct": round(float((outcomes >= target_amount).mean()) * 100, 2),
+            "probability_of_loss_pct": round(float((outcomes < amount).mean()) * 100, 2),
+            "expected_amount": round(float(outcomes.mean()), 2),
+            "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip([5, 25, 50, 75, 95], percentiles)}
+        }
+
+    except Exception as e:
+        print(f"Error simulating portfolio: {e}")
+        return {"error": str(e)}
+
+
+def backtest_allocation(allocations, lookback_years=5, rebalance='monthly', max_points=24):
+    try:
+        tickers, rows = parse_allocations(allocations)
+        lookback_years = int(lookback_years or 5)
+        if not 1 <= lookback_years <= 10:
+            raise ValueError("lookback_years must be between 1 and 10")
+        max_points = int(max_points or 24)
+
+        end_date = history_end_date()
+        history = get_close_history(tickers, period_start(f"{lookback_years}y", end_date), end_date)
+        dates, tickers, prices, missing = aligned_price_matrix(history)
+        if missing:
+            return {"error": f"No price history for: {', '.join(missing)}"}
+        if len(dates) < 60:
+            return {"error": "Not enough overlapping price history"}
+
+        weights = np.vstack([normalize_weights(row, tickers) for row in rows])
+        values = backtest(prices, weights, rebalance_starts(dates, rebalance))
+        metrics = backtest_metrics(values)
+
+        results = []
+        for k, row in enumerate(rows):
+            result = {
+                "allocation": {ticker: round(float(weights[k, i]) * 100, 2) for i, ticker in enumerate(tickers) if weights[k, i] > 0},
+                "cagr_pct": round(float(metrics["cagr"][k]) * 100, 2),
+                "volatility_pct": round(float(metrics["volatility"][k]) * 100, 2),
+                "max_drawdown_pct": round(float(metrics["max_drawdown"][k]) * 100, 2)
+            }
+            if len(rows) <= MAX_BACKTEST_CURVES:
+                keep = minmax_indices(values[:, k], max_points)
+                result["equity_curve"] = {
+                    dates[i].strftime('%Y-%m-%d'): round(float(values[i, k]) * 100, 2) for i in keep
+                }
+            results.append(result)
+
+        return {
+            "history": f"{dates[0].strftime('%Y-%m-%d')} to {dates[-1].strftime('%Y-%m-%d')}",
+            "rebalance": rebalance,
+            "equity_curve_base": 100,
+            "results": results
+        }
+
+    except Exception as e:
+        print(f"Error running backtest: {e}")
+        return {"error": str(e)}
+
+
+def get_return_model(tickers, period):
+    end_date = history_end_date()
+    key = (tuple(tickers), period, end_date)
+    if key in covariance_cache:
+        return covariance_cache[key]
+
+    history = get_close_history(tickers, period_start(period, end_date), end_date)
+    dates, tickers, prices, missing = aligned_price_matrix(history)
+    if len(dates) < 60:
+        raise ValueError("Not enough overlapping price history")
+
+    returns = daily_returns(prices)
+    cov, shrinkage = shrinkage_covariance(returns)
+    model = {
+        "tickers": tickers,
+        "missing": missing,
+        "mean_returns": returns.mean(axis=0) * TRADING_DAYS_PER_YEAR,
+        "cov": cov * TRADING_DAYS_PER_YEAR,
+        "shrinkage": shrinkage
+    }
+
+    # Models from before the last close can't be hit again, so drop them
+    for stale in [k for k in covariance_cache if k[2] != end_date]:
+        del covariance_cache[stale]
+    covariance_cache[key] = model
+    return model
+
+
+def optimize_allocation(target_return=None, target_volatility=None, tickers=None, period='3y'):
+    try:
+        target_return = float(target_return) / 100 if target_return not in (None, '') else None
+        target_volatility = float(target_volatility) / 100 if target_volatility not in (None, '') else None
+        tickers = parse_tickers(tickers) if tickers else catalog_tickers(load_catalog())
+        if not tickers:
+            return {"error": "No tickers to optimize over"}
+
+        model = get_return_model(sorted(tickers), period)
+        weights, achievable = efficient_portfolio(model["mean_returns"], model["cov"], target_return, target_volatility)
+        expected_return = float(weights @ model["mean_returns"])
+        volatility = float(np.sqrt(weights @ model["cov"] @ weights))
+
+        return {
+            "portfolio_allocation": integer_percentages(weights, model["tickers"]),
+            "expected_return_pct": round(expected_return * 100, 2),
+            "volatility_pct": round(volatility * 100, 2),
+            "target_achievable": achievable,
+            "universe": model["tickers"],
+            "missing": model["missing"],
+            "covariance_shrinkage": round(model["shrinkage"], 3)
+        }
+
+    except Exception as e:
+        print(f"Error optimizing allocation: {e}")
+        return {"error": str(e)}
+
+
+def get_series_options(event):
+    # Optional shaping parameters shared by the price data functions
+    return {
+        'fmt': get_named_parameter(event, "format") or 'dates',
+        'period': get_named_parameter(event, "period") or '100d',
+        'interval': get_named_parameter(event, "interval") or '1d',
+        'max_points': get_named_parameter(event, "max_points")
+    }
+
+
+def page_parameters(function, parameters, continuation_token):
+    """Parameters of the call, plus the offset a continuation token of a paginated function points at"""
+    if function not in PAGINATED_FUNCTIONS or not continuation_token:
+        return parameters
+    return parameters + [{'name': 'offset', 'value': response_budget.decode_token(function, parameters, continuation_token)}]
+
+
+def with_continuation_token(function, parameters, output):
+    # Paginated functions report where their next page starts; the agent gets that as a continuation token
+    if not isinstance(output, dict) or "next_offset" not in output:
+        return output
+    output = dict(output)
+    output["continuation_token"] = response_budget.encode_token(function, parameters, output.pop("next_offset"))
+    return output
+
+
+def dispatch(function, event):
     if function == 'get_available_products':
-        output = get_available_products()
+        # Filter values arrive like tickers: a JSON array or a comma-separated string
+        output = get_available_products(
+            parse_tickers(get_named_parameter(event, "type")),
+            parse_tickers(get_named_parameter(event, "risk_level")),
+            get_named_parameter(event, "max_minimum_investment"),
+            get_named_parameter(event, "query"),
+            get_named_parameter(event, "top_k"),
+            get_named_parameter(event, "offset")
+        )
+    elif function == 'get_products_with_data':
+        output = get_products_with_data()
     elif function == 'get_product_data':
         ticker = get_named_parameter(event, "ticker")
-        output = get_product_data(ticker)
+        output = get_product_data(ticker, **get_series_options(event))
+    elif function == 'get_product_data_batch':
+        tickers = parse_tickers(get_named_parameter(event, "tickers"))
+        output = get_product_data_batch(tickers, **get_series_options(event))
+    elif function == 'get_product_indicators':
+        tickers = parse_tickers(get_named_parameter(event, "tickers"))
+        output = get_product_indicators(tickers)
+    elif function == 'get_portfolio_statistics':
+        tickers = parse_tickers(get_named_parameter(event, "tickers"))
+        period = get_named_parameter(event, "period") or '1y'
+        risk_free_rate = get_named_parameter(event, "risk_free_rate")
+        output = get_portfolio_statistics(tickers, period, risk_free_rate)
+    elif function == 'backtest_allocation':
+        output = backtest_allocation(
+            get_named_parameter(event, "allocations"),
+            get_named_parameter(event, "lookback_years"),
+            get_named_parameter(event, "rebalance") or 'monthly',
+            get_named_parameter(event, "max_points")
+        )
+    elif function == 'optimize_allocation':
+        output = optimize_allocation(
+            get_named_parameter(event, "target_return"),
+            get_named_parameter(event, "target_volatility"),
+            get_named_parameter(event, "tickers"),
+            get_named_parameter(event, "period") or '3y'
+        )
+    elif function == 'simulate_portfolio':
+        output = simulate_portfolio(
+            get_named_parameter(event, "allocation"),
+            get_named_parameter(event, "amount"),
+            get_named_parameter(event, "target_amount"),
+            get_named_parameter(event, "n_paths"),
+            get_named_parameter(event, "seed")
+        )
     else:
         output = 'Invalid function'
 
+    return output
+
+
+def lambda_handler(event, context):
+    action_group = event.get('actionGroup', '')
+    message_version = event.get('messageVersion', '')
+    function = event.get('function', '')
+
+    # The continuation token only selects a page of the output, so it is not part of the call itself
+    continuation_token = get_named_parameter(event, "continuation_token")
+    parameters = [param for param in event.get('parameters') or [] if param['name'] != 'continuation_token']
+
+    # Fetches share what is left of the Lambda timeout; whatever they could not finish is marked incomplete
+    global deadline
+    deadline = Deadline.from_context(context, DEADLINE_RESERVE_SECONDS)
+
+    def run():
+        if deadline.expired():
+            return {"error": "No time left to run the tool", "incomplete": True}
+        return deadline.mark(dispatch(function, event))
+
+    try:
+        event = {**event, 'parameters': page_parameters(function, parameters, continuation_token)}
+    except ValueError as e:
+        output = {"error": str(e)}
+    else:
+        if function in MEMOIZED_FUNCTIONS:
+            output = tool_memo.call(event.get('sessionId'), function, event['parameters'], run)
+        else:
+            output = run()
+        output = with_continuation_token(function, parameters, output)
+
+    page_start = 0
+    if function in PAGINATED_FUNCTIONS:
+        # The function already paged its results; the budget may only split its page further
+        page_start = int(get_named_parameter(event, "offset") or 0)
+        continuation_token = None
+    output = response_budget.apply(function, parameters, output, continuation_token, page_start)
+
     action_response = {
         'actionGroup': action_group,
         'function': function,
@@ -75,5 +769,6 @@ def lambda_handler(event, context):
 
     function_response = {'response': action_response, 'messageVersion': message_version}
     print("Response: {}".format(function_response, ensure_ascii=False))
+    log_connection_stats()
 
     return function_response
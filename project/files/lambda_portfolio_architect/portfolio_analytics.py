@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def aligned_price_matrix(history):
+    """Align {ticker: {date: close}} series into a (days x tickers) matrix.
+
+    Gaps from differing trading calendars are forward-filled and days before
+    every ticker has started trading are dropped. Tickers without any data are
+    returned separately as missing.
+    """
+    available = {ticker: prices for ticker, prices in history.items() if prices}
+    missing = [ticker for ticker in history if ticker not in available]
+    if not available:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0)), missing
+
+    frame = pd.DataFrame(available)
+    frame.index = pd.DatetimeIndex(frame.index)
+    frame = frame.sort_index().ffill().dropna()
+    return frame.index, list(frame.columns), frame.to_numpy(dtype=float), missing
+
+
+def daily_returns(prices):
+    return prices[1:] / prices[:-1] - 1
+
+
+def max_drawdowns(prices):
+    """Worst peak-to-trough decline of each column"""
+    return (prices / np.maximum.accumulate(prices, axis=0) - 1).min(axis=0)
+
+
+def portfolio_statistics(prices, risk_free_rate=0.0):
+    """Per-ticker annualized return, volatility, max drawdown and Sharpe ratio plus the correlation matrix"""
+    returns = daily_returns(prices)
+    years = len(returns) / TRADING_DAYS_PER_YEAR
+
+    annualized_return = (prices[-1] / prices[0]) ** (1 / years) - 1
+    volatility = returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    excess_return = returns.mean(axis=0) * TRADING_DAYS_PER_YEAR - risk_free_rate
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = np.where(volatility > 0, excess_return / volatility, 0.0)
+
+    correlation = np.atleast_2d(np.corrcoef(returns, rowvar=False))
+    return {
+        "annualized_return": annualized_return,
+        "volatility": volatility,
+        "max_drawdown": max_drawdowns(prices),
+        "sharpe_ratio": sharpe_ratio,
+        "correlation": np.nan_to_num(correlation)
+    }
+
+
+def normalize_weights(allocation, tickers):
+    """Weights in ticker order from an allocation in percent or fractions, scaled to sum to 1"""
+    weights = np.array([float(allocation.get(ticker, 0)) for ticker in tickers])
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("Allocation weights must be non-negative and not all zero")
+    return weights / weights.sum()
+
+
+def simulate_terminal_values(portfolio_returns, amount, n_paths, horizon_days=TRADING_DAYS_PER_YEAR, seed=None, batch_size=10000):
+    """Bootstrap terminal portfolio values from historical daily portfolio returns.
+
+    Each path draws horizon_days historical days with replacement. Sampling whole
+    days of the (daily rebalanced) portfolio return keeps the cross-asset
+    correlation of that day intact. Paths are generated in batches of
+    batch_size so memory stays bounded for large simulations.
+    """
+    rng = np.random.default_rng(seed)
+    log_returns = np.log1p(portfolio_returns)
+    log_growth = np.empty(n_paths)
+    for start in range(0, n_paths, batch_size):
+        size = min(batch_size, n_paths - start)
+        days = rng.integers(0, len(log_returns), size=(size, horizon_days))
+        log_growth[start:start + size] = log_returns[days].sum(axis=1)
+    return amount * np.exp(log_growth)
+
+
+REBALANCE_FREQUENCIES = {'monthly': 'M', 'quarterly': 'Q', 'annual': 'Y', 'none': None}
+
+
+def rebalance_starts(dates, frequency='monthly'):
+    """Row indices where a new holding period starts: the first trading day and the first day of each period"""
+    if frequency not in REBALANCE_FREQUENCIES:
+        raise ValueError(f"Invalid rebalance frequency '{frequency}', expected one of {', '.join(REBALANCE_FREQUENCIES)}")
+    if REBALANCE_FREQUENCIES[frequency] is None:
+        return np.array([0])
+
+    periods = dates.to_period(REBALANCE_FREQUENCIES[frequency]).asi8
+    return np.flatnonzero(np.concatenate([[True], periods[1:] != periods[:-1]]))
+
+
+def backtest(prices, weights, starts):
+    """Portfolio values (days x allocations) of periodically rebalanced allocations, starting at 1.
+
+    prices: (days x tickers) aligned closes
+    weights: (allocations x tickers), each row summing to 1
+    starts: row indices at which every allocation is rebalanced back to its weights
+
+    Within a holding period each asset's value grows with its price relative to the
+    period start, so all allocations are one matrix product; the values carried
+    across periods are a cumulative product of each period's growth.
+    """
+    period = np.searchsorted(starts, np.arange(len(prices)), side='right') - 1
+    growth = (prices / prices[starts][period]) @ weights.T
+
+    period_growth = (prices[starts[1:]] / prices[starts[:-1]]) @ weights.T
+    carried = np.vstack([np.ones((1, len(weights))), np.cumprod(period_growth, axis=0)])
+    return carried[period] * growth
+
+
+def backtest_metrics(values):
+    """CAGR, annualized volatility and worst drawdown of each column of portfolio values"""
+    years = (len(values) - 1) / TRADING_DAYS_PER_YEAR
+    returns = daily_returns(values)
+    return {
+        "cagr": values[-1] ** (1 / years) - 1,
+        "volatility": returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR),
+        "max_drawdown": max_drawdowns(values)
+    }
+
+
+def shrinkage_covariance(returns):
+    """Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+
+    Returns the shrunk covariance and the shrinkage intensity. The estimation error
+    term uses sum ||x_t x_t' - S||^2 = sum ||x_t||^4 - T ||S||^2 so no T x N x N
+    array is ever built.
+    """
+    t, n = returns.shape
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / t
+    target = np.trace(sample) / n * np.eye(n)
+
+    distance = ((sample - target) ** 2).sum()
+    error = ((x ** 2).sum(axis=1) ** 2).sum() / t ** 2 - (sample ** 2).sum() / t
+    shrinkage = float(np.clip(error / distance, 0, 1)) if distance > 0 else 1.0
+    return shrinkage * target + (1 - shrinkage) * sample, shrinkage
+
+
+def min_variance_weights(cov, mean_returns=None, target_return=None):
+    """Long-only, fully invested minimum-variance weights, optionally at a target expected return.
+
+    Primal active-set method. It starts from a portfolio that meets the constraints
+    (equal weights, or for a target the minimum-variance portfolio mixed with the
+    highest or lowest returning asset) and solves the equality-constrained problem
+    over the held assets in closed form (KKT system). A step that would turn a
+    weight negative stops at zero and drops that asset; a dropped asset whose bound
+    multiplier is negative is held again. Every step keeps the constraints, so a
+    target between the lowest and highest expected return is met exactly.
+    """
+    n = len(cov)
+    if target_return is None:
+        constraints, bounds = np.ones((1, n)), np.array([1.0])
+        weights = np.full(n, 1 / n)
+    else:
+        constraints, bounds = np.vstack([np.ones(n), mean_returns]), np.array([1.0, target_return])
+        weights = min_variance_weights(cov)
+        base_return = float(weights @ mean_returns)
+        other = int(np.argmax(mean_returns)) if target_return >= base_return else int(np.argmin(mean_returns))
+        spread = mean_returns[other] - base_return
+        share = float(np.clip((target_return - base_return) / spread, 0, 1)) if spread != 0 else 0.0
+        weights *= 1 - share
+        weights[other] += share
+    held = weights > 0
+
+    # Each asset is dropped or held again a bounded number of times; the cap only guards against rounding cycles
+    for _ in range(4 * n + 10):
+        idx = np.flatnonzero(held)
+        a = constraints[:, idx]
+        kkt = np.block([[2 * cov[np.ix_(idx, idx)], a.T], [a, np.zeros((len(a), len(a)))]])
+        rhs = np.concatenate([np.zeros(len(idx)), bounds])
+        solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+        step = solution[:len(idx)] - weights[idx]
+
+        shrinking = step < -1e-12
+        ratios = weights[idx][shrinking] / -step[shrinking]
+        if len(ratios) and ratios.min() < 1:
+            weights[idx] += ratios.min() * step
+            blocking = idx[shrinking][np.argmin(ratios)]
+            weights[blocking], held[blocking] = 0.0, False
+            continue
+
+        weights[idx] = solution[:len(idx)]
+        bound_multipliers = 2 * cov @ weights + constraints.T @ solution[len(idx):]
+        bound_multipliers[held] = np.inf
+        if bound_multipliers.min() >= -1e-10:
+            break
+        held[np.argmin(bound_multipliers)] = True
+
+    weights = np.clip(weights, 0, None)
+    return weights / weights.sum()
+
+
+def efficient_portfolio(mean_returns, cov, target_return=None, target_volatility=None):
+    """Long-only efficient-frontier weights matching a target return or volatility (annualized fractions).
+
+    Returns the weights and whether the target was reachable; unreachable targets
+    are clamped to the nearest end of the frontier. A return target below the
+    minimum-variance portfolio's return counts as met, since that portfolio beats it.
+    """
+    min_var = min_variance_weights(cov)
+    low, high = float(min_var @ mean_returns), float(mean_returns.max())
+
+    if target_volatility is not None:
+        def volatility(w):
+            return float(np.sqrt(w @ cov @ w))
+
+        if target_volatility <= volatility(min_var):
+            return min_var, target_volatility >= volatility(min_var) - 1e-9
+        top = np.eye(len(mean_returns))[mean_returns.argmax()]
+        if target_volatility >= volatility(top):
+            return top, False
+        # Volatility rises along the upper frontier, so bisect on the expected return
+        for _ in range(50):
+            middle = (low + high) / 2
+            if volatility(min_variance_weights(cov, mean_returns, middle)) < target_volatility:
+                low = middle
+            else:
+                high = middle
+        weights = min_variance_weights(cov, mean_returns, low)
+        return weights, abs(volatility(weights) - target_volatility) <= 1e-6
+
+    if target_return is None or target_return <= low:
+        return min_var, True
+    if target_return >= high:
+        return np.eye(len(mean_returns))[mean_returns.argmax()], target_return <= high + 1e-9
+    # Only report the target as met when the solved weights actually earn it
+    weights = min_variance_weights(cov, mean_returns, target_return)
+    return weights, abs(float(weights @ mean_returns) - target_return) <= 1e-6
+
+
+def integer_percentages(weights, labels, min_pct=1):
+    """Whole percentages summing to 100 (largest remainder), dropping positions below min_pct
+
+    When every position is below min_pct (a spread over more than 100/min_pct
+    assets) the largest 100 // min_pct positions are kept instead.
+    """
+    kept = weights * 100 >= min_pct
+    if not kept.any():
+        kept[np.argsort(-weights, kind='stable')[:max(int(100 // min_pct), 1)]] = True
+    weights = np.where(kept, weights, 0)
+    raw = weights / weights.sum() * 100
+    pct = np.floor(raw).astype(int)
+    pct[np.argsort(-(raw - pct))[:100 - pct.sum()]] += 1
+    return {label: int(p) for label, p in zip(labels, pct) if p > 0}
@@ -0,0 +1,70 @@
+import os
+import json
+import boto3
+from botocore.exceptions import ClientError
+
+
+class PriceStore:
+    """Durable per-ticker store of daily closing prices.
+
+    Each ticker is kept as one JSON document holding its closes and the last
+    date that has already been checked upstream, so callers only need to fetch
+    the dates after it (plus the last stored close, to notice when Yahoo has
+    re-adjusted the history for a split or dividend). Documents live in S3 (or in a local directory for tests
+    and offline runs) and are mirrored in memory for the life of a warm container.
+    """
+
+    def __init__(self, bucket_name=None, local_dir=None, prefix='price_history/'):
+        self.bucket_name = bucket_name
+        self.local_dir = local_dir
+        self.prefix = prefix
+        self.s3 = boto3.client('s3') if bucket_name and not local_dir else None
+        self._documents = {}
+
+    @classmethod
+    def from_environment(cls):
+        local_dir = os.environ.get('PRICE_STORE_DIR')
+        if local_dir:
+            return cls(local_dir=local_dir)
+        return cls(bucket_name=os.environ['S3_BUCKET_NAME'])
+
+    def _key(self, ticker):
+        return f"{self.prefix}{ticker}.json"
+
+    def load(self, ticker):
+        if ticker in self._documents:
+            return self._documents[ticker]
+
+        document = self._read(self._key(ticker)) or {"ticker": ticker, "checked_through": None, "prices": {}}
+        self._documents[ticker] = document
+        return document
+
+    def save(self, ticker, document):
+        self._documents[ticker] = document
+        self._write(self._key(ticker), json.dumps(document, separators=(',', ':')))
+
+    def _read(self, key):
+        if self.local_dir:
+            path = os.path.join(self.local_dir, key)
+            if not os.path.exists(path):
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+
+        try:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return json.loads(response['Body'].read().decode('utf-8'))
+
+    def _write(self, key, body):
+        if self.local_dir:
+            path = os.path.join(self.local_dir, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(body)
+            return
+
+        self.s3.put_object(Bucket=self.bucket_name, Key=key, Body=body.encode('utf-8'), ContentType='application/json')
@@ -1,5 +1,75 @@
+import os
 import json
-import yfinance as yf
+import time
+import pandas as pd
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from stress_test import FACTOR_TICKERS, run_stress_tests
+from risk_metrics import risk_metrics
+from news_cache import NewsCache, SentArticleIndex, content_hash
+from session_memo import SessionMemo
+from response_budget import ResponseBudget
+from market_snapshot import SnapshotStore, snapshot_age_seconds
+from market_calendar import DATA_SETTLE_DELAY, last_completed_session
+from market_data import provider_from_environment
+from deadline import Deadline, DeadlineExceeded
+
+
+MARKET_INDICATORS = {
+    "us_dollar_index": {"ticker": "DX-Y.NYB", "description": "US Dollar Strength Index"},
+    "us_10y_treasury_yield": {"ticker": "^TNX", "description": "US 10-Year Treasury Yield (%)"},
+    "us_2y_treasury_yield": {"ticker": "2YY=F", "description": "US 2-Year Treasury Yield (%)"},
+    "vix_volatility_index": {"ticker": "^VIX", "description": "VIX Index indicating market volatility"},
+    "crude_oil_price": {"ticker": "CL=F", "description": "WTI Crude Oil Futures Price (USD/barrel)"}
+}
+
+# Seconds to wait for the slowest indicator before returning the ones that arrived
+MARKET_DATA_TIMEOUT_SECONDS = float(os.environ.get('MARKET_DATA_TIMEOUT_SECONDS', '8'))
+# Seconds to wait for the daily closes of the stress test and risk metrics download
+HISTORY_TIMEOUT_SECONDS = float(os.environ.get('HISTORY_TIMEOUT_SECONDS', '20'))
+# Time kept back from the Lambda timeout to build and return the response
+DEADLINE_RESERVE_SECONDS = float(os.environ.get('DEADLINE_RESERVE_SECONDS', '2'))
+# Deadline of the current invocation; unbounded outside of lambda_handler
+deadline = Deadline()
+# Upper bound on the serialized news in a get_risk_context response
+MAX_RISK_CONTEXT_NEWS_BYTES = int(os.environ.get('MAX_RISK_CONTEXT_NEWS_BYTES', '12000'))
+
+# News only changes every few minutes and many ETFs surface the same articles
+news_cache = NewsCache(ttl_seconds=float(os.environ.get('NEWS_CACHE_TTL_SECONDS', '300')))
+sent_articles = SentArticleIndex()
+
+# Repeated calls with the same arguments within an agent session are answered from memory.
+# News tools are left out: within a session they already return repeated articles by reference.
+tool_memo = SessionMemo(
+    ttl_seconds=float(os.environ.get('TOOL_MEMO_TTL_SECONDS', '300')),
+    max_entries=int(os.environ.get('TOOL_MEMO_MAX_ENTRIES', '512'))
+)
+MEMOIZED_FUNCTIONS = {'get_market_data', 'stress_test_portfolio', 'get_risk_metrics'}
+
+# Outputs over the agent's response budget are downsampled, trimmed and paginated
+response_budget = ResponseBudget(
+    max_bytes=int(os.environ.get('MAX_RESPONSE_BYTES', '20000')),
+    max_tokens=int(os.environ.get('MAX_RESPONSE_TOKENS', '0')),
+    low_value_fields=('summary',)
+)
+
+# Indicators and hot-ticker news are refreshed into a shared snapshot on a schedule;
+# tools fall back to live Yahoo calls only once it is older than this
+MARKET_SNAPSHOT_MAX_AGE_SECONDS = float(os.environ.get('MARKET_SNAPSHOT_MAX_AGE_SECONDS', '900'))
+HOT_TICKERS = [ticker.strip() for ticker in os.environ.get('HOT_TICKERS', 'SPY,QQQ,IWM,TLT,IEF,GLD').split(',') if ticker.strip()]
+snapshot_store = None
+data_provider = None
+
+# Yahoo calls run on long-lived workers so their keep-alive connections survive between invocations
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', '16'))
+fetch_executor = None
+
+# Daily closes are kept from here on so the historical stress windows are covered
+HISTORY_START = date(2008, 1, 1)
+# ticker -> (last completed market session when fetched, closes); entries expire at the next close
+price_history = {}
+
+DEFAULT_CONFIDENCE_LEVELS = [0.95, 0.99]
 
 
 def get_named_parameter(event, name):
@@ -9,24 +79,197 @@ def get_named_parameter(event, name):
     return None
 
 
-def get_product_news(ticker, top_n=5):
+def get_data_provider():
+    global data_provider
+    if data_provider is None:
+        data_provider = provider_from_environment()
+    return data_provider
+
+
+def get_fetch_executor():
+    global fetch_executor
+    if fetch_executor is None:
+        fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    return fetch_executor
+
+
+def cancel_pending(futures):
+    # Don't hold the response for fetches that already missed the deadline
+    for future in futures:
+        future.cancel()
+
+
+def log_connection_stats():
+    if data_provider is not None:
+        print(f"Market data connections: {json.dumps(data_provider.connection_stats())}")
+
+
+def get_snapshot_store():
+    global snapshot_store
+    if snapshot_store is None:
+        snapshot_store = SnapshotStore.from_environment()
+    return snapshot_store
+
+
+def fresh_snapshot():
+    # A missing, unreadable or outdated snapshot just means a live fetch
     try:
-        stock = yf.Ticker(ticker)
-        news = stock.news[:top_n]
-
-        formatted_news = []
-        for item in news:
-            content = item.get("content", "")
-            news_item = {
-                "title": content.get("title", ""),
-                "summary": content.get("summary", ""),
-                "publish_date": content.get("pubDate", "")[:10]
-            }
-            formatted_news.append(news_item)
+        snapshot = get_snapshot_store().load()
+    except Exception as e:
+        print(f"Error reading market snapshot: {e}")
+        return None
+    if snapshot is None or snapshot_age_seconds(snapshot) > MARKET_SNAPSHOT_MAX_AGE_SECONDS:
+        return None
+    return snapshot
+
+
+def parse_tickers(value):
+    # Array parameters arrive from the agent as a string, e.g. '["SPY", "QQQ"]' or 'SPY, QQQ'
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.strip('[]').split(',')
+    if isinstance(value, str):
+        value = [value]
+
+    tickers = []
+    for ticker in value or []:
+        ticker = str(ticker).strip().strip('"\'')
+        if ticker and ticker not in tickers:
+            tickers.append(ticker)
+    return tickers
+
+
+def parse_allocation(value):
+    # Object parameters arrive as a JSON string, e.g. '{"SPY": 50, "QQQ": 30, "TLT": 20}'
+    allocation = json.loads(value) if isinstance(value, str) else value
+    if not isinstance(allocation, dict) or not allocation:
+        raise ValueError("Allocation must be a non-empty object of ticker to weight")
+
+    weights = pd.Series({str(ticker).strip(): float(weight) for ticker, weight in allocation.items()})
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("Allocation weights must be non-negative and not all zero")
+    return weights / weights.sum()
+
+
+def parse_confidence_levels(value):
+    # Accepts '[0.95, 0.99]', '95, 99' or a list; percentages are converted to fractions
+    if value in (None, '', '[]'):
+        return DEFAULT_CONFIDENCE_LEVELS
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.strip('[]').split(',')
+    if not isinstance(value, list):
+        value = [value]
+
+    levels = sorted({float(level) / 100 if float(level) > 1 else float(level) for level in value})
+    if not all(0.5 <= level < 1 for level in levels):
+        raise ValueError("Confidence levels must be between 50% and 100%")
+    return levels
+
+
+def load_close_history(tickers):
+    """Daily closes since HISTORY_START, downloading in one request only the tickers not fetched since the last close"""
+    session = last_completed_session(settle=DATA_SETTLE_DELAY)
+    stale = [ticker for ticker in tickers if price_history.get(ticker, (None,))[0] != session]
+
+    if stale:
+        try:
+            closes = deadline.run(
+                get_fetch_executor(), f"price history for {', '.join(stale)}",
+                lambda: get_data_provider().batch_history(stale, HISTORY_START, session + timedelta(days=1)),
+                HISTORY_TIMEOUT_SECONDS
+            )
+        except DeadlineExceeded as e:
+            # Carry on with the closes from an earlier session, if any; the output is marked incomplete
+            print(f"Error fetching price history: {e}")
+            closes = {}
+        for ticker, series in closes.items():
+            # Keyed by the last close actually returned, so a series still missing the session is fetched again next call
+            if not series.empty:
+                price_history[ticker] = (series.index.max().date(), series)
+
+    return pd.DataFrame({ticker: price_history[ticker][1] for ticker in tickers if ticker in price_history})
+
+
+def parse_max_age(value):
+    # Seconds of staleness the caller accepts; None uses the cache TTL and 0 forces a fresh fetch
+    if value in (None, ''):
+        return None
+    max_age = float(value)
+    if max_age < 0:
+        raise ValueError("max_age must not be negative")
+    return max_age
+
+
+def fetch_news(ticker, top_n=None):
+    news = get_data_provider().news(ticker)[:top_n]
+
+    formatted_news = []
+    for item in news:
+        content = item.get("content", "")
+        news_item = {
+            "title": content.get("title", ""),
+            "summary": content.get("summary", ""),
+            "publish_date": content.get("pubDate", "")[:10]
+        }
+        news_item["id"] = content_hash(news_item)
+        formatted_news.append(news_item)
+    return formatted_news
+
+
+def snapshot_or_live_news(ticker, max_age=None):
+    """News of the ticker with its age in seconds: from the snapshot when it is recent enough for max_age, otherwise live"""
+    max_age = news_cache.ttl_seconds if max_age is None else max_age
+    snapshot = fresh_snapshot() if max_age > 0 else None
+    if snapshot is not None and snapshot["news"].get(ticker):
+        age = max(snapshot_age_seconds(snapshot), 0)
+        if age <= max_age:
+            return snapshot["news"][ticker], age
+    return fetch_news(ticker), 0
+
+
+def cached_news(ticker, top_n=5, max_age=None):
+    # The whole feed is cached so any top_n can be served from it
+    return news_cache.get(ticker, lambda: snapshot_or_live_news(ticker, max_age), max_age)[:top_n]
+
+
+def unsent_news(articles, ticker, session_id):
+    """Articles already returned earlier in the session are replaced by a reference to their id"""
+    news = []
+    for article in articles:
+        sent_with = sent_articles.first_sent_with(session_id, article["id"])
+        news.append({"id": article["id"], "already_sent_with": sent_with} if sent_with else article)
+    return news
+
+
+def record_sent_news(session_id, output):
+    """Record the articles of a response as sent in the session, once it is known which page was returned"""
+    body = output.get("result", output) if isinstance(output, dict) and "truncation" in output else output
+    if not session_id or not isinstance(body, dict) or not isinstance(body.get("news"), list):
+        return
+    for article in body["news"]:
+        if "id" in article and "already_sent_with" not in article:
+            sent_articles.record(session_id, article["id"], (article.get("tickers") or [body.get("ticker")])[0])
+
+
+def get_product_news(ticker, top_n=5, max_age=None, session_id=None):
+    try:
+        max_age = parse_max_age(max_age)
+        try:
+            articles = deadline.run(
+                get_fetch_executor(), f"news for {ticker}", lambda: cached_news(ticker, top_n, max_age), MARKET_DATA_TIMEOUT_SECONDS
+            )
+        except DeadlineExceeded as e:
+            print(f"Error fetching news for {ticker}: {e}")
+            articles = []
 
         result = {
             "ticker": ticker,
-            "news": formatted_news,
+            "news": unsent_news(articles, ticker, session_id),
         }
 
         return result
@@ -36,25 +279,50 @@ def get_product_news(ticker, top_n=5):
         return {"error": str(e)}
 
 
-def get_market_data():
-    try:
-        market_info = {
-            "us_dollar_index": {"ticker": "DX-Y.NYB", "description": "US Dollar Strength Index"},
-            "us_10y_treasury_yield": {"ticker": "^TNX", "description": "US 10-Year Treasury Yield (%)"},
-            "us_2y_treasury_yield": {"ticker": "2YY=F", "description": "US 2-Year Treasury Yield (%)"},
-            "vix_volatility_index": {"ticker": "^VIX", "description": "VIX Index indicating market volatility"},
-            "crude_oil_price": {"ticker": "CL=F", "description": "WTI Crude Oil Futures Price (USD/barrel)"}
-        }
+def fetch_previous_close(ticker):
+    return get_data_provider().quote(ticker).get('regularMarketPreviousClose', 0)
+
 
-        data = {}
-        for key, info in market_info.items():
-            ticker = yf.Ticker(info["ticker"])
-            market_price = ticker.info.get('regularMarketPreviousClose', 0)
+def submit_market_data(executor):
+    # .info is the slowest Yahoo endpoint, so request every indicator at once
+    return {key: executor.submit(fetch_previous_close, info["ticker"]) for key, info in MARKET_INDICATORS.items()}
+
+
+def collect_market_data(futures, timeout):
+    """Indicator values from futures that have already been waited on; unfinished or failed ones carry an error"""
+    data = {}
+    for key, info in MARKET_INDICATORS.items():
+        future = futures[key]
+        data[key] = {"description": info["description"], "value": None}
+        if not future.done():
+            data[key]["error"] = f"Timed out after {timeout:g}s"
+            deadline.miss(f"market data for {info['ticker']}")
+        elif future.exception() is not None:
+            data[key]["error"] = str(future.exception())
+            deadline.fail(f"market data for {info['ticker']}")
+        else:
+            data[key]["value"] = round(future.result(), 2)
+
+    failed = [key for key, item in data.items() if "error" in item]
+    if failed:
+        print(f"Market data unavailable for: {', '.join(failed)}")
+    return data
+
+
+def get_market_data(timeout=None, use_snapshot=True):
+    snapshot = fresh_snapshot() if use_snapshot else None
+    if snapshot is not None:
+        return snapshot["market_data"]
+
+    timeout = deadline.budget(MARKET_DATA_TIMEOUT_SECONDS if timeout is None else timeout)
+    futures = {}
+    try:
+        futures = submit_market_data(get_fetch_executor())
+        deadline.wait(futures.values(), timeout)
 
-            data[key] = {
-                "description": info["description"],
-                "value": round(market_price, 2)
-            }
+        data = collect_market_data(futures, timeout)
+        if all("error" in item for item in data.values()):
+            return {"error": "Market data is unavailable"}
 
         return data
 
@@ -62,20 +330,237 @@ def get_market_data():
         print(f"Error fetching market data: {e}")
         return {"error": str(e)}
 
+    finally:
+        cancel_pending(futures.values())
 
-def lambda_handler(event, context):
-    action_group = event.get('actionGroup', '')
-    message_version = event.get('messageVersion', '')
-    function = event.get('function', '')
 
+def merge_news(news_by_ticker, max_bytes):
+    """Deduplicated articles tagged with every ticker that surfaced them, cut off at max_bytes.
+
+    Tickers take turns so every holding gets its top stories in before any
+    ticker's lower-ranked ones.
+    """
+    articles = {}
+    for rank in range(max((len(news) for news in news_by_ticker.values()), default=0)):
+        for ticker, news in news_by_ticker.items():
+            if rank >= len(news):
+                continue
+            article_id = news[rank]["id"]
+            if article_id in articles:
+                if ticker not in articles[article_id]["tickers"]:
+                    articles[article_id]["tickers"].append(ticker)
+            else:
+                articles[article_id] = {**news[rank], "tickers": [ticker]}
+
+    kept, size = [], 0
+    for article in articles.values():
+        size += len(json.dumps(article, ensure_ascii=False)) + 2
+        if size > max_bytes:
+            break
+        kept.append(article)
+    return kept, len(articles) - len(kept)
+
+
+def get_risk_context(tickers, top_n=5, max_age=None, session_id=None, timeout=None):
+    if not tickers:
+        return {"error": "No tickers provided"}
+
+    timeout = deadline.budget(MARKET_DATA_TIMEOUT_SECONDS if timeout is None else timeout)
+    market_futures, news_futures = {}, {}
+    try:
+        max_age = parse_max_age(max_age)
+        snapshot = fresh_snapshot()
+        # Indicators and every ticker's news share one deadline instead of one agent turn each
+        executor = get_fetch_executor()
+        market_futures = submit_market_data(executor) if snapshot is None else {}
+        news_futures = {ticker: executor.submit(cached_news, ticker, top_n, max_age) for ticker in tickers}
+        deadline.wait([*market_futures.values(), *news_futures.values()], timeout)
+
+        news_by_ticker, news_errors = {}, {}
+        for ticker, future in news_futures.items():
+            if not future.done():
+                news_errors[ticker] = f"Timed out after {timeout:g}s"
+                deadline.miss(f"news for {ticker}")
+            elif future.exception() is not None:
+                news_errors[ticker] = str(future.exception())
+            else:
+                news_by_ticker[ticker] = future.result()
+
+        news, omitted = merge_news(news_by_ticker, MAX_RISK_CONTEXT_NEWS_BYTES)
+        for i, article in enumerate(news):
+            sent_with = sent_articles.first_sent_with(session_id, article["id"])
+            if sent_with:
+                news[i] = {"id": article["id"], "tickers": article["tickers"], "already_sent_with": sent_with}
+        output = {
+            "market_data": snapshot["market_data"] if snapshot is not None else collect_market_data(market_futures, timeout),
+            "news": news,
+            "omitted_articles": omitted
+        }
+        if news_errors:
+            print(f"News unavailable for: {', '.join(news_errors)}")
+            output["news_errors"] = news_errors
+        return output
+
+    except Exception as e:
+        print(f"Error fetching risk context: {e}")
+        return {"error": str(e)}
+
+    finally:
+        cancel_pending([*market_futures.values(), *news_futures.values()])
+
+
+def refresh_market_snapshot():
+    """Fetch the indicators and hot-ticker news live and publish them as the shared snapshot"""
+    market_data = get_market_data(use_snapshot=False)
+    if "error" in market_data:
+        # Keep the previous snapshot; readers fall back to live calls once it ages out
+        raise RuntimeError(market_data["error"])
+
+    news = {}
+    futures = {ticker: get_fetch_executor().submit(fetch_news, ticker) for ticker in HOT_TICKERS}
+    deadline.wait(futures.values(), MARKET_DATA_TIMEOUT_SECONDS)
+    for ticker, future in futures.items():
+        try:
+            # Tickers that missed the deadline keep their news from the previous snapshot out
+            news[ticker] = future.result(timeout=0)
+        except Exception as e:
+            print(f"Error fetching news for {ticker}: {e}")
+    cancel_pending(futures.values())
+
+    generated_at = time.time()
+    get_snapshot_store().save({
+        "generated_at": generated_at,
+        "generated_at_utc": datetime.fromtimestamp(generated_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "market_data": market_data,
+        "news": news
+    })
+    return {"indicators": len(market_data), "news_tickers": sorted(news)}
+
+
+def stress_test_portfolio(allocation, amount=None):
+    try:
+        weights = parse_allocation(allocation)
+        history = load_close_history(list(weights.index) + FACTOR_TICKERS)
+
+        missing = [ticker for ticker in weights.index if ticker not in history.columns]
+        if missing:
+            return {"error": f"No price history for: {', '.join(missing)}"}
+
+        scenarios = run_stress_tests(history[list(weights.index)], history[[t for t in FACTOR_TICKERS if t in history]], weights)
+        if amount not in (None, ''):
+            for result in scenarios.values():
+                if "pnl_pct" in result:
+                    result["pnl_amount"] = round(float(amount) * result["pnl_pct"] / 100, 2)
+
+        return {
+            "allocation_pct": {ticker: round(float(weight) * 100, 2) for ticker, weight in weights.items()},
+            "scenarios": scenarios
+        }
+
+    except Exception as e:
+        print(f"Error running stress tests: {e}")
+        return {"error": str(e)}
+
+
+def get_risk_metrics(allocation, confidence_levels=None, lookback_years=5, amount=None):
+    try:
+        weights = parse_allocation(allocation)
+        levels = parse_confidence_levels(confidence_levels)
+        lookback_years = int(lookback_years or 5)
+
+        history = load_close_history(list(weights.index))
+        missing = [ticker for ticker in weights.index if ticker not in history.columns]
+        if missing:
+            return {"error": f"No price history for: {', '.join(missing)}"}
+
+        # One aligned matrix for every ticker; the window shrinks to the youngest ticker's history
+        start = pd.Timestamp(datetime.today().date()) - pd.DateOffset(years=lookback_years)
+        prices = history.loc[start:, list(weights.index)].ffill().dropna()
+        if len(prices) < 60:
+            return {"error": "Not enough overlapping price history"}
+
+        metrics = risk_metrics(prices.to_numpy(), weights.to_numpy(), levels)
+
+        output = {
+            "history": f"{prices.index[0].strftime('%Y-%m-%d')} to {prices.index[-1].strftime('%Y-%m-%d')}",
+            "trading_days": len(prices),
+            "metrics": {}
+        }
+        for level, values in metrics.items():
+            output["metrics"][level] = {f"{name}_pct": round(value * 100, 2) for name, value in values.items()}
+            if amount not in (None, ''):
+                output["metrics"][level].update({f"{name}_amount": round(value * float(amount), 2) for name, value in values.items()})
+        return output
+
+    except Exception as e:
+        print(f"Error computing risk metrics: {e}")
+        return {"error": str(e)}
+
+
+def refresh_handler(event, context):
+    # Entry point of the scheduled refresher Lambda
+    global deadline
+    deadline = Deadline.from_context(context, DEADLINE_RESERVE_SECONDS)
+    result = refresh_market_snapshot()
+    print(f"Market snapshot refreshed: {json.dumps(result)}")
+    log_connection_stats()
+    return result
+
+
+def dispatch(function, event):
     if function == 'get_product_news':
         ticker = get_named_parameter(event, "ticker")
-        output = get_product_news(ticker)
+        max_age = get_named_parameter(event, "max_age")
+        output = get_product_news(ticker, max_age=max_age, session_id=event.get('sessionId'))
     elif function == 'get_market_data':
         output = get_market_data()
+    elif function == 'get_risk_context':
+        tickers = parse_tickers(get_named_parameter(event, "tickers"))
+        max_age = get_named_parameter(event, "max_age")
+        output = get_risk_context(tickers, max_age=max_age, session_id=event.get('sessionId'))
+    elif function == 'stress_test_portfolio':
+        allocation = get_named_parameter(event, "allocation")
+        amount = get_named_parameter(event, "amount")
+        output = stress_test_portfolio(allocation, amount)
+    elif function == 'get_risk_metrics':
+        output = get_risk_metrics(
+            get_named_parameter(event, "allocation"),
+            get_named_parameter(event, "confidence_levels"),
+            get_named_parameter(event, "lookback_years"),
+            get_named_parameter(event, "amount")
+        )
     else:
         output = 'Invalid function'
 
+    return output
+
+
+def lambda_handler(event, context):
+    action_group = event.get('actionGroup', '')
+    message_version = event.get('messageVersion', '')
+    function = event.get('function', '')
+
+    # The continuation token only selects a page of the output, so it is not part of the call itself
+    continuation_token = get_named_parameter(event, "continuation_token")
+    parameters = [param for param in event.get('parameters') or [] if param['name'] != 'continuation_token']
+    event = {**event, 'parameters': parameters}
+
+    # Fetches share what is left of the Lambda timeout; whatever they could not finish is marked incomplete
+    global deadline
+    deadline = Deadline.from_context(context, DEADLINE_RESERVE_SECONDS)
+
+    def run():
+        if deadline.expired():
+            return {"error": "No time left to run the tool", "incomplete": True}
+        return deadline.mark(dispatch(function, event))
+
+    if function in MEMOIZED_FUNCTIONS:
+        output = tool_memo.call(event.get('sessionId'), function, parameters, run)
+    else:
+        output = run()
+    output = response_budget.apply(function, parameters, output, continuation_token)
+    record_sent_news(event.get('sessionId'), output)
+
     action_response = {
         'actionGroup': action_group,
         'function': function,
@@ -86,5 +571,11 @@ def lambda_handler(event, context):
 
     function_response = {'response': action_response, 'messageVersion': message_version}
     print("Response: {}".format(json.dumps(function_response, ensure_ascii=False)))
+    log_connection_stats()
+
+    return function_response
+
 
-    return function_response
\ No newline at end of file
+if __name__ == "__main__":
+    # Local refresh against a directory standing in for S3: MARKET_SNAPSHOT_DIR=/tmp/snapshot python lambda_function.py
+    refresh_handler({}, None)
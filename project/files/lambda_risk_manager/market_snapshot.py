@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+
+class SnapshotStore:
+    """Latest market snapshot written by the scheduled refresher.
+
+    The snapshot is one JSON document holding the macro indicators and the news
+    of the hot tickers, stamped with the time it was generated. It lives in S3
+    (or in a local directory, which stands in for the bucket when running the
+    refresher and the tools offline). Reads are mirrored in memory and only go
+    back to storage once the in-memory copy is older than `reload_seconds`.
+    S3 calls get `timeout_seconds` and at most one retry, so a slow read costs the
+    tools seconds rather than minutes before they fall back to live calls.
+    """
+
+    def __init__(self, bucket_name=None, local_dir=None, key='market_snapshot/latest.json', reload_seconds=60,
+                 timeout_seconds=2):
+        self.bucket_name = bucket_name
+        self.local_dir = local_dir
+        self.key = key
+        self.reload_seconds = reload_seconds
+        self.s3 = None
+        if bucket_name and not local_dir:
+            config = Config(connect_timeout=timeout_seconds, read_timeout=timeout_seconds, retries={'max_attempts': 1})
+            self.s3 = boto3.client('s3', config=config)
+        self._snapshot = None
+        self._loaded_at = 0.0
+
+    @classmethod
+    def from_environment(cls):
+        local_dir = os.environ.get('MARKET_SNAPSHOT_DIR')
+        if local_dir:
+            return cls(local_dir=local_dir)
+        return cls(bucket_name=os.environ['S3_BUCKET_NAME'],
+                   timeout_seconds=float(os.environ.get('MARKET_SNAPSHOT_S3_TIMEOUT_SECONDS', '2')))
+
+    def load(self):
+        if self._snapshot is None or time.monotonic() - self._loaded_at >= self.reload_seconds:
+            self._snapshot = self._read()
+            self._loaded_at = time.monotonic()
+        return self._snapshot
+
+    def save(self, snapshot):
+        self._snapshot = snapshot
+        self._loaded_at = time.monotonic()
+        self._write(json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')))
+
+    def _read(self):
+        if self.local_dir:
+            path = os.path.join(self.local_dir, self.key)
+            if not os.path.exists(path):
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+
+        try:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=self.key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return json.loads(response['Body'].read().decode('utf-8'))
+
+    def _write(self, body):
+        if self.local_dir:
+            path = os.path.join(self.local_dir, self.key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(body)
+            return
+
+        self.s3.put_object(Bucket=self.bucket_name, Key=self.key, Body=body.encode('utf-8'), ContentType='application/json')
+
+
+def snapshot_age_seconds(snapshot):
+    return time.time() - snapshot["generated_at"]
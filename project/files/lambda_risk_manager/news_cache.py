@@ -0,0 +1,82 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_hash(article):
+    """Short stable id of an article; the same story syndicated under several ETFs differs at most in casing or spacing"""
+    title = " ".join(article.get("title", "").lower().split())
+    return hashlib.sha1(f"{title}|{article.get('publish_date', '')}".encode('utf-8')).hexdigest()[:12]
+
+
+class NewsCache:
+    """Formatted news per ticker kept for the life of a warm container.
+
+    Entries are fresh for `ttl_seconds`; a caller may pass a larger (or smaller)
+    max_age to trade freshness for latency. Entries are not expired on their own,
+    only evicted least-recently-used beyond `max_tickers`, so stale data stays
+    available to callers that accept it. Safe to use from a thread pool.
+
+    fetch() returns the articles together with their age in seconds, so data
+    that was already old when fetched (a stored snapshot) keeps its real age.
+    """
+
+    def __init__(self, ttl_seconds=300, max_tickers=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_tickers = max_tickers
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hit": 0, "miss": 0}
+
+    def get(self, ticker, fetch, max_age=None):
+        max_age = self.ttl_seconds if max_age is None else max_age
+        with self.lock:
+            entry = self.entries.get(ticker)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                self.entries.move_to_end(ticker)
+                return self._record("hit", entry[1])
+
+        # Fetch outside the lock so tickers are still fetched concurrently
+        articles, age = fetch()
+        with self.lock:
+            self.entries[ticker] = (time.monotonic() - age, articles)
+            self.entries.move_to_end(ticker)
+            while len(self.entries) > self.max_tickers:
+                self.entries.popitem(last=False)
+            return self._record("miss", articles)
+
+    def _record(self, outcome, articles):
+        self.stats[outcome] += 1
+        print(f"News cache {outcome}: {json.dumps(self.stats)}")
+        return articles
+
+
+class SentArticleIndex:
+    """Content hashes of the articles already returned in each agent session.
+
+    Lets later calls in the same session refer to an article by id instead of
+    serializing it again. Articles are recorded once they are actually in a
+    response, so a page that was cut off by the response budget is not
+    counted as sent. Only the most recent `max_sessions` sessions are kept.
+    """
+
+    def __init__(self, max_sessions=256):
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+
+    def first_sent_with(self, session_id, article_id):
+        """Ticker the article was first returned with in this session, None if it wasn't yet"""
+        if not session_id:
+            return None
+        return self.sessions.get(session_id, {}).get(article_id)
+
+    def record(self, session_id, article_id, ticker):
+        if not session_id:
+            return
+        sent = self.sessions.setdefault(session_id, {})
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        sent.setdefault(article_id, ticker)
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def horizon_returns(returns, horizon):
+    """Overlapping compounded returns over horizon days, taken directly from the history (no sqrt-time scaling)"""
+    if horizon == 1:
+        return returns
+    cumulative = np.concatenate([[0.0], np.cumsum(np.log1p(returns))])
+    return np.expm1(cumulative[horizon:] - cumulative[:-horizon])
+
+
+def value_at_risk(returns, confidence_levels, horizon=1):
+    """Historical-simulation VaR and Expected Shortfall for every confidence level at once.
+
+    Losses are positive fractions of portfolio value. Expected Shortfall is the
+    mean loss at or beyond the VaR quantile.
+    """
+    losses = -horizon_returns(np.asarray(returns, dtype=float), horizon)
+    levels = np.asarray(confidence_levels, dtype=float)
+
+    var = np.quantile(losses, levels)
+    tail = losses[None, :] >= var[:, None]
+    es = (tail * losses[None, :]).sum(axis=1) / tail.sum(axis=1)
+    return var, es
+
+
+def risk_metrics(prices, weights, confidence_levels, horizons=(1, 10)):
+    """VaR/ES of a daily rebalanced portfolio from an aligned (days x tickers) price matrix"""
+    returns = (prices[1:] / prices[:-1] - 1) @ weights
+
+    metrics = {f"{level * 100:g}%": {} for level in confidence_levels}
+    for horizon in horizons:
+        var, es = value_at_risk(returns, confidence_levels, horizon)
+        for level, v, e in zip(confidence_levels, var, es):
+            metrics[f"{level * 100:g}%"][f"var_{horizon}d"] = float(v)
+            metrics[f"{level * 100:g}%"][f"es_{horizon}d"] = float(e)
+    return metrics
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+
+# Historical windows replayed against today's allocation (peak to trough of the broad market)
+HISTORICAL_SCENARIOS = {
+    "global_financial_crisis_2008": {
+        "description": "Lehman collapse to the March 2009 market bottom",
+        "start": "2008-09-01",
+        "end": "2009-03-09"
+    },
+    "taper_tantrum_2013": {
+        "description": "Bond selloff after the Fed signalled tapering of asset purchases",
+        "start": "2013-05-22",
+        "end": "2013-06-24"
+    },
+    "q4_selloff_2018": {
+        "description": "Fourth-quarter 2018 selloff on rate hikes and trade tensions",
+        "start": "2018-10-03",
+        "end": "2018-12-24"
+    },
+    "covid_crash_2020": {
+        "description": "COVID-19 pandemic crash",
+        "start": "2020-02-19",
+        "end": "2020-03-23"
+    },
+    "rate_hikes_2022": {
+        "description": "2022 inflation and Fed hiking cycle hitting stocks and bonds together",
+        "start": "2022-01-03",
+        "end": "2022-10-12"
+    }
+}
+
+# Single-factor shocks translated into asset returns through each asset's beta to the factor.
+# "change" factors are measured in points (yield %, VIX level); "return" factors in relative price change.
+PARAMETRIC_SCENARIOS = {
+    "rate_spike": {
+        "description": "US 10-year Treasury yield rises 100bp",
+        "factor": "^TNX",
+        "kind": "change",
+        "shock": 1.0
+    },
+    "volatility_spike": {
+        "description": "VIX jumps 15 points",
+        "factor": "^VIX",
+        "kind": "change",
+        "shock": 15.0
+    },
+    "oil_shock": {
+        "description": "WTI crude oil rises 30%",
+        "factor": "CL=F",
+        "kind": "return",
+        "shock": 0.30
+    },
+    "oil_collapse": {
+        "description": "WTI crude oil falls 40%",
+        "factor": "CL=F",
+        "kind": "return",
+        "shock": -0.40
+    }
+}
+
+FACTOR_TICKERS = sorted({scenario["factor"] for scenario in PARAMETRIC_SCENARIOS.values()})
+
+
+def factor_moves(factors):
+    """Daily factor moves (point changes or returns), winsorized so bad prints such as negative oil don't dominate"""
+    moves = pd.DataFrame({
+        ticker: factors[ticker].diff() if kind == "change" else factors[ticker].pct_change()
+        for ticker, kind in {s["factor"]: s["kind"] for s in PARAMETRIC_SCENARIOS.values()}.items()
+        if ticker in factors
+    })
+    return moves.clip(moves.quantile(0.01), moves.quantile(0.99), axis=1)
+
+
+def factor_betas(asset_returns, moves):
+    """(factors x assets) matrix of univariate betas, computed for every pair in one pass"""
+    joined = pd.concat([asset_returns, moves], axis=1, keys=["asset", "factor"]).dropna()
+    assets = joined["asset"].to_numpy()
+    factors = joined["factor"].to_numpy()
+    assets = assets - assets.mean(axis=0)
+    factors = factors - factors.mean(axis=0)
+    betas = (factors.T @ assets) / (factors ** 2).sum(axis=0)[:, None]
+    return pd.DataFrame(betas, index=joined["factor"].columns, columns=joined["asset"].columns)
+
+
+def scenario_returns(prices, factors, beta_window_days=504):
+    """(scenarios x assets) matrix of asset returns under every scenario, NaN where an asset has no data"""
+    rows = {}
+    for name, scenario in HISTORICAL_SCENARIOS.items():
+        window = prices.loc[scenario["start"]:scenario["end"]]
+        if len(window) < 2:
+            rows[name] = pd.Series(np.nan, index=prices.columns)
+            continue
+        # Assets that were not trading for the whole window are left out of the scenario
+        complete = window.notna().iloc[[0, -1]].all()
+        rows[name] = (window.iloc[-1] / window.iloc[0] - 1).where(complete)
+
+    recent_returns = prices.pct_change(fill_method=None).iloc[-beta_window_days:]
+    betas = factor_betas(recent_returns, factor_moves(factors).iloc[-beta_window_days:])
+    for name, scenario in PARAMETRIC_SCENARIOS.items():
+        if scenario["factor"] in betas.index:
+            rows[name] = betas.loc[scenario["factor"]] * scenario["shock"]
+        else:
+            rows[name] = pd.Series(np.nan, index=prices.columns)
+
+    return pd.DataFrame(rows).T
+
+
+def window_drawdowns(prices, weights):
+    """Worst peak-to-trough decline of the portfolio inside each historical window"""
+    drawdowns = {}
+    for name, scenario in HISTORICAL_SCENARIOS.items():
+        window = prices.loc[scenario["start"]:scenario["end"]].ffill()
+        available = window.columns[window.notna().all()]
+        if len(window) < 2 or available.empty:
+            continue
+        w = weights[available] / weights[available].sum()
+        value = (window[available] / window[available].iloc[0]).to_numpy() @ w.to_numpy()
+        drawdowns[name] = float((value / np.maximum.accumulate(value) - 1).min())
+    return drawdowns
+
+
+def run_stress_tests(prices, factors, weights):
+    """Apply every scenario to the allocation.
+
+    prices: daily closes (dates x tickers) covering the historical windows
+    factors: daily closes of FACTOR_TICKERS
+    weights: Series of allocation weights summing to 1, indexed by ticker
+    """
+    shocks = scenario_returns(prices[weights.index], factors)
+    covered = shocks.notna()
+
+    # Weighted P&L of every scenario at once; assets without data are excluded and the rest re-weighted
+    contributions = shocks.fillna(0) * weights
+    coverage = covered.astype(float) @ weights
+    pnl = contributions.sum(axis=1) / coverage.where(coverage > 0)
+    drawdowns = window_drawdowns(prices[weights.index], weights)
+
+    results = {}
+    for name, scenario in {**HISTORICAL_SCENARIOS, **PARAMETRIC_SCENARIOS}.items():
+        if np.isnan(pnl[name]):
+            results[name] = {"description": scenario["description"], "error": "No price history for this scenario"}
+            continue
+        result = {
+            "type": "historical" if name in HISTORICAL_SCENARIOS else "parametric",
+            "description": scenario["description"],
+            "pnl_pct": round(float(pnl[name]) * 100, 2),
+            "max_drawdown_pct": round(min(drawdowns.get(name, float(pnl[name])), 0.0) * 100, 2),
+            "contributions_pct": {
+                ticker: round(float(contributions.loc[name, ticker]) * 100, 2)
+                for ticker in weights.index if covered.loc[name, ticker]
+            },
+            "coverage_pct": round(float(coverage[name]) * 100, 2)
+        }
+        if name in HISTORICAL_SCENARIOS:
+            result["window"] = f"{scenario['start']} to {scenario['end']}"
+        results[name] = result
+    return results
@@ -0,0 +1,102 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError, wait
+
+
+class DeadlineExceeded(Exception):
+    """An upstream fetch did not finish within its time budget"""
+
+
+class Deadline:
+    """Time left in the current invocation, shared by every upstream fetch of a tool call.
+
+    lambda_handler starts one from context.get_remaining_time_in_millis(),
+    keeping `reserve_seconds` back to serialize and return the response. Each
+    fetch gets the smaller of its own budget and the time left, runs on a
+    worker thread and is abandoned once the budget runs out, so a slow Yahoo
+    call costs the tool its data rather than the whole invocation. Fetches cut
+    short, and fetches that failed outright, are recorded, and mark() flags the
+    output as incomplete so it is not memoized. The flags go on an envelope
+    around the data, so they never mix with its keys (a batch keyed by ticker
+    stays just tickers).
+
+    Without a Lambda context (local runs, benchmarks) there is no deadline and
+    only the per-fetch budgets apply.
+    """
+
+    def __init__(self, seconds=None):
+        self.expires_at = None if seconds is None else time.monotonic() + max(seconds, 0)
+        self.missed = []
+        self.failed = []
+
+    @classmethod
+    def from_context(cls, context, reserve_seconds=0):
+        remaining_millis = getattr(context, 'get_remaining_time_in_millis', None)
+        if remaining_millis is None:
+            return cls()
+        return cls(remaining_millis() / 1000 - reserve_seconds)
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def expired(self):
+        return self.remaining() == 0
+
+    def budget(self, seconds=None):
+        """Seconds a fetch may take: its own budget capped by the time left, None when neither limits it"""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        return remaining if seconds is None else min(seconds, remaining)
+
+    def miss(self, description):
+        if description not in self.missed:
+            self.missed.append(description)
+
+    def fail(self, description):
+        if description not in self.failed:
+            self.failed.append(description)
+
+    def run(self, executor, description, fetch, seconds=None):
+        """Result of fetch() run on executor, or DeadlineExceeded once its budget is spent"""
+        timeout = self.budget(seconds)
+        if timeout is not None and timeout <= 0:
+            self.miss(description)
+            raise DeadlineExceeded(f"No time left for {description}")
+
+        future = executor.submit(fetch)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # A fetch that already started can't be stopped; its result is just not waited for
+            future.cancel()
+            self.miss(description)
+            raise DeadlineExceeded(f"{description} did not finish within {timeout:.1f}s")
+
+    def wait(self, futures, seconds=None):
+        """Wait for futures within budget; returns the ones still pending"""
+        return wait(list(futures), timeout=self.budget(seconds)).not_done
+
+    def mark(self, output):
+        """output as {"result": output, "incomplete": true, "timed_out"/"failed": [...]} when fetches were cut short or failed.
+
+        Error outputs carry no data, so they are flagged in place.
+        """
+        if not (self.missed or self.failed):
+            return output
+        markers = {"incomplete": True}
+        if self.missed:
+            markers["timed_out"] = list(self.missed)
+        if self.failed:
+            markers["failed"] = list(self.failed)
+        if isinstance(output, dict) and "error" in output:
+            return {**output, **markers}
+        return {"result": output, **markers}
+
+
+def split_markers(output):
+    """(data, markers) of an output wrapped by Deadline.mark(); markers are empty for any other output"""
+    if isinstance(output, dict) and output.get("incomplete") and "result" in output:
+        return output["result"], {key: value for key, value in output.items() if key != "result"}
+    return output, {}
@@ -0,0 +1,286 @@
+"""Market data access behind one interface, so tools, tests and benchmarks can swap the upstream.
+
+YFinanceProvider talks to Yahoo Finance over one pooled keep-alive session;
+FixtureProvider replays responses recorded to a directory (optionally with
+injected latency) and needs no network. RecordingProvider wraps a live
+provider and writes what it returns in the fixture layout.
+"""
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+import pandas as pd
+import yfinance as yf
+from yfinance.data import YfData
+from curl_cffi import requests as curl_requests
+from curl_cffi.const import CurlInfo
+
+
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Longest a single HTTP request may take; yfinance asks for 30s, which lets a hung
+# connection hold a worker thread long after the tool call gave up on it
+HTTP_TIMEOUT_SECONDS = 20
+
+
+class MarketDataProvider(ABC):
+    """Interface of the market data used by the agents.
+
+    history: daily OHLCV DataFrame of one ticker in [start, end)
+    batch_history: {ticker: Series of daily closes in [start, end)} for tickers with data
+    news: recent news items in the Yahoo Finance format ({"content": {...}})
+    quote: quote fields such as regularMarketPreviousClose
+    """
+
+    @abstractmethod
+    def history(self, ticker, start, end):
+        raise NotImplementedError
+
+    @abstractmethod
+    def batch_history(self, tickers, start, end):
+        raise NotImplementedError
+
+    @abstractmethod
+    def news(self, ticker):
+        raise NotImplementedError
+
+    @abstractmethod
+    def quote(self, ticker):
+        raise NotImplementedError
+
+    def connection_stats(self):
+        """Cumulative HTTP connection counters, empty for providers that don't go over the network"""
+        return {}
+
+
+class CountedResponse(curl_requests.Response):
+    """Response that remembers how many connections curl opened for it (0 when an open one was reused)"""
+
+    def __init__(self, curl=None, request=None):
+        super().__init__(curl, request)
+        self.new_connections = curl.getinfo(CurlInfo.NUM_CONNECTS) if curl is not None else 0
+
+
+class PooledSession(curl_requests.Session):
+    """Keep-alive session shared by every thread of a warm container.
+
+    curl_cffi gives each thread its own curl handle, and each handle keeps its
+    connections open, so long-lived worker threads reuse their TLS connections
+    across invocations. Cookies (and with them Yahoo's crumb) are shared by all
+    threads. Counts how many requests went over an already open connection.
+    Every request is capped at `timeout` seconds, whatever yfinance asks for.
+    """
+
+    def __init__(self, timeout=HTTP_TIMEOUT_SECONDS):
+        super().__init__(impersonate="chrome", response_class=CountedResponse, timeout=timeout)
+        self.request_timeout = timeout
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "new_connections": 0, "reused_connections": 0}
+
+    def request(self, *args, **kwargs):
+        timeout = kwargs.get('timeout')
+        if timeout is None or (isinstance(timeout, (int, float)) and timeout > self.request_timeout):
+            kwargs['timeout'] = self.request_timeout
+        response = super().request(*args, **kwargs)
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["new_connections"] += response.new_connections
+            self.stats["reused_connections"] += response.new_connections == 0
+        return response
+
+
+def is_auth_error(error):
+    # Yahoo answers an expired cookie or crumb with 401 (Invalid Crumb) or 403
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) in (401, 403):
+        return True
+    message = str(error)
+    return 'Invalid Crumb' in message or 'Unauthorized' in message
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance through yfinance over one PooledSession.
+
+    yfinance keeps the crumb of the session's cookies for the life of the
+    process, so the cookie/crumb handshake happens once per container. When
+    Yahoo rejects them, the cookies and crumb are dropped and the call is
+    retried once with a fresh handshake; concurrent callers that hit the same
+    rejection share a single refresh. The reset relies on yfinance internals
+    (the version is pinned in SETUP.md); if they change, the provider moves to
+    a fresh PooledSession instead.
+    """
+
+    def __init__(self, session=None):
+        self.session = session if session is not None else PooledSession()
+        self.auth_lock = threading.Lock()
+        self.auth_generation = 0
+        self.auth_refreshes = 0
+
+    def refresh_auth(self, generation):
+        with self.auth_lock:
+            if generation != self.auth_generation:
+                # Another thread already refreshed after this call started
+                return
+            data = YfData(session=self.session)
+            cookie_lock = getattr(data, '_cookie_lock', None)
+            if cookie_lock is not None and hasattr(data, '_cookie') and hasattr(data, '_crumb'):
+                with cookie_lock:
+                    self.session.cookies.clear()
+                    data._cookie = None
+                    data._crumb = None
+            else:
+                self.session = PooledSession()
+                YfData(session=self.session)
+            self.auth_generation += 1
+            self.auth_refreshes += 1
+            print(f"Refreshed Yahoo Finance cookie and crumb ({self.auth_refreshes} so far)")
+
+    def _call(self, fetch):
+        generation = self.auth_generation
+        try:
+            return fetch()
+        except Exception as e:
+            if not is_auth_error(e):
+                raise
+            self.refresh_auth(generation)
+            return fetch()
+
+    def connection_stats(self):
+        stats = dict(getattr(self.session, 'stats', {}))
+        stats["auth_refreshes"] = self.auth_refreshes
+        return stats
+
+    def history(self, ticker, start, end):
+        return self._call(lambda: yf.Ticker(ticker, session=self.session).history(start=start, end=end))
+
+    def batch_history(self, tickers, start, end):
+        # One bulk download for every ticker instead of one history() call each
+        hist = self._call(lambda: yf.download(tickers, start=start, end=end, auto_adjust=True, progress=False, threads=True, session=self.session))
+        closes = hist['Close'] if not hist.empty else pd.DataFrame()
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(tickers[0])
+
+        # Tickers trade on different calendars, so drop the gaps per series
+        return {ticker: closes[ticker].dropna() for ticker in tickers if ticker in closes.columns}
+
+    def news(self, ticker):
+        return self._call(lambda: yf.Ticker(ticker, session=self.session).news)
+
+    def quote(self, ticker):
+        return self._call(lambda: yf.Ticker(ticker, session=self.session).info)
+
+
+class FixtureProvider(MarketDataProvider):
+    """Replays recorded responses from fixture_dir.
+
+    Layout: history/<ticker>.json ({date: {Open, High, Low, Close, Volume}}),
+    news/<ticker>.json (list of news items) and quote/<ticker>.json (quote fields).
+    Unknown tickers behave like Yahoo: no history, no news, empty quote.
+    latency is seconds slept per request, either a number or a callable
+    returning one, to mimic the upstream in benchmarks.
+    """
+
+    def __init__(self, fixture_dir, latency=0.0):
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+
+    def _wait(self):
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+
+    def _load(self, kind, ticker, default):
+        path = os.path.join(self.fixture_dir, kind, f"{ticker}.json")
+        if not os.path.exists(path):
+            return default
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _history(self, ticker, start, end):
+        frame = pd.DataFrame.from_dict(self._load('history', ticker, {}), orient='index', columns=HISTORY_COLUMNS, dtype=float)
+        frame.index = pd.DatetimeIndex(frame.index)
+        frame = frame.sort_index()
+        return frame[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))]
+
+    def history(self, ticker, start, end):
+        self._wait()
+        return self._history(ticker, start, end)
+
+    def batch_history(self, tickers, start, end):
+        # Served as one request, like the bulk download it stands in for
+        self._wait()
+        frames = {ticker: self._history(ticker, start, end) for ticker in tickers}
+        return {ticker: frame['Close'].dropna() for ticker, frame in frames.items() if not frame.empty}
+
+    def news(self, ticker):
+        self._wait()
+        return self._load('news', ticker, [])
+
+    def quote(self, ticker):
+        self._wait()
+        return self._load('quote', ticker, {})
+
+
+class RecordingProvider(MarketDataProvider):
+    """Passes calls through to a live provider and records the responses for FixtureProvider"""
+
+    def __init__(self, provider, fixture_dir):
+        self.provider = provider
+        self.fixture_dir = fixture_dir
+
+    def _write(self, kind, ticker, data):
+        path = os.path.join(self.fixture_dir, kind, f"{ticker}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        existing = {}
+        if kind == 'history' and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                existing = json.load(f)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**existing, **data} if kind == 'history' else data, f, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _rows(frame):
+        return {
+            day.strftime('%Y-%m-%d'): {column: float(row[column]) for column in HISTORY_COLUMNS if column in row}
+            for day, row in frame.iterrows()
+        }
+
+    def history(self, ticker, start, end):
+        frame = self.provider.history(ticker, start, end)
+        self._write('history', ticker, self._rows(frame))
+        return frame
+
+    def batch_history(self, tickers, start, end):
+        closes = self.provider.batch_history(tickers, start, end)
+        for ticker, series in closes.items():
+            # Bulk downloads only carry closes; the other columns are filled with them
+            self._write('history', ticker, {
+                day.strftime('%Y-%m-%d'): {column: float(price) for column in HISTORY_COLUMNS[:4]}
+                for day, price in series.items()
+            })
+        return closes
+
+    def news(self, ticker):
+        items = self.provider.news(ticker)
+        self._write('news', ticker, items)
+        return items
+
+    def quote(self, ticker):
+        fields = self.provider.quote(ticker)
+        self._write('quote', ticker, fields)
+        return fields
+
+    def connection_stats(self):
+        return self.provider.connection_stats()
+
+
+def provider_from_environment():
+    """MARKET_DATA_FIXTURE_DIR replays recorded data (with MARKET_DATA_FIXTURE_LATENCY_MS per request);
+    MARKET_DATA_RECORD_DIR records live responses there; otherwise Yahoo Finance is used"""
+    fixture_dir = os.environ.get('MARKET_DATA_FIXTURE_DIR')
+    if fixture_dir:
+        return FixtureProvider(fixture_dir, float(os.environ.get('MARKET_DATA_FIXTURE_LATENCY_MS', '0')) / 1000)
+    record_dir = os.environ.get('MARKET_DATA_RECORD_DIR')
+    if record_dir:
+        return RecordingProvider(YFinanceProvider(), record_dir)
+    return YFinanceProvider()
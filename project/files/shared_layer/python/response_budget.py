@@ -0,0 +1,226 @@
+"""Keeps tool responses within the agent's response size budget.
+
+Action group responses have a hard size limit, and whatever a tool returns is
+replayed in the orchestration prompt on every later turn of the session.
+Outputs over budget are degraded in steps, each only when the previous ones
+were not enough:
+
+1. price series ({date: close} maps, or series_codec encodings) are downsampled,
+   halving their points
+2. low-value fields are dropped
+3. the largest collection is paginated; the agent calls the tool again with the
+   returned continuation_token to get the next page. An encoded series is never
+   split across pages.
+
+Degraded outputs are wrapped as {"result": ..., "truncation": {...}} (plus
+"continuation_token" while pages remain). Outputs within budget are returned
+untouched. Outputs marked incomplete by the deadline are already wrapped in
+"result"; their data is fitted the same way and the markers stay on the
+envelope.
+"""
+import re
+import json
+import base64
+import hashlib
+import numpy as np
+from deadline import split_markers
+from session_memo import normalize_value
+from series_codec import decode_series, encode_series
+
+
+# Rough size of a prompt token in serialized JSON
+BYTES_PER_TOKEN = 4
+# Series are not downsampled below this many points; pagination takes over instead
+MIN_SERIES_POINTS = 16
+DATE_KEY = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+# Price series encoded by series_codec carry their closes as one array
+ENCODED_SERIES_KEYS = ('closes', 'deltas')
+
+
+def body_size(output):
+    return len(json.dumps(output, ensure_ascii=False).encode('utf-8'))
+
+
+def is_date_series(value):
+    return (
+        isinstance(value, dict) and len(value) > 2
+        and all(DATE_KEY.match(key) for key in value)
+        and all(isinstance(price, (int, float)) or price is None for price in value.values())
+    )
+
+
+def is_encoded_series(value):
+    return isinstance(value, dict) and 'start' in value and any(key in value for key in ENCODED_SERIES_KEYS)
+
+
+def even_indices(values, max_points):
+    """Indices of max_points evenly spaced values, first and last included"""
+    return np.unique(np.linspace(0, len(values) - 1, max_points).round().astype(int))
+
+
+def longest_series(output):
+    if is_date_series(output):
+        return len(output)
+    if is_encoded_series(output):
+        return len(output.get('closes', output.get('deltas')))
+    children = output.values() if isinstance(output, dict) else output if isinstance(output, list) else []
+    return max((longest_series(child) for child in children), default=0)
+
+
+def downsample_series(output, max_points, select_indices=even_indices):
+    if is_date_series(output):
+        if len(output) <= max_points:
+            return output
+        days = sorted(output)
+        prices = np.array([np.nan if output[day] is None else output[day] for day in days], dtype=float)
+        return {days[i]: output[days[i]] for i in select_indices(prices, max_points)}
+    if is_encoded_series(output):
+        if longest_series(output) <= max_points:
+            return output
+        decoded = downsample_series(decode_series(output), max_points, select_indices)
+        return encode_series(decoded, 'compact' if 'closes' in output else 'delta')
+    if isinstance(output, dict):
+        return {key: downsample_series(value, max_points, select_indices) for key, value in output.items()}
+    if isinstance(output, list):
+        return [downsample_series(value, max_points, select_indices) for value in output]
+    return output
+
+
+def drop_fields(output, fields):
+    if isinstance(output, dict):
+        return {key: drop_fields(value, fields) for key, value in output.items() if key not in fields}
+    if isinstance(output, list):
+        return [drop_fields(value, fields) for value in output]
+    return output
+
+
+def collection_path(output):
+    """Keys leading to the collection to paginate: the root, or the child holding most of the output when the root only wraps it"""
+    path, node = [], output
+    while isinstance(node, dict) and not is_encoded_series(node):
+        sizes = {key: body_size(value) for key, value in node.items() if isinstance(value, (dict, list)) and len(value) > 1}
+        key = max(sizes, key=sizes.get, default=None)
+        # An encoded series only decodes whole, so the collection holding it is paginated instead
+        if key is None or sizes[key] * 2 <= body_size(node) or is_encoded_series(node[key]):
+            break
+        path.append(key)
+        node = node[key]
+    return path, node
+
+
+def wrap(output, truncation, continuation_token=None, markers=None):
+    body = {"result": output, "truncation": truncation, **(markers or {})}
+    if continuation_token:
+        body["continuation_token"] = continuation_token
+    return body
+
+
+def replace_at(output, path, value):
+    if not path:
+        return value
+    return {**output, path[0]: replace_at(output[path[0]], path[1:], value)}
+
+
+class ResponseBudget:
+    """Response-size stage run by lambda_handler on every tool output.
+
+    The budget is the smaller of max_bytes and max_tokens (estimated at
+    BYTES_PER_TOKEN bytes each) of the serialized body. low_value_fields are
+    the keys dropped in the second step; select_indices picks the points kept
+    when a series is downsampled.
+    """
+
+    def __init__(self, max_bytes=None, max_tokens=None, low_value_fields=(), select_indices=even_indices):
+        limits = [limit for limit in (max_bytes, max_tokens and max_tokens * BYTES_PER_TOKEN) if limit]
+        self.max_bytes = min(limits) if limits else None
+        self.low_value_fields = set(low_value_fields)
+        self.select_indices = select_indices
+
+    @staticmethod
+    def fingerprint(function, parameters):
+        # Ties a continuation token to the call it continues
+        params = sorted((param['name'], normalize_value(param.get('value'))) for param in parameters or [])
+        return hashlib.sha1(json.dumps([function, params]).encode('utf-8')).hexdigest()[:12]
+
+    def encode_token(self, function, parameters, offset):
+        token = json.dumps({"f": self.fingerprint(function, parameters), "o": offset}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_token(self, function, parameters, token):
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            offset = int(decoded["o"])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid continuation_token")
+        if decoded.get("f") != self.fingerprint(function, parameters) or offset < 0:
+            raise ValueError("continuation_token does not belong to this call; repeat the call with the same parameters")
+        return offset
+
+    def apply(self, function, parameters, output, continuation_token=None, page_start=0):
+        """Output fitted to the budget. Functions that page their own results pass the
+        position of their page in page_start, so tokens for a finer page stay absolute."""
+        marked = output
+        output, markers = split_markers(output)
+        if self.max_bytes is None or (isinstance(output, dict) and "error" in output) or not isinstance(output, (dict, list)):
+            return marked
+        try:
+            offset = self.decode_token(function, parameters, continuation_token) if continuation_token else 0
+        except ValueError as e:
+            return {"error": str(e)}
+
+        size = body_size(marked)
+        if size <= self.max_bytes and not offset:
+            return marked
+
+        # A continuation token of the function's own pagination moves to the envelope
+        own_token = output.get("continuation_token") if isinstance(output, dict) else None
+        if own_token:
+            output = {key: value for key, value in output.items() if key != "continuation_token"}
+
+        truncation = {}
+        points = longest_series(output)
+        while size > self.max_bytes and points > MIN_SERIES_POINTS:
+            points = max(points // 2, MIN_SERIES_POINTS)
+            output = downsample_series(output, points, self.select_indices)
+            truncation["series_points"] = points
+            size = body_size(wrap(output, truncation, own_token, markers))
+
+        if size > self.max_bytes and self.low_value_fields:
+            trimmed = drop_fields(output, self.low_value_fields)
+            if body_size(trimmed) < body_size(output):
+                output = trimmed
+                truncation["dropped_fields"] = sorted(self.low_value_fields)
+                size = body_size(wrap(output, truncation, own_token, markers))
+
+        if size <= self.max_bytes and not offset:
+            return wrap(output, truncation, own_token, markers)
+        return self.paginate(function, parameters, output, truncation, offset, page_start, own_token, markers)
+
+    def paginate(self, function, parameters, output, truncation, offset, page_start=0, own_token=None, markers=None):
+        path, collection = collection_path(output)
+        items = list(collection.items()) if isinstance(collection, dict) else list(collection)
+        if offset >= len(items):
+            return {"error": "continuation_token is past the last page"}
+
+        def envelope(count):
+            page = items[offset:offset + count]
+            more = offset + count < len(items)
+            return wrap(
+                replace_at(output, path, dict(page) if isinstance(collection, dict) else page),
+                {**truncation, "page": {"offset": page_start + offset, "count": count, "total": page_start + len(items)}},
+                self.encode_token(function, parameters, page_start + offset + count) if more else own_token,
+                markers
+            )
+
+        # Estimate the page from per-item sizes, then settle it on the exact serialized size
+        base = body_size(envelope(0))
+        count, size = 0, base
+        for item in items[offset:]:
+            item_size = body_size(list(item) if isinstance(collection, dict) else item) + 2
+            if size + item_size > self.max_bytes and count:
+                break
+            size += item_size
+            count += 1
+        while count > 1 and body_size(envelope(count)) > self.max_bytes:
+            count -= 1
+        return envelope(count)
@@ -0,0 +1,72 @@
+import json
+import numpy as np
+import pandas as pd
+
+
+# Response formats for price series
+#   dates:   {"YYYY-MM-DD": close, ...}                  (original format)
+#   compact: {"start", "calendar", "skip", "closes"}     plain array of closes
+#   delta:   {"start", "calendar", "skip", "deltas"}     first close then day-over-day changes, in cents
+# Sparse series (weekly, monthly or downsampled) replace "calendar" and "skip" with
+# "gaps", the calendar days since the previous close.
+SERIES_FORMATS = ('dates', 'compact', 'delta')
+
+
+def encode_series(prices, fmt='dates'):
+    """Encode a {date: close} series in one of SERIES_FORMATS.
+
+    Compact formats drop the per-value date strings: dates are rebuilt from the
+    start date and a calendar ("weekdays", or "daily" for assets that also trade
+    on weekends), minus the calendar positions listed in "skip" (holidays).
+    Once most calendar days are skipped, as after resampling, the days between
+    consecutive closes ("gaps") are shorter and are sent instead.
+    """
+    if fmt not in SERIES_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(SERIES_FORMATS)}")
+    if fmt == 'dates' or not prices:
+        return prices
+
+    days = pd.DatetimeIndex(sorted(prices))
+    closes = np.array([prices[day] for day in sorted(prices)], dtype=float)
+
+    calendar = 'weekdays' if (days.dayofweek < 5).all() else 'daily'
+    full = pd.bdate_range(days[0], days[-1]) if calendar == 'weekdays' else pd.date_range(days[0], days[-1])
+    skip = np.flatnonzero(~full.isin(days)).tolist()
+
+    gaps = np.diff(days.values).astype('timedelta64[D]').astype(int).tolist()
+
+    encoded = {"start": days[0].strftime('%Y-%m-%d')}
+    if len(json.dumps(gaps)) < len(json.dumps(skip)):
+        encoded["gaps"] = gaps
+    else:
+        encoded.update(calendar=calendar, skip=skip)
+    if fmt == 'compact':
+        encoded["closes"] = np.round(closes, 2).tolist()
+    else:
+        cents = np.round(closes * 100).astype(np.int64)
+        encoded["deltas"] = np.concatenate([cents[:1], np.diff(cents)]).tolist()
+    return encoded
+
+
+def decode_series(encoded):
+    """Inverse of encode_series: returns {"YYYY-MM-DD": close}"""
+    if not encoded or ("closes" not in encoded and "deltas" not in encoded):
+        return encoded
+
+    if "closes" in encoded:
+        closes = np.asarray(encoded["closes"], dtype=float)
+    else:
+        closes = np.cumsum(np.asarray(encoded["deltas"], dtype=np.int64)) / 100
+
+    if "gaps" in encoded:
+        days = pd.DatetimeIndex(pd.Timestamp(encoded["start"]) + pd.to_timedelta(np.cumsum([0] + encoded["gaps"]), unit='D'))
+        return {day.strftime('%Y-%m-%d'): round(float(close), 2) for day, close in zip(days, closes)}
+
+    periods = len(closes) + len(encoded["skip"])
+    if encoded["calendar"] == 'weekdays':
+        full = pd.bdate_range(encoded["start"], periods=periods)
+    else:
+        full = pd.date_range(encoded["start"], periods=periods)
+    days = full.delete(encoded["skip"])
+
+    return {day.strftime('%Y-%m-%d'): round(float(close), 2) for day, close in zip(days, closes)}
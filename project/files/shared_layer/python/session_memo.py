@@ -0,0 +1,63 @@
+import json
+import time
+from collections import OrderedDict
+
+
+def normalize_value(value):
+    # The agent serializes arrays and objects itself, so '["SPY","QQQ"]' and '[ "SPY", "QQQ" ]' are the same call
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            return json.dumps(json.loads(value), sort_keys=True, separators=(',', ':'))
+        except ValueError:
+            return value
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class SessionMemo:
+    """Tool outputs of recent agent sessions, keyed by session, function and normalized parameters.
+
+    Agents often repeat a call with the same arguments within one session (for
+    example re-checking a ticker while revising an allocation), so the repeat is
+    served from memory. Entries expire after `ttl_seconds` and only the
+    `max_entries` most recently used are kept. Error and incomplete outputs are
+    not memoized, so a transient failure or timeout is retried on the next call.
+    Calls without a session id are never memoized.
+    """
+
+    def __init__(self, ttl_seconds=300, max_entries=512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.stats = {}
+
+    @staticmethod
+    def key(session_id, function, parameters):
+        params = tuple(sorted((param['name'], normalize_value(param.get('value'))) for param in parameters or []))
+        return session_id, function, params
+
+    def call(self, session_id, function, parameters, compute):
+        if not session_id or self.max_entries <= 0:
+            return compute()
+
+        key = self.key(session_id, function, parameters)
+        entry = self.entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+            self.entries.move_to_end(key)
+            self._record(function, "hit")
+            return entry[1]
+
+        output = compute()
+        self._record(function, "miss")
+        if not (isinstance(output, dict) and ("error" in output or output.get("incomplete"))):
+            self.entries[key] = (time.monotonic(), output)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return output
+
+    def _record(self, function, outcome):
+        stats = self.stats.setdefault(function, {"hit": 0, "miss": 0})
+        stats[outcome] += 1
+        hit_rate = stats["hit"] / (stats["hit"] + stats["miss"])
+        print(f"Tool memo {outcome} for {function}: {json.dumps({**stats, 'hit_rate': round(hit_rate, 2)})}")
@@ -8,9 +8,12 @@ from aws_cdk import (
     CfnOutput
 )
 from constructs import Construct
+import os
+import sys
 import random
 import string
 import json
+import subprocess
 
 
 class FinancialAnalysisStack(Stack):
@@ -31,10 +34,21 @@ class FinancialAnalysisStack(Stack):
             auto_delete_objects=True  # Use False for production
         )
 
+        # Compile the product catalog into the pack the Portfolio Architect loads on cold start
+        os.makedirs("build/catalog", exist_ok=True)
+        subprocess.run(
+            [sys.executable, "files/lambda_portfolio_architect/catalog_pack.py",
+             "files/available_products_en.json", "build/catalog/available_products_en.catpack"],
+            check=True
+        )
+
         # Deploy files to S3 bucket
         self.s3_deployment = s3deploy.BucketDeployment(
             self, "S3FilesDeployment",
-            sources=[s3deploy.Source.asset("files")],  # Deploy all files from the files directory
+            sources=[
+                s3deploy.Source.asset("files"),  # Deploy all files from the files directory
+                s3deploy.Source.asset("build/catalog")  # Packed catalog next to the JSON one
+            ],
             destination_bucket=self.s3_bucket,
             memory_limit=1024,  # Increase memory limit to 1024 MB
             prune=False,  # Don't delete files that aren't in the source
@@ -52,6 +66,16 @@ class FinancialAnalysisStack(Stack):
             description="Lambda layer containing yfinance library for financial data analysis"
         )
 
+        # Create Lambda Layer for the modules every tool Lambda shares (market data, calendar, deadlines, response shaping)
+        self.shared_layer = _lambda.LayerVersion(
+            self, "SharedModulesLayer",
+            layer_version_name="shared-modules-layer",
+            code=_lambda.Code.from_asset("files/shared_layer"),  # Modules under python/ land on the Lambda import path
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+            compatible_architectures=[_lambda.Architecture.X86_64],
+            description="Lambda layer containing the modules shared by the Portfolio Architect and Risk Manager functions"
+        )
+
         # Define the financial analyst prompt text
         financial_analyst_prompt = """You are a financial analysis expert. Based on the given user information, you should evaluate risk propensity and calculate required annual return rate to output financial analysis results.
 
@@ -194,6 +218,12 @@ Output format:
             description="ARN of the yfinance Lambda layer"
         )
 
+        CfnOutput(
+            self, "SharedModulesLayerArn",
+            value=self.shared_layer.layer_version_arn,
+            description="ARN of the shared modules Lambda layer"
+        )
+
         CfnOutput(
             self, "FinancialAnalystPromptId",
             value=self.financial_analyst_prompt.attr_id,
@@ -13,7 +13,7 @@ from constructs import Construct
 
 class PortfolioArchitectStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, yfinance_layer: _lambda.ILayerVersion, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, yfinance_layer: _lambda.ILayerVersion, shared_layer: _lambda.ILayerVersion, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # S3 bucket name from FinancialAnalysisStack
@@ -39,9 +39,15 @@ class PortfolioArchitectStack(Stack):
             role=lambda_role,
             timeout=Duration.seconds(30),
             memory_size=512,
-            layers=[yfinance_layer],
+            layers=[yfinance_layer, shared_layer],
             environment={
-                "S3_BUCKET_NAME": s3_bucket_name
+                "S3_BUCKET_NAME": s3_bucket_name,
+                "CATALOG_REVALIDATE_SECONDS": "300",
+                "MAX_PRODUCTS_WITH_DATA_BYTES": "20000",
+                "MAX_RESPONSE_BYTES": "20000",
+                "CATALOG_TOP_K": "20",
+                "PRICE_FETCH_TIMEOUT_SECONDS": "15",
+                "DEADLINE_RESERVE_SECONDS": "2"
             }
         )
 
@@ -73,6 +79,39 @@ class PortfolioArchitectStack(Stack):
             )
         )
 
+        # Optional parameters shared by the price data functions
+        series_parameters = {
+            "format": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                type="string",
+                description="Response format: \"dates\" (default, date to price map), \"compact\" (start date, trading-day calendar or day gaps, and an array of closes) or \"delta\" (like compact, with day-over-day changes in cents). Use \"compact\" to save tokens.",
+                required=False
+            ),
+            "period": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                type="string",
+                description="Lookback window such as \"100d\" (default), \"26wk\", \"6mo\" or \"5y\" (10 years at most)",
+                required=False
+            ),
+            "interval": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                type="string",
+                description="Spacing of the returned closes: \"1d\" (default), \"1wk\" or \"1mo\"",
+                required=False
+            ),
+            "max_points": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                type="integer",
+                description="Maximum number of closes per ticker; longer series are downsampled keeping highs and lows",
+                required=False
+            )
+        }
+
+        # Oversized tool responses are paginated; the agent asks for the next page with this token
+        continuation_parameter = {
+            "continuation_token": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                type="string",
+                description="Token from the \"continuation_token\" of a previous paginated response of this action; repeat the other parameters unchanged to get the next page",
+                required=False
+            )
+        }
+
         self.portfolio_architect_agent = aws_bedrock.CfnAgent(
             self, "PortfolioArchitectAgent",
             agent_name="portfolio_architect",
@@ -92,11 +131,13 @@ class PortfolioArchitectStack(Stack):
 
         Your Tasks:
         1. Carefully review and interpret the financial analysis results.
-        2. Call the "get_available_products" action to get a list of available investment products. Each product is provided in "ticker: description" format.
+        2. Call the "get_products_with_data" action to get every available investment product with its description and 1-year return, volatility, maximum drawdown, distance from the 52-week high and trend summary in a single step. Only if it returns an error, call "get_available_products" instead, filtering by the risk levels that suit the client's risk propensity (and by type or keywords when the client asked for them).
         3. Select the 3 most suitable products from the obtained product list considering diversification and the client's financial analysis results.
-        4. Call the "get_product_data" action simultaneously for each selected investment product to get recent price data.
-        5. Analyze the obtained price data to determine final portfolio ratios. Consider the client's financial analysis results in a balanced way.
-        6. Explain the portfolio composition rationale in detail.
+        4. If you need more detail on the selected products, call the "get_product_indicators" action once with all of them to get their moving averages and RSI. Only call "get_product_data_batch" if you need the raw price path.
+        5. Call the "get_portfolio_statistics" action with the selected products to get their annualized return, volatility, maximum drawdown, Sharpe ratio and correlations.
+        6. Analyze the obtained price data and statistics to determine final portfolio ratios. Consider the client's financial analysis results in a balanced way. To compare candidate ratios, call the "backtest_allocation" action once with all candidates. The "optimize_allocation" action returns a mean-variance efficient "portfolio_allocation" for a target return (use the required_annual_return_rate) or target volatility that can serve as a starting point.
+        7. Call the "simulate_portfolio" action with the proposed ratios, an amount of 100 and a target_amount of 100 x (1 + required_annual_return_rate / 100) to check the probability of reaching the required return within one year, and adjust the ratios if needed.
+        8. Explain the portfolio composition rationale in detail.
 
         Please respond in the following JSON format:
         {
@@ -108,7 +149,9 @@ class PortfolioArchitectStack(Stack):
         Consider the following when responding:
         - Logically explain how the proposed portfolio will help achieve the client's investment goals.
         - Asset allocation ratios must be expressed as integers and total 100%.
-        - When writing the portfolio composition rationale, always provide both ticker and description like "QQQ(US Technology Stocks)".""",
+        - When writing the portfolio composition rationale, always provide both ticker and description like "QQQ(US Technology Stocks)".
+        - A response wrapped in "result" was too large to return at once: price series may be downsampled and minor fields dropped. If it also has a "continuation_token", call the same action again with the same parameters and that continuation_token for the rest (for price data, call it again with only the tickers not yet returned).
+        - A response with "incomplete": true was cut short because the data source was slow or failed; its data is under "result" and "timed_out" or "failed" lists what is missing. Call the same action again once to fill the gaps before relying on the missing data.""",
             action_groups=[
                 aws_bedrock.CfnAgent.AgentActionGroupProperty(
                     action_group_name="action-group-portfolio-architect",
@@ -126,13 +169,176 @@ class PortfolioArchitectStack(Stack):
                                         type="string",
                                         description="Ticker of the investment product to look up",
                                         required=True
+                                    ),
+                                    **series_parameters
+                                },
+                                require_confirmation="DISABLED"
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="get_product_data_batch",
+                                description="Gets recent price data for several investment products in one call.",
+                                parameters={
+                                    "tickers": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="array",
+                                        description="List of tickers of the investment products to look up (e.g. [\"SPY\", \"QQQ\", \"TLT\"])",
+                                        required=True
+                                    ),
+                                    **series_parameters
+                                },
+                                require_confirmation="DISABLED"
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="get_product_indicators",
+                                description="Returns the latest technical indicators for each investment product instead of raw prices: 50/200-day moving averages, 14-day RSI, 20-day volatility, 1-year maximum drawdown, distance from the 52-week high and low, and a trend/momentum summary.",
+                                parameters={
+                                    "tickers": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="array",
+                                        description="List of tickers of the investment products to analyze",
+                                        required=True
+                                    )
+                                },
+                                require_confirmation="DISABLED"
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="get_portfolio_statistics",
+                                description="Computes annualized return, volatility, maximum drawdown and Sharpe ratio for each investment product, plus the correlation matrix between them.",
+                                parameters={
+                                    "tickers": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="array",
+                                        description="List of tickers of the investment products to analyze",
+                                        required=True
+                                    ),
+                                    "period": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="string",
+                                        description="Lookback window such as \"6mo\", \"1y\" (default) or \"5y\"",
+                                        required=False
+                                    ),
+                                    "risk_free_rate": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="number",
+                                        description="Annual risk-free rate used for the Sharpe ratio as a decimal (default 0)",
+                                        required=False
+                                    )
+                                },
+                                require_confirmation="DISABLED"
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="backtest_allocation",
+                                description="Backtests one or more candidate allocations with periodic rebalancing and returns CAGR, volatility, worst drawdown and a downsampled equity curve for each.",
+                                parameters={
+                                    "allocations": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="string",
+                                        description="JSON allocation or list of allocations of ticker to ratio (e.g. [{\"SPY\": 60, \"TLT\": 40}, {\"SPY\": 40, \"TLT\": 60}]), or {\"tickers\": [...], \"weights\": [[...], ...]}",
+                                        required=True
+                                    ),
+                                    "lookback_years": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="integer",
+                                        description="Years of history to backtest, 1 to 10 (default 5)",
+                                        required=False
+                                    ),
+                                    "rebalance": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="string",
+                                        description="Rebalancing frequency: \"monthly\" (default), \"quarterly\", \"annual\" or \"none\"",
+                                        required=False
+                                    ),
+                                    "max_points": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="integer",
+                                        description="Maximum number of points in each equity curve (default 24)",
+                                        required=False
+                                    )
+                                },
+                                require_confirmation="DISABLED"
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="optimize_allocation",
+                                description="Finds the long-only efficient-frontier portfolio over the product catalog (or the given tickers) for a target annual return or volatility, using a shrinkage covariance estimate. Without a target it returns the minimum-variance portfolio.",
+                                parameters={
+                                    "target_return": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="number",
+                                        description="Target annual expected return in percent (e.g. 8 for 8%)",
+                                        required=False
+                                    ),
+                                    "target_volatility": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="number",
+                                        description="Target annual volatility in percent; used instead of target_return",
+                                        required=False
+                                    ),
+                                    "tickers": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="array",
+                                        description="Tickers to optimize over (default: every product in the catalog)",
+                                        required=False
+                                    ),
+                                    "period": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="string",
+                                        description="History used to estimate returns and covariance (default \"3y\")",
+                                        required=False
+                                    )
+                                },
+                                require_confirmation="DISABLED"
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="simulate_portfolio",
+                                description="Runs a Monte Carlo simulation of a portfolio over one year from historical daily returns and returns the probability of reaching the target amount and outcome percentiles.",
+                                parameters={
+                                    "allocation": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="string",
+                                        description="Portfolio allocation as a JSON object of ticker to ratio (e.g. {\"SPY\": 50, \"QQQ\": 30, \"TLT\": 20})",
+                                        required=True
+                                    ),
+                                    "amount": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="number",
+                                        description="Amount invested today",
+                                        required=True
+                                    ),
+                                    "target_amount": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="number",
+                                        description="Target amount after one year",
+                                        required=True
+                                    ),
+                                    "n_paths": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="integer",
+                                        description="Number of simulated paths (default 20000, at most 200000)",
+                                        required=False
+                                    ),
+                                    "seed": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="integer",
+                                        description="Random seed for reproducible results",
+                                        required=False
                                     )
                                 },
                                 require_confirmation="DISABLED"
                             ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="get_products_with_data",
+                                description="Gets the list of available investment products together with each product's 1-year return, volatility, maximum drawdown, distance from the 52-week high and trend/momentum summary in one call. Products that do not fit in the response size limit are listed under \"omitted\".",
+                                parameters=continuation_parameter,
+                                require_confirmation="DISABLED"
+                            ),
                             aws_bedrock.CfnAgent.FunctionProperty(
                                 name="get_available_products",
-                                description="Gets list of available investment products.",
+                                description="Searches the available investment products. All filters are optional and combined; returns the best matching products (at most 20 per call) and the total number of matches.",
+                                parameters={
+                                    "type": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="array",
+                                        description="Product types to include, e.g. [\"equity\", \"fixed_income\", \"mixed\", \"real_estate\", \"cryptocurrency\"]",
+                                        required=False
+                                    ),
+                                    "risk_level": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="array",
+                                        description="Risk levels to include, e.g. [\"low\", \"medium\", \"high\", \"very_high\"]",
+                                        required=False
+                                    ),
+                                    "max_minimum_investment": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="number",
+                                        description="Only products whose minimum investment is at most this amount",
+                                        required=False
+                                    ),
+                                    "query": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="string",
+                                        description="Keywords matched against product names and descriptions, e.g. \"technology growth\"",
+                                        required=False
+                                    ),
+                                    **continuation_parameter
+                                },
                                 require_confirmation="DISABLED"
                             )
                         ]
@@ -161,6 +367,34 @@ class PortfolioArchitectStack(Stack):
             )
         )
 
+        # Add inline policy for the incremental price history store
+        lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                sid="s3pricehistory",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "s3:PutObject"
+                ],
+                resources=[
+                    f"arn:aws:s3:::{s3_bucket_name}/price_history/*"
+                ]
+            )
+        )
+
+        # Allow ListBucket so a missing price history object reports NoSuchKey instead of AccessDenied
+        lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                sid="s3listbucket",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "s3:ListBucket"
+                ],
+                resources=[
+                    f"arn:aws:s3:::{s3_bucket_name}"
+                ]
+            )
+        )
+
         # Add resource-based policy to allow Bedrock agent to invoke Lambda
         self.portfolio_architect_function.add_permission(
             "allow-bedrock-agent",
@@ -2,6 +2,8 @@ from aws_cdk import (
     Stack,
     aws_lambda as _lambda,
     aws_iam as iam,
+    aws_events as events,
+    aws_events_targets as targets,
     CfnOutput,
     Duration,
     aws_bedrock,
@@ -13,9 +15,15 @@ from constructs import Construct
 
 class RiskManagerStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, yfinance_layer: _lambda.ILayerVersion, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, yfinance_layer: _lambda.ILayerVersion, shared_layer: _lambda.ILayerVersion, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        # S3 bucket name from FinancialAnalysisStack
+        s3_bucket_name = "agenticai-131289"
+
+        # How often the market snapshot is refreshed; tools treat it as stale after two missed refreshes
+        snapshot_refresh_minutes = 5
+
         # Create Lambda execution role with basic permissions
         lambda_role = iam.Role(
             self, "RiskManagerRole",
@@ -36,7 +44,91 @@ class RiskManagerStack(Stack):
             role=lambda_role,
             timeout=Duration.seconds(30),
             memory_size=512,
-            layers=[yfinance_layer]
+            layers=[yfinance_layer, shared_layer],
+            environment={
+                "S3_BUCKET_NAME": s3_bucket_name,
+                "MARKET_SNAPSHOT_MAX_AGE_SECONDS": str(snapshot_refresh_minutes * 60 * 2),
+                "MAX_RESPONSE_BYTES": "20000",
+                "HISTORY_TIMEOUT_SECONDS": "20",
+                "DEADLINE_RESERVE_SECONDS": "2"
+            }
+        )
+
+        # The refresher gets its own role, so only it can overwrite the snapshot the tools trust
+        snapshot_role = iam.Role(
+            self, "MarketSnapshotRole",
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            managed_policies=[
+                iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AWSLambdaBasicExecutionRole")
+            ]
+        )
+
+        # Scheduled Lambda that refreshes the shared market snapshot (same code, separate handler)
+        self.market_snapshot_function = _lambda.Function(
+            self, "MarketSnapshotFunction",
+            function_name="lambda-risk-manager-snapshot",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            architecture=_lambda.Architecture.X86_64,
+            code=_lambda.Code.from_asset("files/lambda_risk_manager"),
+            handler="lambda_function.refresh_handler",
+            role=snapshot_role,
+            timeout=Duration.seconds(60),
+            memory_size=512,
+            layers=[yfinance_layer, shared_layer],
+            environment={
+                "S3_BUCKET_NAME": s3_bucket_name,
+                "HOT_TICKERS": "SPY,QQQ,IWM,TLT,IEF,GLD",
+                "MARKET_SNAPSHOT_S3_TIMEOUT_SECONDS": "10"
+            }
+        )
+
+        events.Rule(
+            self, "MarketSnapshotSchedule",
+            description="Refreshes the Risk Manager market snapshot",
+            schedule=events.Schedule.rate(Duration.minutes(snapshot_refresh_minutes)),
+            targets=[targets.LambdaFunction(self.market_snapshot_function)]
+        )
+
+        # Add inline policy for reading the market snapshot
+        lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                sid="s3marketsnapshot",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "s3:GetObject"
+                ],
+                resources=[
+                    f"arn:aws:s3:::{s3_bucket_name}/market_snapshot/*"
+                ]
+            )
+        )
+
+        # Add inline policy for publishing the market snapshot
+        snapshot_role.add_to_policy(
+            iam.PolicyStatement(
+                sid="s3marketsnapshotwrite",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "s3:PutObject"
+                ],
+                resources=[
+                    f"arn:aws:s3:::{s3_bucket_name}/market_snapshot/*"
+                ]
+            )
+        )
+
+        # Allow ListBucket so a missing snapshot reports NoSuchKey instead of AccessDenied
+        lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                sid="s3listbucket",
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "s3:ListBucket"
+                ],
+                resources=[
+                    f"arn:aws:s3:::{s3_bucket_name}"
+                ]
+            )
         )
 
         # Create Bedrock Agent role
@@ -67,6 +159,15 @@ class RiskManagerStack(Stack):
             )
         )
 
+        # Oversized tool responses are paginated; the agent asks for the next page with this token
+        continuation_parameter = {
+            "continuation_token": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                type="string",
+                description="Token from the \"continuation_token\" of a previous paginated response of this action; repeat the other parameters unchanged to get the next page",
+                required=False
+            )
+        }
+
         # Create the Bedrock Agent
         self.risk_manager_agent = aws_bedrock.CfnAgent(
             self, "RiskManagerAgent",
@@ -94,6 +195,12 @@ Use the given tools freely to achieve the following objectives:
 2. Derive 2 highly probable economic scenarios
 3. Propose portfolio adjustment measures for each scenario
 
+Call the "get_risk_context" action once with every ticker in the portfolio to get the current market indicators and the recent news for all products in a single step; only fall back to "get_market_data" and "get_product_news" if it returns an error.
+If a response is wrapped in "result" with a "continuation_token", it was too large to return at once; call the same action again with the same parameters and that continuation_token for the rest.
+If a response has "incomplete": true, the data source was too slow or failed: its data is under "result" and "timed_out" or "failed" lists what is missing; call the same action again once before relying on the missing data.
+Call the "stress_test_portfolio" action with the given portfolio allocation to get the loss and drawdown of the portfolio under historical crises and under rate, volatility and oil shocks, and ground your scenarios and adjustments in these numbers.
+Call the "get_risk_metrics" action with the given portfolio allocation to quantify its 1-day and 10-day Value-at-Risk and Expected Shortfall.
+
 Provide the final results in the following JSON format:
 {
   "scenario1": {
@@ -135,13 +242,86 @@ Please strictly follow these requirements when responding:
                         functions=[
                             aws_bedrock.CfnAgent.FunctionProperty(
                                 name="get_product_news",
-                                description="Gets recent news for the selected investment product.",
+                                description="Gets recent news for the selected investment product. Articles already returned earlier in the session are referenced by id.",
                                 require_confirmation="DISABLED",
                                 parameters={
                                     "ticker": aws_bedrock.CfnAgent.ParameterDetailProperty(
                                         type="string",
                                         description="Ticker of the investment product to look up",
                                         required=True
+                                    ),
+                                    "max_age": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="integer",
+                                        description="Oldest cached news in seconds that is acceptable (default 300); 0 forces a fresh fetch",
+                                        required=False
+                                    ),
+                                    **continuation_parameter
+                                }
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="get_market_data",
+                                description="Gets current major market indicators: US dollar index, US 10-year and 2-year Treasury yields, VIX and WTI crude oil.",
+                                require_confirmation="DISABLED"
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="get_risk_context",
+                                description="Gets the current major market indicators and the recent news of every given investment product in one call. Articles shared by several products are listed once with all of their tickers; articles already returned earlier in the session are referenced by id.",
+                                require_confirmation="DISABLED",
+                                parameters={
+                                    "tickers": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="array",
+                                        description="Tickers of every investment product in the portfolio",
+                                        required=True
+                                    ),
+                                    "max_age": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="integer",
+                                        description="Oldest cached news in seconds that is acceptable (default 300); 0 forces a fresh fetch",
+                                        required=False
+                                    ),
+                                    **continuation_parameter
+                                }
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="stress_test_portfolio",
+                                description="Applies historical crises (2008, 2013, 2018, 2020, 2022) and rate, volatility and oil shocks to a portfolio and returns the profit or loss, drawdown and per-product contribution for each scenario.",
+                                require_confirmation="DISABLED",
+                                parameters={
+                                    "allocation": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="string",
+                                        description="Portfolio allocation as a JSON object of ticker to ratio (e.g. {\"SPY\": 50, \"QQQ\": 30, \"TLT\": 20})",
+                                        required=True
+                                    ),
+                                    "amount": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="number",
+                                        description="Optional portfolio value used to express profit or loss as an amount",
+                                        required=False
+                                    )
+                                }
+                            ),
+                            aws_bedrock.CfnAgent.FunctionProperty(
+                                name="get_risk_metrics",
+                                description="Computes 1-day and 10-day Value-at-Risk and Expected Shortfall of a portfolio by historical simulation.",
+                                require_confirmation="DISABLED",
+                                parameters={
+                                    "allocation": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="string",
+                                        description="Portfolio allocation as a JSON object of ticker to ratio (e.g. {\"SPY\": 50, \"QQQ\": 30, \"TLT\": 20})",
+                                        required=True
+                                    ),
+                                    "confidence_levels": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="array",
+                                        description="Confidence levels (default [0.95, 0.99])",
+                                        required=False
+                                    ),
+                                    "lookback_years": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="integer",
+                                        description="Years of history to simulate from (default 5)",
+                                        required=False
+                                    ),
+                                    "amount": aws_bedrock.CfnAgent.ParameterDetailProperty(
+                                        type="number",
+                                        description="Optional portfolio value used to express the risk measures as amounts",
+                                        required=False
                                     )
                                 }
                             )
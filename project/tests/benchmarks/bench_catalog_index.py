@@ -0,0 +1,84 @@
+"""Measure get_available_products queries on the catalog index against a linear scan.
+
+Run from the project directory:
+    python -m tests.benchmarks.bench_catalog_index
+
+Builds a synthetic catalog of a few thousand products, then times typical
+agent queries (risk levels of a profile, a type, a minimum investment cap and
+keywords) answered by CatalogIndex and by filtering the product list directly.
+"""
+import time
+
+import numpy as np
+
+from tests.unit.conftest import load_lambda
+
+
+TYPES = ["equity", "fixed_income", "mixed", "real_estate", "cryptocurrency"]
+RISK_LEVELS = ["low", "medium", "high", "very_high"]
+WORDS = ["technology", "growth", "dividend", "income", "global", "emerging", "bond", "treasury", "healthcare", "energy", "value", "small", "cap"]
+QUERIES = [
+    {"risk_levels": ["low", "medium"]},
+    {"types": ["equity"], "risk_levels": ["high"], "max_minimum_investment": 2500},
+    {"text": "tech growth"},
+    {"types": ["fixed_income", "mixed"], "text": "income"},
+]
+
+
+def synthetic_catalog(size):
+    rng = np.random.default_rng(7)
+    return {"financial_products": [
+        {
+            "id": f"P{i:05d}",
+            "name": " ".join(rng.choice(WORDS, 2)).title() + " Fund",
+            "type": str(rng.choice(TYPES)),
+            "risk_level": str(rng.choice(RISK_LEVELS)),
+            "minimum_investment": int(rng.choice([100, 500, 1000, 2500, 5000, 10000])),
+            "description": " ".join(rng.choice(WORDS, 8)),
+        }
+        for i in range(size)
+    ]}
+
+
+def linear_search(products, types=None, risk_levels=None, max_minimum_investment=None, text=None, top_k=20):
+    matches = []
+    for product in products:
+        if types and product["type"] not in types:
+            continue
+        if risk_levels and product["risk_level"] not in risk_levels:
+            continue
+        if max_minimum_investment is not None and product["minimum_investment"] > max_minimum_investment:
+            continue
+        words = f"{product['name']} {product['description']}".lower().split()
+        if text and not all(any(word.startswith(query) for word in words) for query in text.lower().split()):
+            continue
+        matches.append(product)
+    return matches[:top_k], len(matches)
+
+
+def timed(call, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    load_lambda("lambda_portfolio_architect", "portfolio_architect_lambda")
+    from catalog_index import CatalogIndex
+
+    for size in (1000, 10000):
+        catalog = synthetic_catalog(size)
+        start = time.perf_counter()
+        index = CatalogIndex(catalog)
+        print(f"{size} products: index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"  {'query':<70}{'matches':>8}{'index ms':>10}{'scan ms':>9}")
+        for query in QUERIES:
+            _, total = index.search(**query)
+            index_ms = timed(lambda: index.search(**query))
+            scan_ms = timed(lambda: linear_search(catalog["financial_products"], **query))
+            print(f"  {str(query):<70}{total:>8}{index_ms:>10.3f}{scan_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
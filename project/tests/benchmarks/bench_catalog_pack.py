@@ -0,0 +1,55 @@
+"""Measure catalog cold-start time: JSON catalog vs catalog pack.
+
+Run from the project directory:
+    python -m tests.benchmarks.bench_catalog_pack
+
+A cold start has to turn the catalog object into an index and answer the
+first get_available_products query. From JSON that means parsing every
+product and building the index; from a pack it means verifying the checksum
+and wrapping the prebuilt arrays, either over the bytes read from S3 or over a
+memory map of the bundled file. Each row is the best of a few runs.
+"""
+import os
+import json
+import tempfile
+import time
+
+from tests.benchmarks.bench_catalog_index import synthetic_catalog
+from tests.unit.conftest import load_lambda
+
+
+FIRST_QUERY = {"risk_levels": ["low", "medium"], "text": "income", "top_k": 20}
+
+
+def best_ms(call, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    load_lambda("lambda_portfolio_architect", "portfolio_architect_lambda")
+    from catalog_index import CatalogIndex
+    from catalog_pack import CatalogPack, pack_catalog
+
+    print(f"{'products':>9}{'json KB':>9}{'pack KB':>9}{'json ms':>9}{'bytes ms':>10}{'mmap ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (1000, 10000, 50000):
+            catalog = synthetic_catalog(size)
+            json_bytes = json.dumps(catalog, ensure_ascii=False).encode("utf-8")
+            pack_bytes = pack_catalog(catalog)
+            pack_path = os.path.join(directory, f"catalog-{size}.catpack")
+            with open(pack_path, "wb") as f:
+                f.write(pack_bytes)
+
+            json_ms = best_ms(lambda: CatalogIndex(json.loads(json_bytes.decode("utf-8"))).search(**FIRST_QUERY))
+            bytes_ms = best_ms(lambda: CatalogPack(pack_bytes).index().search(**FIRST_QUERY))
+            mmap_ms = best_ms(lambda: CatalogPack.open(pack_path).index().search(**FIRST_QUERY))
+            print(f"{size:>9}{len(json_bytes) / 1024:>9.0f}{len(pack_bytes) / 1024:>9.0f}{json_ms:>9.1f}{bytes_ms:>10.1f}{mmap_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare get_market_data against the previous serial loop on recorded quotes replayed with upstream-like latency.
+
+Run from the project directory:
+    python -m tests.benchmarks.bench_market_data
+"""
+import os
+import json
+import random
+import statistics
+import tempfile
+import time
+
+from tests.unit.conftest import load_lambda
+
+
+ROUNDS = 20
+
+
+def quote_latency(rng=random.Random(7)):
+    # Shaped like the real quote endpoint: mostly fast, with a slow tail
+    return rng.uniform(0.15, 0.45) if rng.random() > 0.1 else rng.uniform(1.0, 2.0)
+
+
+def write_quote_fixtures(module, fixture_dir):
+    os.makedirs(os.path.join(fixture_dir, "quote"))
+    for info in module.MARKET_INDICATORS.values():
+        with open(os.path.join(fixture_dir, "quote", f"{info['ticker']}.json"), "w") as f:
+            json.dump({"regularMarketPreviousClose": 100.0}, f)
+
+
+def serial_market_data(module):
+    # The loop get_market_data used before it fetched indicators concurrently
+    data = {}
+    for key, info in module.MARKET_INDICATORS.items():
+        market_price = module.get_data_provider().quote(info["ticker"]).get('regularMarketPreviousClose', 0)
+        data[key] = {"description": info["description"], "value": round(market_price, 2)}
+    return data
+
+
+def measure(fn):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], timings[-1]
+
+
+def main():
+    module = load_lambda("lambda_risk_manager", "risk_manager_lambda")
+    import market_data
+
+    fixture_dir = os.path.join(tempfile.mkdtemp(), "fixtures")
+    write_quote_fixtures(module, fixture_dir)
+    module.data_provider = market_data.FixtureProvider(fixture_dir, latency=quote_latency)
+
+    results = {
+        "serial": measure(lambda: serial_market_data(module)),
+        "concurrent": measure(lambda: module.get_market_data(use_snapshot=False))
+    }
+
+    print(f"{'variant':<12}{'p50 (s)':>10}{'p95 (s)':>10}{'max (s)':>10}")
+    for name, (p50, p95, worst) in results.items():
+        print(f"{name:<12}{p50:>10.2f}{p95:>10.2f}{worst:>10.2f}")
+    print(f"p50 speedup: {results['serial'][0] / results['concurrent'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Time the Portfolio Architect analytics on synthetic catalogs.
+
+Run from the project directory:
+    python -m tests.benchmarks.bench_portfolio_analytics
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from tests.unit.conftest import load_lambda
+
+
+def synthetic_history(n_tickers, n_days, seed=1):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp("2025-06-30"), periods=n_days).strftime('%Y-%m-%d')
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, (n_days, n_tickers)), axis=0))
+    return {f"T{i:04d}": dict(zip(index, closes[:, i])) for i in range(n_tickers)}
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench_statistics():
+    from portfolio_analytics import aligned_price_matrix, portfolio_statistics
+
+    print("get_portfolio_statistics (alignment + one NumPy pass)")
+    for n_tickers in (10, 100, 500):
+        history = synthetic_history(n_tickers, 252)
+        align, (_, _, prices, _) = timed(lambda: aligned_price_matrix(history))
+        compute, _ = timed(lambda: portfolio_statistics(prices))
+        print(f"  {n_tickers:>4} tickers x 1y: align {align * 1000:7.1f} ms, statistics {compute * 1000:7.1f} ms")
+
+
+def bench_simulation():
+    from portfolio_analytics import aligned_price_matrix, daily_returns, simulate_terminal_values
+
+    print("simulate_portfolio (1y bootstrap paths)")
+    _, _, prices, _ = aligned_price_matrix(synthetic_history(10, 756))
+    portfolio_returns = daily_returns(prices) @ np.full(10, 0.1)
+    for n_paths in (10000, 50000, 200000):
+        elapsed, _ = timed(lambda: simulate_terminal_values(portfolio_returns, 10000, n_paths, seed=0), repeat=3)
+        print(f"  {n_paths:>7} paths: {elapsed * 1000:7.1f} ms ({n_paths / elapsed:,.0f} paths/s)")
+
+
+def bench_backtest():
+    from portfolio_analytics import aligned_price_matrix, backtest, backtest_metrics, rebalance_starts
+
+    print("backtest_allocation (monthly rebalancing, 10y)")
+    dates, _, prices, _ = aligned_price_matrix(synthetic_history(20, 2520))
+    weights = np.random.default_rng(2).dirichlet(np.ones(20), size=1000)
+    starts = rebalance_starts(dates, 'monthly')
+    for n_allocations in (1, 100, 1000):
+        elapsed, _ = timed(lambda: backtest_metrics(backtest(prices, weights[:n_allocations], starts)), repeat=3)
+        print(f"  {n_allocations:>5} allocations x 20 tickers x 10y: {elapsed * 1000:7.1f} ms")
+
+
+def bench_optimizer():
+    from portfolio_analytics import aligned_price_matrix, daily_returns, efficient_portfolio, shrinkage_covariance
+
+    print("optimize_allocation (shrinkage covariance, 3y)")
+    for n_tickers in (10, 50, 200):
+        _, _, prices, _ = aligned_price_matrix(synthetic_history(n_tickers, 756))
+        returns = daily_returns(prices)
+        estimate, (cov, _) = timed(lambda: shrinkage_covariance(returns))
+        mean_returns = returns.mean(axis=0) * 252
+        target = float(np.median(mean_returns))
+        solve, _ = timed(lambda: efficient_portfolio(mean_returns, cov * 252, target_return=target))
+        print(f"  {n_tickers:>4} tickers: covariance {estimate * 1000:6.2f} ms (cached per day), solve {solve * 1000:6.2f} ms")
+
+
+def bench_indicators():
+    from indicators import latest_indicators, right_aligned_matrix
+
+    print("get_product_indicators (1y of closes per ticker)")
+    for n_tickers in (3, 50, 500):
+        history = synthetic_history(n_tickers, 252)
+        align, matrix = timed(lambda: right_aligned_matrix(history))
+        compute, _ = timed(lambda: latest_indicators(matrix))
+        print(f"  {n_tickers:>4} tickers: align {align * 1000:6.2f} ms, indicators {compute * 1000:6.2f} ms")
+
+
+def main():
+    load_lambda("lambda_portfolio_architect", "portfolio_architect_lambda")
+    bench_statistics()
+    bench_simulation()
+    bench_backtest()
+    bench_optimizer()
+    bench_indicators()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Time and memory of get_risk_metrics for large portfolios, with the market data provider stubbed out.
+
+Run from the project directory:
+    python -m tests.benchmarks.bench_risk_metrics
+"""
+import json
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from tests.unit.conftest import load_lambda
+
+
+def synthetic_closes(n_tickers):
+    rng = np.random.default_rng(5)
+    index = pd.bdate_range("2008-01-01", date.today() - timedelta(days=1))
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.012, (len(index), n_tickers)), axis=0))
+    return pd.DataFrame(closes, index=index, columns=[f"T{i:03d}" for i in range(n_tickers)])
+
+
+class SyntheticProvider:
+    """Serves batch_history from an in-memory close matrix"""
+
+    def __init__(self, closes):
+        self.closes = closes
+
+    def batch_history(self, tickers, start, end):
+        window = self.closes[(self.closes.index >= pd.Timestamp(start)) & (self.closes.index < pd.Timestamp(end))]
+        return {ticker: window[ticker] for ticker in tickers if ticker in window.columns}
+
+
+def main():
+    module = load_lambda("lambda_risk_manager", "risk_manager_lambda")
+    print(f"{'tickers':>8}{'years':>7}{'cold (ms)':>11}{'warm (ms)':>11}{'peak MB':>9}")
+
+    for n_tickers in (10, 50, 200):
+        closes = synthetic_closes(n_tickers)
+        module.data_provider = SyntheticProvider(closes)
+        module.price_history.clear()
+        allocation = json.dumps({ticker: 1 for ticker in closes.columns})
+
+        for years in (5, 15):
+            module.price_history.clear()
+            tracemalloc.start()
+            started = time.perf_counter()
+            module.get_risk_metrics(allocation, "[0.95, 0.975, 0.99]", years)
+            cold = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+            started = time.perf_counter()
+            module.get_risk_metrics(allocation, "[0.95, 0.975, 0.99]", years)
+            warm = time.perf_counter() - started
+            print(f"{n_tickers:>8}{years:>7}{cold * 1000:>11.1f}{warm * 1000:>11.1f}{peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
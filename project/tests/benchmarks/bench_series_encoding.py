@@ -0,0 +1,55 @@
+"""Measure response size of the get_product_data formats.
+
+Run from the project directory:
+    python -m tests.benchmarks.bench_series_encoding
+
+Token counts are estimated with a BPE-like split (digits in groups of up
+to three, words, single punctuation marks), which tracks the tokenizers
+used by the agent's models closely enough to compare formats.
+"""
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+from tests.unit.conftest import load_lambda
+
+
+TOKEN_PATTERN = re.compile(r"\d{1,3}|[A-Za-z]+|[^\sA-Za-z\d]")
+TICKERS = ["SPY", "QQQ", "TLT", "GLD", "VNQ"]
+
+
+def estimate_tokens(text):
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def sample_history(days=100):
+    rng = np.random.default_rng(42)
+    # Weekdays in the window minus a couple of market holidays
+    index = pd.bdate_range(end=pd.Timestamp("2025-06-30"), periods=days * 5 // 7).delete([10, 40])
+    history = {}
+    for i, ticker in enumerate(TICKERS):
+        closes = 100 * (i + 1) * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+        history[ticker] = {day.strftime('%Y-%m-%d'): round(float(close), 2) for day, close in zip(index, closes)}
+    return history
+
+
+def main():
+    load_lambda("lambda_portfolio_architect", "portfolio_architect_lambda")
+    from series_codec import SERIES_FORMATS, encode_series
+
+    history = sample_history()
+    print(f"{len(TICKERS)} tickers x {len(history['SPY'])} closes")
+    print(f"{'format':<10}{'bytes':>8}{'tokens':>8}{'bytes %':>9}{'tokens %':>10}")
+
+    baseline = None
+    for fmt in SERIES_FORMATS:
+        body = json.dumps({ticker: encode_series(prices, fmt) for ticker, prices in history.items()}, ensure_ascii=False)
+        size, tokens = len(body.encode("utf-8")), estimate_tokens(body)
+        baseline = baseline or (size, tokens)
+        print(f"{fmt:<10}{size:>8}{tokens:>8}{100 * size / baseline[0]:>8.0f}%{100 * tokens / baseline[1]:>9.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+FILES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "files"))
+# Modules the Lambdas share ship as a layer, which Lambda puts on the import path from /opt/python
+SHARED_LAYER_DIR = os.path.join(FILES_DIR, "shared_layer", "python")
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("S3_BUCKET_NAME", "test-bucket")
+
+
+def load_lambda(directory, module_name, file_name="lambda_function.py"):
+    """Import a Lambda's lambda_function.py (or another of its modules) under a unique module name"""
+    lambda_dir = os.path.join(FILES_DIR, directory)
+    for path in (SHARED_LAYER_DIR, lambda_dir):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(lambda_dir, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def portfolio_architect():
+    return load_lambda("lambda_portfolio_architect", "portfolio_architect_lambda")
+
+
+@pytest.fixture
+def risk_manager():
+    return load_lambda("lambda_risk_manager", "risk_manager_lambda")
@@ -37,6 +37,10 @@ def test_lambda_layer_created():
         "CompatibleArchitectures": ["x86_64"],
         "LicenseInfo": "Apache License 2.0"
     })
+    template.has_resource_properties("AWS::Lambda::LayerVersion", {
+        "LayerName": "shared-modules-layer",
+        "CompatibleRuntimes": ["python3.12"]
+    })
 
 
 def test_bedrock_prompts_created():
@@ -108,6 +112,7 @@ def test_stack_outputs():
     # Check all outputs exist
     template.has_output("S3BucketName", {})
     template.has_output("YFinanceLayerArn", {})
+    template.has_output("SharedModulesLayerArn", {})
     template.has_output("FinancialAnalystPromptId", {})
     template.has_output("FinancialAnalystPromptArn", {})
     template.has_output("FinancialAnalystReflectionPromptId", {})
@@ -123,7 +128,7 @@ def test_resource_count():
 
     # Check we have the expected resources
     template.resource_count_is("AWS::S3::Bucket", 1)
-    template.resource_count_is("AWS::Lambda::LayerVersion", 2)  # yfinance + AWS CLI layer
+    template.resource_count_is("AWS::Lambda::LayerVersion", 3)  # yfinance + shared modules + AWS CLI layer
     template.resource_count_is("AWS::Bedrock::Prompt", 2)
 
 
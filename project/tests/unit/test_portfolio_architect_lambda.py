@@ -0,0 +1,828 @@
+import io
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+import yfinance as yf
+from botocore.exceptions import ClientError
+
+from tests.unit.conftest import FILES_DIR, load_lambda
+
+
+# Price windows end after the last completed market session
+calendar = load_lambda("shared_layer/python", "portfolio_architect_calendar", "market_calendar.py")
+LAST_SESSION = calendar.last_completed_session(settle=calendar.DATA_SETTLE_DELAY)
+END_DATE = LAST_SESSION + timedelta(days=1)
+pack_catalog = load_lambda("lambda_portfolio_architect", "portfolio_architect_pack", "catalog_pack.py").pack_catalog
+
+
+def make_download(tickers, periods=80):
+    """Build a fake yf.download serving business-day closes that end at the last completed session"""
+    index = pd.bdate_range(end=LAST_SESSION, periods=periods)
+    closes = pd.DataFrame(
+        {ticker: 100.0 * (i + 1) + np.arange(len(index)) * 0.123 for i, ticker in enumerate(tickers)},
+        index=index
+    )
+    calls = []
+
+    def download(requested, start=None, end=None, **kwargs):
+        calls.append((list(requested), start))
+        window = closes.loc[(closes.index.date >= start) & (closes.index.date < end)]
+        return pd.concat({"Close": window[[t for t in requested if t in window]]}, axis=1)
+
+    download.calls = calls
+    download.closes = closes
+    return download
+
+
+class FakeContext:
+    """Lambda context with a fixed amount of time left"""
+
+    def __init__(self, remaining_millis):
+        self.remaining_millis = remaining_millis
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_millis
+
+
+def invoke(module, function, session_id=None, context=None, **parameters):
+    event = {
+        "actionGroup": "PortfolioArchitect",
+        "messageVersion": "1.0",
+        "function": function,
+        "parameters": [{"name": name, "value": value} for name, value in parameters.items()]
+    }
+    if session_id:
+        event["sessionId"] = session_id
+    response = module.lambda_handler(event, context)
+    return json.loads(response["response"]["functionResponse"]["responseBody"]["TEXT"]["body"])
+
+
+@pytest.fixture(autouse=True)
+def local_price_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("PRICE_STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_parse_tickers_accepts_agent_formats(portfolio_architect):
+    assert portfolio_architect.parse_tickers('["SPY", "QQQ"]') == ["SPY", "QQQ"]
+    assert portfolio_architect.parse_tickers("[SPY, QQQ, SPY]") == ["SPY", "QQQ"]
+    assert portfolio_architect.parse_tickers("TLT") == ["TLT"]
+
+
+def test_product_data_batch_uses_one_download(portfolio_architect, monkeypatch):
+    download = make_download(["SPY", "QQQ"])
+    download.closes.iloc[-1, 0] = np.nan
+    monkeypatch.setattr(yf, "download", download)
+
+    output = invoke(portfolio_architect, "get_product_data_batch", tickers='["SPY", "QQQ", "GLD"]')
+
+    assert len(download.calls) == 1
+    assert download.calls[0][0] == ["SPY", "QQQ", "GLD"]
+    assert len(output["SPY"]) == len(output["QQQ"]) - 1
+    last_day = download.closes.index[-1].strftime("%Y-%m-%d")
+    assert output["QQQ"][last_day] == round(download.closes["QQQ"].iloc[-1], 2)
+    assert output["GLD"] == {}
+
+
+def test_slow_download_returns_stored_prices_marked_incomplete(portfolio_architect, monkeypatch):
+    download = make_download(["SPY", "QQQ"])
+    monkeypatch.setattr(yf, "download", lambda *args, **kwargs: time.sleep(2.0) or download(*args, **kwargs))
+    # 2.3s left minus the 2s reserve leaves the download 0.3s
+    context = FakeContext(2300)
+
+    started = time.perf_counter()
+    output = invoke(portfolio_architect, "get_product_data_batch", session_id="s1", context=context, tickers='["SPY", "QQQ"]')
+    assert time.perf_counter() - started < 1.0
+    assert output == {"result": {"SPY": {}, "QQQ": {}}, "incomplete": True, "timed_out": ["price history for SPY, QQQ"]}
+
+    # Partial outputs are not memoized, so the next call in the session fetches again
+    monkeypatch.setattr(yf, "download", download)
+    output = invoke(portfolio_architect, "get_product_data_batch", session_id="s1", context=context, tickers='["SPY", "QQQ"]')
+    assert "incomplete" not in output and output["SPY"] and output["QQQ"]
+
+
+def test_product_data_batch_requires_tickers(portfolio_architect):
+    assert "error" in invoke(portfolio_architect, "get_product_data_batch", tickers="[]")
+
+
+def test_repeated_calls_in_a_session_are_memoized(portfolio_architect, monkeypatch, capsys):
+    monkeypatch.setattr(yf, "download", make_download(["SPY", "QQQ"]))
+    calls = []
+
+    def counted(function):
+        def wrapper(*args, **kwargs):
+            calls.append(function.__name__)
+            return function(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(portfolio_architect, "get_product_data_batch", counted(portfolio_architect.get_product_data_batch))
+    first = invoke(portfolio_architect, "get_product_data_batch", session_id="s1", tickers='["SPY", "QQQ"]', max_points="20")
+    # Same call with the parameters reordered and serialized differently
+    repeat = invoke(portfolio_architect, "get_product_data_batch", session_id="s1", max_points="20", tickers='[ "SPY","QQQ" ]')
+    assert repeat == first
+    assert len(calls) == 1
+    assert 'Tool memo hit for get_product_data_batch: {"hit": 1, "miss": 1, "hit_rate": 0.5}' in capsys.readouterr().out
+
+    # Other sessions, other arguments, calls without a session and errors are not served from memory
+    invoke(portfolio_architect, "get_product_data_batch", session_id="s2", tickers='["SPY", "QQQ"]', max_points="20")
+    invoke(portfolio_architect, "get_product_data_batch", session_id="s1", tickers='["SPY"]', max_points="20")
+    invoke(portfolio_architect, "get_product_data_batch", tickers='["SPY", "QQQ"]', max_points="20")
+    invoke(portfolio_architect, "get_product_data_batch", session_id="s1", tickers="[]")
+    invoke(portfolio_architect, "get_product_data_batch", session_id="s1", tickers="[]")
+    assert len(calls) == 6
+
+    # Entries expire after the TTL and the least recently used are evicted
+    monkeypatch.setattr(portfolio_architect.tool_memo, "ttl_seconds", 0)
+    invoke(portfolio_architect, "get_product_data_batch", session_id="s1", tickers='["SPY", "QQQ"]', max_points="20")
+    assert len(calls) == 7
+    monkeypatch.setattr(portfolio_architect.tool_memo, "max_entries", 2)
+    monkeypatch.setattr(portfolio_architect.tool_memo, "ttl_seconds", 300)
+    for session_id in ["s3", "s4", "s5"]:
+        invoke(portfolio_architect, "get_product_data_batch", session_id=session_id, tickers='["SPY"]')
+    assert len(portfolio_architect.tool_memo.entries) == 2
+
+
+def test_product_data_fetches_only_missing_dates(portfolio_architect, monkeypatch, local_price_store):
+    download = make_download(["SPY"])
+    monkeypatch.setattr(yf, "download", download)
+
+    stored = download.closes["SPY"].iloc[:-5]
+    checked_through = stored.index[-1].date()
+    store = portfolio_architect.get_price_store()
+    store.save("SPY", {
+        "ticker": "SPY",
+        "covered_from": (END_DATE - timedelta(days=100)).isoformat(),
+        "checked_through": checked_through.isoformat(),
+        "prices": {day.strftime("%Y-%m-%d"): price for day, price in stored.items()}
+    })
+
+    output = invoke(portfolio_architect, "get_product_data", ticker="SPY")
+
+    # The last stored close is fetched again to check that Yahoo hasn't re-adjusted the history
+    assert download.calls == [(["SPY"], checked_through)]
+    assert list(output["SPY"])[-1] == download.closes.index[-1].strftime("%Y-%m-%d")
+
+    # Warm container and a cold start reading the store are both served without an upstream call
+    invoke(portfolio_architect, "get_product_data", ticker="SPY")
+    portfolio_architect.price_store = None
+    assert invoke(portfolio_architect, "get_product_data", ticker="SPY") == output
+    assert len(download.calls) == 1
+    assert (local_price_store / "price_history" / "SPY.json").exists()
+
+
+def test_split_readjusting_the_history_replaces_stored_closes(portfolio_architect, monkeypatch, local_price_store):
+    download = make_download(["SPY"])
+    monkeypatch.setattr(yf, "download", download)
+    stored = download.closes["SPY"].iloc[:-5]
+    store = portfolio_architect.get_price_store()
+    store.save("SPY", {
+        "ticker": "SPY",
+        "covered_from": (END_DATE - timedelta(days=100)).isoformat(),
+        "checked_through": stored.index[-1].date().isoformat(),
+        "prices": {day.strftime("%Y-%m-%d"): price for day, price in stored.items()}
+    })
+
+    # A 2:1 split since the last download: Yahoo now serves every past close halved
+    download.closes["SPY"] /= 2
+    output = invoke(portfolio_architect, "get_product_data", ticker="SPY")
+
+    assert [start for _, start in download.calls] == [stored.index[-1].date(), END_DATE - timedelta(days=100)]
+    window = download.closes["SPY"][download.closes.index.date >= END_DATE - timedelta(days=100)]
+    assert output["SPY"] == {day.strftime("%Y-%m-%d"): round(price, 2) for day, price in window.items()}
+    first_day = window.index[0].strftime("%Y-%m-%d")
+    assert store.load("SPY")["prices"][first_day] == pytest.approx(stored[first_day] / 2, abs=1e-4)
+
+
+def test_session_missing_upstream_is_fetched_again(portfolio_architect, monkeypatch, local_price_store):
+    # Yahoo has not published the last session yet: the store is only checked through the closes it returned
+    download = make_download(["SPY"])
+    download.closes.drop(index=download.closes.index[-1], inplace=True)
+    monkeypatch.setattr(yf, "download", download)
+    invoke(portfolio_architect, "get_product_data", ticker="SPY")
+    previous_close = download.closes.index[-1].date()
+    assert portfolio_architect.get_price_store().load("SPY")["checked_through"] == previous_close.isoformat()
+
+    download = make_download(["SPY"])
+    monkeypatch.setattr(yf, "download", download)
+    output = invoke(portfolio_architect, "get_product_data", ticker="SPY")
+    assert download.calls == [(["SPY"], previous_close)]
+    assert list(output["SPY"])[-1] == LAST_SESSION.isoformat()
+    assert portfolio_architect.get_price_store().load("SPY")["checked_through"] == LAST_SESSION.isoformat()
+
+
+def test_recorded_market_data_replays_without_network(portfolio_architect, monkeypatch, tmp_path):
+    market_data = load_lambda("shared_layer/python", "portfolio_architect_market_data", "market_data.py")
+    download = make_download(["SPY", "QQQ"])
+    monkeypatch.setattr(yf, "download", download)
+    monkeypatch.setattr(portfolio_architect, "data_provider", market_data.RecordingProvider(market_data.YFinanceProvider(), str(tmp_path / "fixtures")))
+    recorded = invoke(portfolio_architect, "get_product_data_batch", tickers='["SPY", "QQQ"]')
+
+    # A cold start pointed at the recording serves the same answer with yfinance unreachable
+    monkeypatch.setattr(yf, "download", None)
+    monkeypatch.setenv("PRICE_STORE_DIR", str(tmp_path / "empty_store"))
+    monkeypatch.setenv("MARKET_DATA_FIXTURE_DIR", str(tmp_path / "fixtures"))
+    monkeypatch.setenv("MARKET_DATA_FIXTURE_LATENCY_MS", "50")
+    replay = load_lambda("lambda_portfolio_architect", "portfolio_architect_replay")
+
+    started = time.perf_counter()
+    assert invoke(replay, "get_product_data_batch", tickers='["SPY", "QQQ"]') == recorded
+    # One bulk request, so the latency is paid once
+    assert 0.05 <= time.perf_counter() - started < 0.5
+    assert invoke(replay, "get_product_data", ticker="GLD") == {"GLD": {}}
+
+
+class FakeS3:
+    """Minimal S3 client honouring If-None-Match for a single catalog object"""
+
+    def __init__(self, body, etag='"v1"', fail=False):
+        self.body, self.etag, self.fail = body, etag, fail
+        self.requests = []
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        self.requests.append(IfNoneMatch)
+        if self.fail:
+            raise ClientError({"Error": {"Code": "RequestTimeout"}, "ResponseMetadata": {"HTTPStatusCode": 500}}, "GetObject")
+        if IfNoneMatch == self.etag:
+            raise ClientError({"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}, "GetObject")
+        return {"Body": io.BytesIO(self.body if isinstance(self.body, bytes) else self.body.encode("utf-8")), "ETag": self.etag}
+
+
+def test_available_products_cached_and_revalidated(portfolio_architect, monkeypatch):
+    fake_s3 = FakeS3(json.dumps({"SPY": "S&P 500"}))
+    monkeypatch.setattr(portfolio_architect, "s3", fake_s3)
+
+    expected = {"products": [{"ticker": "SPY", "description": "S&P 500"}], "total_matches": 1}
+    assert invoke(portfolio_architect, "get_available_products") == expected
+    assert invoke(portfolio_architect, "get_available_products") == expected
+    assert fake_s3.requests == [None]
+
+    cache = portfolio_architect.get_catalog_cache()
+    cache.revalidate_seconds = 0
+    assert invoke(portfolio_architect, "get_available_products") == expected
+    assert fake_s3.requests == [None, '"v1"']
+    assert cache.stats == {"hit": 1, "miss": 1, "revalidated": 1, "fallback": 0}
+
+
+def test_available_products_falls_back_to_bundled_copy(portfolio_architect, monkeypatch):
+    monkeypatch.setattr(portfolio_architect, "s3", FakeS3("", fail=True))
+
+    with open(os.path.join(FILES_DIR, "available_products_en.json"), encoding="utf-8") as f:
+        published = json.load(f)
+
+    # The bundled copies must stay in sync with the catalog deployed to S3; the pack is served first
+    assert invoke(portfolio_architect, "get_available_products")["products"] == published["financial_products"]
+    assert portfolio_architect.get_catalog_cache().stats["fallback"] == 1
+    assert isinstance(portfolio_architect.get_catalog_cache().products, portfolio_architect.CatalogPack)
+    bundled = portfolio_architect.CatalogPack.open(os.path.join(FILES_DIR, "lambda_portfolio_architect", "available_products_en.catpack"))
+    assert bundled.checksum == portfolio_architect.CatalogPack(pack_catalog(published)).checksum
+
+
+def test_catalog_pack_serves_the_same_queries_as_json(portfolio_architect, monkeypatch):
+    catalog = {"financial_products": [
+        {"id": f"P{i:03d}", "ticker": f"T{i:03d}", "name": f"{['Growth', 'Income', 'Value'][i % 3]} Fund {i}",
+         "type": ["equity", "fixed_income"][i % 2], "risk_level": ["low", "medium", "high"][i % 3],
+         "minimum_investment": 250 * (i % 7), "description": "Diversified portfolio"}
+        for i in range(60)
+    ]}
+    queries = [{}, {"type": "equity", "risk_level": "low, high"}, {"max_minimum_investment": "750", "query": "inc"}, {"top_k": "7"}]
+
+    monkeypatch.setattr(portfolio_architect, "s3", FakeS3(json.dumps(catalog)))
+    from_json = [invoke(portfolio_architect, "get_available_products", **query) for query in queries]
+
+    packed = pack_catalog(catalog)
+    monkeypatch.setattr(portfolio_architect, "catalog_cache", None)
+    monkeypatch.setattr(portfolio_architect, "s3", FakeS3(packed))
+    assert [invoke(portfolio_architect, "get_available_products", **query) for query in queries] == from_json
+    assert portfolio_architect.load_catalog() == catalog
+
+    # A pack that fails its checksum is skipped for the JSON catalog
+    class KeyedS3(FakeS3):
+        def get_object(self, Bucket, Key, IfNoneMatch=None):
+            self.body = {"available_products_en.catpack": packed[:-1] + b"!", "available_products_en.json": json.dumps(catalog)}[Key]
+            return super().get_object(Bucket, Key, IfNoneMatch)
+
+    monkeypatch.setattr(portfolio_architect, "catalog_cache", None)
+    monkeypatch.setattr(portfolio_architect, "s3", KeyedS3(""))
+    assert portfolio_architect.load_catalog() == catalog
+    assert portfolio_architect.get_catalog_cache().key == "available_products_en.json"
+
+
+def test_available_products_filters_ranks_and_pages(portfolio_architect, monkeypatch):
+    catalog = {"financial_products": [
+        {"id": "EQ1", "name": "Global Equity Fund", "type": "equity", "risk_level": "high", "minimum_investment": 1000, "description": "Technology and healthcare stocks"},
+        {"id": "EQ2", "name": "Technology Growth Fund", "type": "equity", "risk_level": "high", "minimum_investment": 5000, "description": "Growth companies"},
+        {"id": "EQ3", "name": "Dividend Fund", "type": "equity", "risk_level": "medium", "minimum_investment": 500, "description": "Income stocks"},
+        {"id": "BD1", "name": "Treasury Fund", "type": "fixed_income", "risk_level": "low", "minimum_investment": 500, "description": "Government bonds"},
+        {"id": "BD2", "name": "Corporate Bond Fund", "type": "fixed_income", "risk_level": "medium", "minimum_investment": 2500, "description": "Investment grade bonds"},
+    ]}
+    monkeypatch.setattr(portfolio_architect, "s3", FakeS3(json.dumps(catalog)))
+
+    def ids(**parameters):
+        return [product["id"] for product in invoke(portfolio_architect, "get_available_products", **parameters)["products"]]
+
+    assert ids(type="equity") == ["EQ1", "EQ2", "EQ3"]
+    assert ids(type='["fixed_income"]', risk_level="MEDIUM") == ["BD2"]
+    assert ids(risk_level="low, medium", max_minimum_investment="1000") == ["EQ3", "BD1"]
+    # Query words are prefixes; a match in the name ranks above one in the description
+    assert ids(query="tech") == ["EQ2", "EQ1"]
+    assert ids(query="bond") == ["BD2", "BD1"]
+    assert ids(query="fund govern") == ["BD1"]
+    assert ids(type="commodity") == []
+
+    first = invoke(portfolio_architect, "get_available_products", type="equity", top_k="2")
+    assert [product["id"] for product in first["products"]] == ["EQ1", "EQ2"] and first["total_matches"] == 3
+    rest = invoke(portfolio_architect, "get_available_products", type="equity", top_k="2", continuation_token=first["continuation_token"])
+    assert [product["id"] for product in rest["products"]] == ["EQ3"] and "continuation_token" not in rest
+    assert "error" in invoke(portfolio_architect, "get_available_products", type="bond", top_k="2", continuation_token=first["continuation_token"])
+    assert "error" in invoke(portfolio_architect, "get_available_products", max_minimum_investment="lots")
+
+
+def invoke_all_pages(module, function, **parameters):
+    """Follow continuation tokens, returning every raw response body"""
+    pages = [invoke(module, function, **parameters)]
+    while "continuation_token" in pages[-1]:
+        pages.append(invoke(module, function, continuation_token=pages[-1]["continuation_token"], **parameters))
+    return pages
+
+
+def body_bytes(output):
+    return len(json.dumps(output, ensure_ascii=False).encode("utf-8"))
+
+
+def test_oversized_catalog_is_trimmed_and_paginated(portfolio_architect, monkeypatch):
+    catalog = {"financial_products": [
+        {"id": f"P{i:04d}", "ticker": f"T{i:04d}", "name": f"Fund {i}", "description": "Broad market exposure " * 4}
+        for i in range(400)
+    ]}
+    monkeypatch.setattr(portfolio_architect, "s3", FakeS3(json.dumps(catalog)))
+    monkeypatch.setattr(portfolio_architect.response_budget, "max_bytes", 8000)
+
+    pages = invoke_all_pages(portfolio_architect, "get_available_products", top_k="400")
+
+    assert len(pages) > 1
+    assert all(body_bytes(page) <= 8000 for page in pages)
+    assert pages[0]["truncation"]["dropped_fields"] == ["id"]
+    # A page that fits the budget on its own comes back whole and unwrapped
+    products = [product for page in pages for product in page.get("result", page)["products"]]
+    assert [product["ticker"] for product in products] == [product["ticker"] for product in catalog["financial_products"]]
+
+    # Tokens only continue the call they were issued for
+    token = pages[0]["continuation_token"]
+    assert "error" in invoke(portfolio_architect, "get_product_indicators", tickers='["SPY"]', continuation_token=token)
+    assert "error" in invoke(portfolio_architect, "get_available_products", continuation_token="not-a-token")
+
+
+def test_oversized_price_data_is_downsampled_then_paginated(portfolio_architect, monkeypatch):
+    tickers = [f"T{i:02d}" for i in range(30)]
+    monkeypatch.setattr(yf, "download", make_download(tickers, periods=600))
+    monkeypatch.setattr(portfolio_architect.response_budget, "max_bytes", 6000)
+
+    # Two years of daily closes for one ticker fit once downsampled, keeping the extremes
+    single = invoke(portfolio_architect, "get_product_data", ticker="T00", period="2y")
+    assert body_bytes(single) <= 6000
+    assert "continuation_token" not in single
+    series = single["result"]["T00"]
+    assert len(series) <= single["truncation"]["series_points"]
+    assert series[min(series)] == min(series.values())
+    assert max(series) == LAST_SESSION.strftime("%Y-%m-%d")
+
+    # Thirty tickers still don't fit at the smallest series size, so they are split across pages
+    pages = invoke_all_pages(portfolio_architect, "get_product_data_batch", tickers=json.dumps(tickers), period="2y")
+    assert len(pages) > 1
+    assert all(body_bytes(page) <= 6000 for page in pages)
+    assert [ticker for page in pages for ticker in page["result"]] == tickers
+
+    # Encoded series are downsampled whole and never split across pages
+    from series_codec import decode_series
+    for fmt in ("compact", "delta"):
+        monkeypatch.setattr(portfolio_architect.response_budget, "max_bytes", 1500)
+        single = invoke(portfolio_architect, "get_product_data", ticker="T00", period="5y", format=fmt)
+        assert body_bytes(single) <= 1500 and "continuation_token" not in single
+        decoded = decode_series(single["result"]["T00"])
+        assert 0 < len(decoded) <= single["truncation"]["series_points"]
+        assert max(decoded) == LAST_SESSION.strftime("%Y-%m-%d")
+
+        monkeypatch.setattr(portfolio_architect.response_budget, "max_bytes", 6000)
+        pages = invoke_all_pages(portfolio_architect, "get_product_data_batch", tickers=json.dumps(tickers), period="2y", format=fmt)
+        assert all(body_bytes(page) <= 6000 for page in pages)
+        assert [ticker for page in pages for ticker in page["result"]] == tickers
+        assert all(decode_series(series) for page in pages for series in page["result"].values())
+
+    # Outputs within budget are returned as they are
+    assert "truncation" not in invoke(portfolio_architect, "get_product_data", ticker="T00", period="1mo")
+
+
+def test_incomplete_markers_stay_on_the_envelope_of_every_page(portfolio_architect):
+    from deadline import Deadline
+    from response_budget import ResponseBudget, body_size
+
+    tickers = [f"T{i:02d}" for i in range(30)]
+    deadline = Deadline()
+    deadline.miss("price history for T29")
+    output = deadline.mark({ticker: {"2025-01-02": 100.0, "2025-01-03": 101.0, "2025-01-06": 102.0} for ticker in tickers})
+    assert set(output["result"]) == set(tickers)
+
+    budget = ResponseBudget(max_bytes=600)
+    assert ResponseBudget(max_bytes=10000).apply("get_product_data_batch", [], output) is output
+    pages, token = [], None
+    while True:
+        page = budget.apply("get_product_data_batch", [], output, token)
+        pages.append(page)
+        token = page.get("continuation_token")
+        if not token:
+            break
+
+    assert len(pages) > 1 and all(body_size(page) <= 600 for page in pages)
+    assert all(page["incomplete"] is True and page["timed_out"] == ["price history for T29"] for page in pages)
+    assert [ticker for page in pages for ticker in page["result"]] == tickers
+
+
+def test_series_codec_round_trips_holidays_and_weekends():
+    from series_codec import decode_series, encode_series
+
+    # 2025-01-09 was a market holiday
+    weekdays = {"2025-01-07": 590.12, "2025-01-08": 589.5, "2025-01-10": 580.0, "2025-01-13": 581.26}
+    compact = encode_series(weekdays, "compact")
+    assert compact == {"start": "2025-01-07", "calendar": "weekdays", "skip": [2], "closes": [590.12, 589.5, 580.0, 581.26]}
+    assert decode_series(compact) == weekdays
+
+    delta = encode_series(weekdays, "delta")
+    assert delta["deltas"] == [59012, -62, -950, 126]
+    assert decode_series(delta) == weekdays
+
+    daily = {"2025-01-03": 97000.5, "2025-01-04": 98000.25, "2025-01-06": 99000.0}
+    assert encode_series(daily, "compact")["calendar"] == "daily"
+    assert decode_series(encode_series(daily, "delta")) == daily
+
+
+def test_compact_format_of_resampled_series_is_no_larger_than_dates(portfolio_architect, monkeypatch):
+    from series_codec import decode_series
+
+    monkeypatch.setattr(yf, "download", make_download(["SPY"], periods=1300))
+    for shape in ({"interval": "1wk"}, {"interval": "1mo"}, {"max_points": "60"}):
+        dates = invoke(portfolio_architect, "get_product_data", ticker="SPY", period="5y", **shape)
+        for fmt in ("compact", "delta"):
+            encoded = invoke(portfolio_architect, "get_product_data", ticker="SPY", period="5y", format=fmt, **shape)
+            assert "gaps" in encoded["SPY"] and "skip" not in encoded["SPY"]
+            assert decode_series(encoded["SPY"]) == dates["SPY"]
+            assert len(json.dumps(encoded)) <= len(json.dumps(dates))
+
+
+def test_product_data_batch_compact_format(portfolio_architect, monkeypatch):
+    from series_codec import decode_series
+
+    monkeypatch.setattr(yf, "download", make_download(["SPY", "QQQ"]))
+
+    dates = invoke(portfolio_architect, "get_product_data_batch", tickers='["SPY", "QQQ"]')
+    compact = invoke(portfolio_architect, "get_product_data_batch", tickers='["SPY", "QQQ"]', format="compact")
+
+    assert {ticker: decode_series(series) for ticker, series in compact.items()} == dates
+    assert len(json.dumps(compact)) < len(json.dumps(dates)) / 2
+    assert "error" in invoke(portfolio_architect, "get_product_data", ticker="SPY", format="xml")
+
+
+def test_minmax_downsampling_keeps_extremes():
+    from downsample import minmax_indices
+
+    values = np.sin(np.linspace(0, 6 * np.pi, 500)) + np.linspace(0, 1, 500)
+    values[123] = 5.0
+    keep = minmax_indices(values, 40)
+
+    assert len(keep) <= 40
+    assert keep[0] == 0 and keep[-1] == 499
+    assert np.all(np.diff(keep) > 0)
+    assert values.argmax() in keep and values.argmin() in keep
+    assert list(minmax_indices(values[:30], 40)) == list(range(30))
+
+
+def test_market_calendar_expiry():
+    tz = calendar.EXCHANGE_TIMEZONE
+
+    assert sorted(calendar.market_holidays(2025)) == [
+        date(2025, 1, 1), date(2025, 1, 20), date(2025, 2, 17), date(2025, 4, 18), date(2025, 5, 26),
+        date(2025, 6, 19), date(2025, 7, 4), date(2025, 9, 1), date(2025, 11, 27), date(2025, 12, 25)
+    ]
+    # New Year's Day 2022 fell on a Saturday and was not observed on New Year's Eve
+    assert date(2021, 12, 31) not in calendar.market_holidays(2021) | calendar.market_holidays(2022)
+
+    # Friday's close stays current through the weekend and the Monday holiday until Tuesday's close
+    saturday = datetime(2025, 1, 18, 12, tzinfo=tz)
+    assert calendar.last_completed_session(saturday) == date(2025, 1, 17)
+    assert calendar.next_close(saturday) == datetime(2025, 1, 21, 16, tzinfo=tz)
+    assert calendar.last_completed_session(datetime(2025, 1, 21, 15, 59, tzinfo=tz)) == date(2025, 1, 17)
+    assert calendar.last_completed_session(datetime(2025, 1, 21, 16, 0, tzinfo=tz)) == date(2025, 1, 21)
+    # Data fetches wait for the close to settle
+    settle = calendar.DATA_SETTLE_DELAY
+    assert calendar.last_completed_session(datetime(2025, 1, 21, 16, 30, tzinfo=tz), settle) == date(2025, 1, 17)
+    assert calendar.last_completed_session(datetime(2025, 1, 21, 16, 45, tzinfo=tz), settle) == date(2025, 1, 21)
+    assert calendar.next_close(saturday, settle) == datetime(2025, 1, 21, 16, 45, tzinfo=tz)
+
+    # The day after Thanksgiving closes at 1pm
+    assert calendar.last_completed_session(datetime(2025, 11, 28, 13, 0, tzinfo=tz)) == date(2025, 11, 28)
+    assert calendar.trading_days_between(date(2025, 11, 26), date(2025, 12, 1)) == 2
+
+
+def test_product_data_period_interval_and_max_points(portfolio_architect, monkeypatch):
+    download = make_download(["SPY"])
+    monkeypatch.setattr(yf, "download", download)
+
+    daily = invoke(portfolio_architect, "get_product_data", ticker="SPY", period="1y")["SPY"]
+    assert download.calls[0][1] == (pd.Timestamp(END_DATE) - pd.DateOffset(years=1)).date()
+    assert len(daily) == 80
+
+    weekly = invoke(portfolio_architect, "get_product_data", ticker="SPY", period="1y", interval="1wk")["SPY"]
+    week_ends = pd.Series(list(daily)).groupby(pd.DatetimeIndex(list(daily)).to_period("W")).last()
+    assert list(weekly) == list(week_ends)
+
+    capped = invoke(portfolio_architect, "get_product_data", ticker="SPY", period="1y", max_points="10")["SPY"]
+    assert len(capped) <= 10
+    assert list(capped)[0] == list(daily)[0] and list(capped)[-1] == list(daily)[-1]
+    assert len(download.calls) == 1
+
+    assert "error" in invoke(portfolio_architect, "get_product_data", ticker="SPY", period="20y")
+    assert "error" in invoke(portfolio_architect, "get_product_data", ticker="SPY", interval="1h")
+
+
+def test_portfolio_statistics(portfolio_architect, monkeypatch):
+    download = make_download(["SPY", "QQQ"])
+    rng = np.random.default_rng(0)
+    download.closes["QQQ"] = 300 * np.exp(np.cumsum(rng.normal(0, 0.02, len(download.closes))))
+    monkeypatch.setattr(yf, "download", download)
+
+    output = invoke(portfolio_architect, "get_portfolio_statistics", tickers='["SPY", "QQQ", "GLD"]', risk_free_rate="0.02")
+
+    closes = download.closes.round(4)
+    returns = closes.pct_change().dropna()
+    years = len(returns) / 252
+    qqq = output["statistics"]["QQQ"]
+    expected = {
+        "annualized_return_pct": ((closes["QQQ"].iloc[-1] / closes["QQQ"].iloc[0]) ** (1 / years) - 1) * 100,
+        "volatility_pct": returns["QQQ"].std() * np.sqrt(252) * 100,
+        "max_drawdown_pct": (closes["QQQ"] / closes["QQQ"].cummax() - 1).min() * 100,
+        "sharpe_ratio": (returns["QQQ"].mean() * 252 - 0.02) / (returns["QQQ"].std() * np.sqrt(252))
+    }
+    assert qqq == pytest.approx(expected, abs=0.01)
+
+    # SPY rises steadily, so it never draws down
+    assert output["statistics"]["SPY"]["max_drawdown_pct"] == 0
+    assert output["correlation"]["tickers"] == ["SPY", "QQQ"]
+    matrix = np.array(output["correlation"]["matrix"])
+    assert np.allclose(matrix, matrix.T) and np.allclose(np.diag(matrix), 1)
+    assert matrix[0, 1] == pytest.approx(returns.corr().loc["SPY", "QQQ"], abs=0.01)
+    assert output["missing"] == ["GLD"]
+
+
+def test_product_indicators_match_pandas_reference(portfolio_architect, monkeypatch):
+    download = make_download(["SPY", "QQQ"], periods=300)
+    rng = np.random.default_rng(5)
+    download.closes["QQQ"] = 300 * np.exp(np.cumsum(rng.normal(0, 0.015, len(download.closes))))
+    # A listing 30 trading days ago is too short for the long moving average
+    download.closes.iloc[:-30, 0] = np.nan
+    monkeypatch.setattr(yf, "download", download)
+
+    output = invoke(portfolio_architect, "get_product_indicators", tickers='["SPY", "QQQ", "GLD"]')
+
+    closes = download.closes["QQQ"].round(4)
+    closes = closes[closes.index >= pd.Timestamp(END_DATE) - pd.DateOffset(years=1)]
+    change = closes.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean().iloc[-1]
+    loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean().iloc[-1]
+    last = closes.iloc[-1]
+    expected = {
+        "last_close": last,
+        "sma_50": closes.iloc[-50:].mean(),
+        "sma_200": closes.iloc[-200:].mean(),
+        "rsi_14": 100 - 100 / (1 + gain / loss),
+        "volatility_20d_pct": closes.pct_change().iloc[-20:].std() * np.sqrt(252) * 100,
+        "max_drawdown_1y_pct": (closes / closes.cummax() - 1).min() * 100,
+        "from_52w_high_pct": (last / closes.max() - 1) * 100,
+        "from_52w_low_pct": (last / closes.min() - 1) * 100
+    }
+    qqq = output["indicators"]["QQQ"]
+    assert {key: qqq[key] for key in expected} == pytest.approx(expected, abs=0.01)
+    assert qqq["as_of"] == closes.index[-1].strftime("%Y-%m-%d")
+
+    spy = output["indicators"]["SPY"]
+    assert spy["sma_50"] is None and spy["sma_200"] is None
+    assert spy["trend"] == "insufficient history"
+    # A steady climb has no losing days
+    assert spy["rsi_14"] == 100 and spy["momentum"] == "overbought"
+    assert spy["from_52w_high_pct"] == 0
+    assert output["missing"] == ["GLD"]
+    assert len(download.calls) == 1
+
+
+def test_products_with_data_joins_catalog_and_caps_size(portfolio_architect, monkeypatch):
+    download = make_download(["SPY", "QQQ", "TLT"], periods=300)
+    monkeypatch.setattr(yf, "download", download)
+    catalog = {"SPY": "S&P 500 ETF", "QQQ": "Nasdaq 100 ETF", "TLT": "Long Treasury ETF", "GLD": "Gold ETF"}
+    monkeypatch.setattr(portfolio_architect, "load_catalog", lambda: catalog)
+
+    output = invoke(portfolio_architect, "get_products_with_data")
+
+    assert len(download.calls) == 1 and sorted(download.calls[0][0]) == sorted(catalog)
+    assert list(output["products"]) == list(catalog)
+    closes = download.closes["QQQ"].round(4)
+    closes = closes[closes.index >= pd.Timestamp(END_DATE) - pd.DateOffset(years=1)]
+    qqq = output["products"]["QQQ"]
+    assert qqq["description"] == "Nasdaq 100 ETF"
+    assert qqq["return_1y_pct"] == pytest.approx((closes.iloc[-1] / closes.iloc[0] - 1) * 100, abs=0.01)
+    assert qqq["volatility_pct"] == pytest.approx(closes.pct_change().std() * np.sqrt(252) * 100, abs=0.01)
+    assert qqq["trend"] == "uptrend"
+    assert output["products"]["GLD"] == {"description": "Gold ETF"}
+    assert output["missing"] == ["GLD"] and output["omitted"] == []
+
+    # The second call only retries the ticker without data and stops adding products at the byte cap
+    monkeypatch.setattr(portfolio_architect, "MAX_PRODUCTS_WITH_DATA_BYTES", 500)
+    capped = invoke(portfolio_architect, "get_products_with_data")
+    assert download.calls[1][0] == ["GLD"]
+    assert 0 < len(capped["products"]) < len(catalog)
+    assert capped["omitted"] == [ticker for ticker in catalog if ticker not in capped["products"]]
+    assert len(json.dumps(capped)) <= 500 + len(json.dumps(capped["omitted"]))
+
+
+def test_products_with_data_over_the_shipped_catalog(portfolio_architect, monkeypatch):
+    monkeypatch.setattr(portfolio_architect, "s3", FakeS3("", fail=True))
+    with open(os.path.join(FILES_DIR, "available_products_en.json"), encoding="utf-8") as f:
+        products = json.load(f)["financial_products"]
+    tickers = [product["ticker"] for product in products]
+    monkeypatch.setattr(yf, "download", make_download(tickers, periods=300))
+
+    output = invoke(portfolio_architect, "get_products_with_data")
+
+    assert "error" not in output and list(output["products"]) == tickers
+    assert output["products"]["QQQ"]["description"]["name"] == "Technology Growth Fund"
+    assert all("return_1y_pct" in product for product in output["products"].values())
+    assert sum(invoke(portfolio_architect, "optimize_allocation")["portfolio_allocation"].values()) == 100
+
+
+def test_simulate_portfolio_is_reproducible(portfolio_architect, monkeypatch):
+    download = make_download(["SPY", "QQQ"])
+    rng = np.random.default_rng(3)
+    download.closes[:] = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.01, download.closes.shape), axis=0))
+    monkeypatch.setattr(yf, "download", download)
+
+    params = {"allocation": '{"SPY": 60, "QQQ": 40}', "amount": "10000", "target_amount": "11000", "n_paths": "25000", "seed": "7"}
+    first = invoke(portfolio_architect, "simulate_portfolio", **params)
+    second = invoke(portfolio_architect, "simulate_portfolio", **params)
+
+    assert first == second
+    assert first["paths"] == 25000
+    percentiles = list(first["percentiles"].values())
+    assert percentiles == sorted(percentiles)
+    assert 0 <= first["probability_of_reaching_target_pct"] <= 100
+
+    # A target below every outcome is always reached
+    certain = invoke(portfolio_architect, "simulate_portfolio", **{**params, "target_amount": "0"})
+    assert certain["probability_of_reaching_target_pct"] == 100
+
+    assert "error" in invoke(portfolio_architect, "simulate_portfolio", **{**params, "allocation": '{"GLD": 100}'})
+    assert "error" in invoke(portfolio_architect, "simulate_portfolio", **{**params, "n_paths": "10000000"})
+
+
+def reference_backtest(closes, weights, frequency):
+    """Day-by-day rebalancing loop the vectorized backtest must agree with"""
+    key = {"monthly": "M", "quarterly": "Q"}.get(frequency)
+    holdings = weights / closes.iloc[0].to_numpy()
+    values = []
+    for i, (day, prices) in enumerate(closes.iterrows()):
+        value = holdings @ prices.to_numpy()
+        if key and i > 0 and day.to_period(key) != closes.index[i - 1].to_period(key):
+            holdings = value * weights / prices.to_numpy()
+        values.append(value)
+    return np.array(values)
+
+
+def test_backtest_matches_rebalancing_loop():
+    from portfolio_analytics import backtest, rebalance_starts
+
+    rng = np.random.default_rng(4)
+    closes = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 3)), axis=0)),
+        index=pd.bdate_range("2023-01-02", periods=300)
+    )
+    weights = np.array([[0.6, 0.3, 0.1], [0.2, 0.2, 0.6]])
+
+    for frequency in ("monthly", "quarterly", "none"):
+        values = backtest(closes.to_numpy(), weights, rebalance_starts(closes.index, frequency))
+        for k in range(len(weights)):
+            assert np.allclose(values[:, k], reference_backtest(closes, weights[k], frequency))
+
+
+def test_backtest_allocation_batches(portfolio_architect, monkeypatch):
+    download = make_download(["SPY", "QQQ", "TLT"])
+    monkeypatch.setattr(yf, "download", download)
+
+    single = invoke(portfolio_architect, "backtest_allocation", allocations='{"SPY": 60, "TLT": 40}', lookback_years="1", max_points="10")
+    result = single["results"][0]
+    assert result["allocation"] == {"SPY": 60.0, "TLT": 40.0}
+    assert len(result["equity_curve"]) <= 10
+    assert list(result["equity_curve"].values())[0] == 100
+
+    grid = np.random.default_rng(0).dirichlet(np.ones(3), size=50)
+    matrix = json.dumps({"tickers": ["SPY", "QQQ", "TLT"], "weights": grid.tolist()})
+    batch = invoke(portfolio_architect, "backtest_allocation", allocations=matrix, lookback_years="1", rebalance="quarterly")
+    assert len(batch["results"]) == 50
+    assert "equity_curve" not in batch["results"][0]
+    # Only QQQ was missing from the price store
+    assert [tickers for tickers, _ in download.calls] == [["SPY", "TLT"], ["QQQ"]]
+
+    assert "error" in invoke(portfolio_architect, "backtest_allocation", allocations='{"SPY": 100}', lookback_years="20")
+
+
+def test_shrinkage_covariance_matches_ledoit_wolf_definition():
+    from portfolio_analytics import shrinkage_covariance
+
+    returns = np.random.default_rng(8).normal(0, 0.01, (120, 6))
+    cov, shrinkage = shrinkage_covariance(returns)
+
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / len(x)
+    target = np.trace(sample) / 6 * np.eye(6)
+    error = sum(((np.outer(row, row) - sample) ** 2).sum() for row in x) / len(x) ** 2
+    expected = min(error / ((sample - target) ** 2).sum(), 1)
+
+    assert shrinkage == pytest.approx(expected)
+    assert np.allclose(cov, expected * target + (1 - expected) * sample)
+
+
+def test_efficient_portfolio_meets_targets_that_need_a_dropped_asset():
+    from portfolio_analytics import efficient_portfolio, min_variance_weights
+
+    # Dropping the most negative weight first leaves only assets that can't earn the target
+    mean_returns = np.array([0.0458, 0.1271, 0.1233])
+    cov = np.array([[0.0853, 0.0942, 0.0336], [0.0942, 0.15, 0.0348], [0.0336, 0.0348, 0.0152]])
+    weights, reachable = efficient_portfolio(mean_returns, cov, target_return=0.1247)
+
+    assert reachable is True
+    assert weights @ mean_returns == pytest.approx(0.1247)
+    assert weights.sum() == pytest.approx(1) and (weights >= 0).all()
+    assert weights == pytest.approx([0, 7 / 19, 12 / 19])
+    # The other long-only mixes earning the target add the first asset, which raises the variance
+    along = np.cross(np.ones(3), mean_returns)
+    along *= np.sign(along[0])
+    assert weights @ cov @ weights < (weights + 0.01 * along) @ cov @ (weights + 0.01 * along)
+    assert min_variance_weights(cov) @ mean_returns < 0.1247
+
+
+def test_efficient_portfolio_reports_targets_below_minimum_variance_as_met():
+    from portfolio_analytics import efficient_portfolio, min_variance_weights
+
+    mean_returns = np.array([0.03, 0.08, 0.12])
+    cov = np.diag([0.01, 0.04, 0.09])
+    weights, reachable = efficient_portfolio(mean_returns, cov, target_return=0.0)
+
+    assert reachable is True
+    assert weights == pytest.approx(min_variance_weights(cov))
+    assert weights @ mean_returns > 0.0
+
+
+def test_integer_percentages_keeps_the_largest_weights_when_all_are_below_min_pct():
+    from portfolio_analytics import integer_percentages
+
+    # 120 positions, all under 1%; the 20 heaviest must survive the cut to 100
+    weights = np.concatenate([np.full(100, 0.0082), np.full(20, 0.009)])
+    labels = [f"T{i:03d}" for i in range(120)]
+
+    allocation = integer_percentages(weights, labels, min_pct=1)
+    assert sum(allocation.values()) == 100 and min(allocation.values()) >= 1
+    assert all(f"T{i:03d}" in allocation for i in range(100, 120))
+
+    spread = integer_percentages(np.full(400, 1 / 400), [f"T{i:03d}" for i in range(400)], min_pct=1)
+    assert sum(spread.values()) == 100 and len(spread) == 100
+
+
+def test_optimize_allocation_hits_target_and_caches(portfolio_architect, monkeypatch):
+    download = make_download(["BND", "SPY", "QQQ", "GLD"])
+    rng = np.random.default_rng(9)
+    drift = np.array([0.0001, 0.0004, 0.0007, 0.0003])
+    vol = np.array([0.003, 0.01, 0.015, 0.008])
+    download.closes[:] = 100 * np.exp(np.cumsum(drift + rng.normal(0, 1, download.closes.shape) * vol, axis=0))
+    monkeypatch.setattr(yf, "download", download)
+    monkeypatch.setattr(portfolio_architect, "load_catalog", lambda: {t: t for t in ["BND", "SPY", "QQQ", "GLD"]})
+
+    model = portfolio_architect.get_return_model(["BND", "GLD", "QQQ", "SPY"], "3y")
+    low, high = model["mean_returns"].min() * 100, model["mean_returns"].max() * 100
+    target = round((low + high) / 2, 2)
+
+    output = invoke(portfolio_architect, "optimize_allocation", target_return=str(target))
+    allocation = output["portfolio_allocation"]
+    assert sum(allocation.values()) == 100 and min(allocation.values()) > 0
+    assert output["target_achievable"] is True
+    assert output["expected_return_pct"] == pytest.approx(target, abs=0.5)
+
+    # Minimum variance leans on the least volatile product; an out-of-reach target clamps to the top asset
+    assert max(invoke(portfolio_architect, "optimize_allocation")["portfolio_allocation"].items(), key=lambda kv: kv[1])[0] == "BND"
+    unreachable = invoke(portfolio_architect, "optimize_allocation", target_return=str(high + 50))
+    assert unreachable["target_achievable"] is False and len(unreachable["portfolio_allocation"]) == 1
+
+    by_volatility = invoke(portfolio_architect, "optimize_allocation", target_volatility="10")
+    assert by_volatility["volatility_pct"] == pytest.approx(10, abs=0.2)
+
+    # Every call above reused the cached covariance model
+    assert len(download.calls) == 1
@@ -0,0 +1,495 @@
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+import yfinance as yf
+from yfinance.data import YfData
+
+from tests.unit.conftest import load_lambda
+
+
+calendar = load_lambda("shared_layer/python", "risk_manager_calendar", "market_calendar.py")
+LAST_SESSION = calendar.last_completed_session(settle=calendar.DATA_SETTLE_DELAY)
+
+
+class FakeTicker:
+    """Stand-in for yf.Ticker whose .info and .news can be slowed down or made to fail"""
+
+    delays = {}
+    failures = set()
+    articles = {}
+
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker
+
+    @property
+    def info(self):
+        time.sleep(self.delays.get(self.ticker, 0))
+        if self.ticker in self.failures:
+            raise ConnectionError(f"{self.ticker} unavailable")
+        return {"regularMarketPreviousClose": 10.0 + len(self.ticker)}
+
+    @property
+    def news(self):
+        time.sleep(self.delays.get(self.ticker, 0))
+        if self.ticker in self.failures:
+            raise ConnectionError(f"{self.ticker} unavailable")
+        return [
+            {"content": {"title": title, "summary": f"About {title}", "pubDate": "2025-06-30T12:00:00Z"}}
+            for title in self.articles.get(self.ticker, [])
+        ]
+
+
+@pytest.fixture(autouse=True)
+def local_snapshot_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("MARKET_SNAPSHOT_DIR", str(tmp_path))
+    return tmp_path
+
+
+class FakeContext:
+    """Lambda context with a fixed amount of time left"""
+
+    def __init__(self, remaining_millis):
+        self.remaining_millis = remaining_millis
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_millis
+
+
+def invoke(module, function, session_id=None, context=None, **parameters):
+    event = {
+        "actionGroup": "RiskManager",
+        "messageVersion": "1.0",
+        "function": function,
+        "parameters": [{"name": name, "value": value} for name, value in parameters.items()]
+    }
+    if session_id:
+        event["sessionId"] = session_id
+    response = module.lambda_handler(event, context)
+    return json.loads(response["response"]["functionResponse"]["responseBody"]["TEXT"]["body"])
+
+
+def test_market_data_returns_successful_indicators(risk_manager, monkeypatch):
+    monkeypatch.setattr(FakeTicker, "delays", {"^VIX": 1.0})
+    monkeypatch.setattr(FakeTicker, "failures", {"CL=F"})
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(risk_manager, "MARKET_DATA_TIMEOUT_SECONDS", 0.2)
+
+    started = time.perf_counter()
+    output = invoke(risk_manager, "get_market_data")
+
+    assert time.perf_counter() - started < 0.8
+    assert output["incomplete"] is True and output["timed_out"] == ["market data for ^VIX"]
+    assert output["failed"] == ["market data for CL=F"]
+    # The markers wrap the indicators instead of sitting among them
+    output = output["result"]
+    assert list(output) == list(risk_manager.MARKET_INDICATORS)
+    assert output["us_10y_treasury_yield"] == {"description": "US 10-Year Treasury Yield (%)", "value": 14.0}
+    assert output["vix_volatility_index"]["value"] is None
+    assert "Timed out" in output["vix_volatility_index"]["error"]
+    assert output["crude_oil_price"]["error"] == "CL=F unavailable"
+
+
+def test_market_data_with_a_failed_indicator_is_not_memoized(risk_manager, monkeypatch):
+    monkeypatch.setattr(FakeTicker, "failures", {"CL=F"})
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+
+    assert invoke(risk_manager, "get_market_data", session_id="s1")["failed"] == ["market data for CL=F"]
+    monkeypatch.setattr(FakeTicker, "failures", set())
+    output = invoke(risk_manager, "get_market_data", session_id="s1")
+    assert "incomplete" not in output and output["crude_oil_price"]["value"] is not None
+
+
+def test_market_data_fails_only_when_every_indicator_fails(risk_manager, monkeypatch):
+    monkeypatch.setattr(FakeTicker, "failures", {info["ticker"] for info in risk_manager.MARKET_INDICATORS.values()})
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+
+    assert "error" in invoke(risk_manager, "get_market_data")
+
+
+def test_market_data_refreshes_an_expired_crumb_once(risk_manager, monkeypatch, capsys):
+    market_data = load_lambda("shared_layer/python", "risk_manager_market_data", "market_data.py")
+    provider = market_data.YFinanceProvider()
+    yahoo = YfData(session=provider.session)
+    monkeypatch.setattr(yahoo, "_crumb", "expired")
+
+    class ExpiredCrumbTicker(FakeTicker):
+        @property
+        def info(self):
+            if yahoo._crumb == "expired":
+                raise RuntimeError("401 Client Error: Unauthorized (Invalid Crumb)")
+            return super().info
+
+    monkeypatch.setattr(yf, "Ticker", ExpiredCrumbTicker)
+    monkeypatch.setattr(risk_manager, "data_provider", provider)
+    output = invoke(risk_manager, "get_market_data")
+
+    assert all(item["value"] is not None for item in output.values())
+    # Every indicator hit the expired crumb concurrently, but the handshake was redone once
+    assert provider.auth_refreshes == 1
+    stats = provider.connection_stats()
+    assert f"Market data connections: {json.dumps(stats)}" in capsys.readouterr().out
+
+
+def test_crumb_refresh_falls_back_to_a_new_session(monkeypatch):
+    market_data = load_lambda("shared_layer/python", "risk_manager_market_data", "market_data.py")
+    provider = market_data.YFinanceProvider()
+    session = provider.session
+
+    # A yfinance release that no longer keeps the crumb where the provider resets it
+    class ChangedYfData:
+        def __init__(self, session=None):
+            self.session = session
+
+    monkeypatch.setattr(market_data, "YfData", ChangedYfData)
+    provider.refresh_auth(provider.auth_generation)
+
+    assert provider.session is not session
+    assert isinstance(provider.session, market_data.PooledSession)
+    assert provider.auth_refreshes == 1
+
+
+def test_pooled_session_counts_connection_reuse():
+    market_data = load_lambda("shared_layer/python", "risk_manager_market_data", "market_data.py")
+
+    class KeepAliveHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        session = market_data.PooledSession()
+        for _ in range(3):
+            assert session.get(f"http://127.0.0.1:{server.server_port}/").text == "ok"
+        assert session.stats == {"requests": 3, "new_connections": 1, "reused_connections": 2}
+    finally:
+        server.shutdown()
+
+
+def test_pooled_session_caps_request_timeout():
+    market_data = load_lambda("shared_layer/python", "risk_manager_market_data", "market_data.py")
+
+    class HungHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(3)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HungHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        session = market_data.PooledSession(timeout=0.5)
+        started = time.perf_counter()
+        # yfinance asks for 30s; the session's cap wins
+        with pytest.raises(Exception):
+            session.get(f"http://127.0.0.1:{server.server_port}/", timeout=30)
+        assert time.perf_counter() - started < 2
+    finally:
+        server.shutdown()
+
+
+def test_risk_context_fetches_concurrently_and_dedupes_news(risk_manager, monkeypatch):
+    monkeypatch.setattr(FakeTicker, "delays", {ticker: 0.2 for ticker in ["SPY", "QQQ", "TLT", "^VIX"]})
+    monkeypatch.setattr(FakeTicker, "failures", {"GLD"})
+    monkeypatch.setattr(FakeTicker, "articles", {
+        "SPY": ["Fed holds rates", "Stocks rally"],
+        "QQQ": ["Fed  holds RATES", "Tech earnings beat"],
+        "TLT": ["Bond yields slide"]
+    })
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+
+    started = time.perf_counter()
+    output = invoke(risk_manager, "get_risk_context", tickers='["SPY", "QQQ", "TLT", "GLD"]')
+
+    # Four 0.2s fetches run side by side rather than back to back
+    assert time.perf_counter() - started < 0.6
+    assert output["market_data"]["vix_volatility_index"]["value"] == 14.0
+    titles = [article["title"] for article in output["news"]]
+    assert titles == ["Fed holds rates", "Bond yields slide", "Stocks rally", "Tech earnings beat"]
+    assert output["news"][0]["tickers"] == ["SPY", "QQQ"]
+    assert output["news_errors"] == {"GLD": "GLD unavailable"}
+    assert output["omitted_articles"] == 0
+
+    monkeypatch.setattr(risk_manager, "MAX_RISK_CONTEXT_NEWS_BYTES", 250)
+    capped = invoke(risk_manager, "get_risk_context", tickers='["SPY", "QQQ", "TLT"]')
+    assert len(json.dumps(capped["news"])) <= 250
+    assert capped["omitted_articles"] == 4 - len(capped["news"]) > 0
+
+
+def test_product_news_cache_and_session_dedupe(risk_manager, monkeypatch):
+    calls = []
+
+    class CountingTicker(FakeTicker):
+        @property
+        def news(self):
+            calls.append(self.ticker)
+            return FakeTicker.news.fget(self)
+
+    monkeypatch.setattr(FakeTicker, "articles", {"SPY": ["Fed holds rates", "Stocks rally"], "QQQ": ["Fed holds rates"]})
+    monkeypatch.setattr(yf, "Ticker", CountingTicker)
+
+    spy = invoke(risk_manager, "get_product_news", session_id="s1", ticker="SPY")
+    assert [article["title"] for article in spy["news"]] == ["Fed holds rates", "Stocks rally"]
+
+    # The shared article is only referenced the second time it is returned in the session
+    qqq = invoke(risk_manager, "get_product_news", session_id="s1", ticker="QQQ")
+    assert qqq["news"] == [{"id": spy["news"][0]["id"], "already_sent_with": "SPY"}]
+    assert invoke(risk_manager, "get_product_news", session_id="s2", ticker="QQQ")["news"][0]["title"] == "Fed holds rates"
+    assert calls == ["SPY", "QQQ"]
+
+    # A stale entry is refetched only when the caller asks for fresher data than it holds
+    monkeypatch.setattr(risk_manager.news_cache, "ttl_seconds", 0)
+    invoke(risk_manager, "get_product_news", ticker="SPY", max_age="3600")
+    assert calls == ["SPY", "QQQ"]
+    invoke(risk_manager, "get_product_news", ticker="SPY")
+    assert calls == ["SPY", "QQQ", "SPY"]
+
+    context = invoke(risk_manager, "get_risk_context", session_id="s1", tickers='["SPY", "QQQ"]', max_age="3600")
+    assert [article.get("already_sent_with") for article in context["news"]] == ["SPY", "SPY"]
+    assert context["news"][0]["tickers"] == ["SPY", "QQQ"]
+    assert calls == ["SPY", "QQQ", "SPY"]
+
+
+def test_oversized_news_drops_summaries_before_paginating(risk_manager, monkeypatch):
+    monkeypatch.setattr(FakeTicker, "articles", {"SPY": [f"Headline {i} " + "x" * 80 for i in range(5)]})
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(risk_manager.response_budget, "max_bytes", 700)
+
+    output = invoke(risk_manager, "get_product_news", ticker="SPY")
+    assert len(json.dumps(output, ensure_ascii=False).encode("utf-8")) <= 700
+    assert output["truncation"]["dropped_fields"] == ["summary"]
+    assert all("summary" not in article for article in output["result"]["news"])
+
+    # Without summaries the articles still don't fit, so the next page starts where the first one ended
+    following = invoke(risk_manager, "get_product_news", ticker="SPY", continuation_token=output["continuation_token"])
+    assert following["truncation"]["page"]["offset"] == output["truncation"]["page"]["count"]
+    assert following["result"]["news"][0]["title"].startswith(f"Headline {output['truncation']['page']['count']}")
+
+
+def test_news_pages_in_a_session_deliver_every_article_once(risk_manager, monkeypatch):
+    titles = [f"Headline {i} " + "x" * 80 for i in range(5)]
+    monkeypatch.setattr(FakeTicker, "articles", {"SPY": titles})
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(risk_manager.response_budget, "max_bytes", 500)
+
+    pages = [invoke(risk_manager, "get_product_news", session_id="s1", ticker="SPY")]
+    while "continuation_token" in pages[-1]:
+        pages.append(invoke(risk_manager, "get_product_news", session_id="s1", ticker="SPY", continuation_token=pages[-1]["continuation_token"]))
+
+    # Only the articles a page actually returned count as sent, so later pages carry the rest in full
+    assert len(pages) > 1
+    delivered = [article["title"] for page in pages for article in page["result"]["news"]]
+    assert delivered == titles
+
+    again = invoke(risk_manager, "get_product_news", session_id="s1", ticker="SPY")
+    assert all(article.get("already_sent_with") == "SPY" for article in again.get("result", again)["news"])
+
+
+def test_market_snapshot_refresh_and_fallback(risk_manager, monkeypatch, local_snapshot_store):
+    calls = []
+
+    class CountingTicker(FakeTicker):
+        @property
+        def info(self):
+            calls.append(self.ticker)
+            return FakeTicker.info.fget(self)
+
+    monkeypatch.setattr(FakeTicker, "articles", {"SPY": ["Fed holds rates"]})
+    monkeypatch.setattr(yf, "Ticker", CountingTicker)
+    monkeypatch.setattr(risk_manager, "HOT_TICKERS", ["SPY", "QQQ"])
+
+    risk_manager.refresh_handler({}, None)
+    snapshot = json.loads((local_snapshot_store / "market_snapshot" / "latest.json").read_text())
+    assert snapshot["news"]["SPY"][0]["title"] == "Fed holds rates"
+    assert len(calls) == len(risk_manager.MARKET_INDICATORS)
+
+    # A fresh snapshot serves the tools without touching Yahoo
+    live = invoke(risk_manager, "get_market_data")
+    assert live == snapshot["market_data"]
+    assert invoke(risk_manager, "get_product_news", ticker="SPY")["news"][0]["title"] == "Fed holds rates"
+    context = invoke(risk_manager, "get_risk_context", tickers='["SPY"]')
+    assert context["market_data"] == snapshot["market_data"]
+    assert len(calls) == len(risk_manager.MARKET_INDICATORS)
+
+    # Once the snapshot is older than the threshold the indicators are fetched live again
+    monkeypatch.setattr(risk_manager, "MARKET_SNAPSHOT_MAX_AGE_SECONDS", -1)
+    assert invoke(risk_manager, "get_market_data") == snapshot["market_data"]
+    assert len(calls) == 2 * len(risk_manager.MARKET_INDICATORS)
+
+
+def test_s3_snapshot_store_uses_short_timeouts(risk_manager, monkeypatch):
+    from market_snapshot import SnapshotStore
+
+    monkeypatch.delenv("MARKET_SNAPSHOT_DIR")
+    config = SnapshotStore.from_environment().s3.meta.config
+    assert (config.connect_timeout, config.read_timeout) == (2, 2)
+    assert config.retries["total_max_attempts"] == 2  # one retry at most
+
+    monkeypatch.setenv("MARKET_SNAPSHOT_S3_TIMEOUT_SECONDS", "10")
+    assert SnapshotStore.from_environment().s3.meta.config.read_timeout == 10
+
+
+def test_snapshot_news_respects_max_age(risk_manager, monkeypatch):
+    monkeypatch.setattr(FakeTicker, "articles", {"SPY": ["Fed holds rates"]})
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(risk_manager, "HOT_TICKERS", ["SPY"])
+    risk_manager.refresh_handler({}, None)
+    monkeypatch.setattr(FakeTicker, "articles", {"SPY": ["Live headline"]})
+
+    def titles(**params):
+        return [article["title"] for article in invoke(risk_manager, "get_product_news", ticker="SPY", **params)["news"]]
+
+    # max_age=0 goes to Yahoo even though a fresh snapshot holds the ticker
+    assert titles(max_age=0) == ["Live headline"]
+
+    # A snapshot older than max_age is not used, and one that is keeps its age in the cache
+    risk_manager.news_cache.entries.clear()
+    monkeypatch.setattr(risk_manager, "snapshot_age_seconds", lambda snapshot: 200)
+    assert titles(max_age=100) == ["Live headline"]
+    risk_manager.news_cache.entries.clear()
+    assert titles() == ["Fed holds rates"]
+    assert titles(max_age=250) == ["Fed holds rates"]
+    assert titles(max_age=150) == ["Live headline"]
+
+
+def make_history():
+    """Daily closes since 2008: TLT moves -5% per point of 10Y yield, NEW only trades from 2015"""
+    rng = np.random.default_rng(11)
+    index = pd.bdate_range("2008-01-01", LAST_SESSION)
+    n = len(index)
+    tnx_change = rng.normal(0, 0.05, n)
+    closes = pd.DataFrame({
+        "^TNX": 3 + np.cumsum(tnx_change),
+        "^VIX": 20 + np.abs(np.cumsum(rng.normal(0, 0.5, n))) % 30,
+        "CL=F": 70 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+        "SPY": 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, n))),
+        "TLT": 100 * np.cumprod(1 - 0.05 * tnx_change + rng.normal(0, 0.0005, n)),
+        "NEW": 50 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    }, index=index)
+    closes.loc[:"2014-12-31", "NEW"] = np.nan
+    return closes
+
+
+def patch_history(module, monkeypatch, closes):
+    """Serve closes through a fake yf.download and start from an empty warm cache; returns the call log"""
+    calls = []
+
+    def download(tickers, start=None, end=None, **kwargs):
+        calls.append(list(tickers))
+        return pd.concat({"Close": closes[[t for t in tickers if t in closes]]}, axis=1)
+
+    monkeypatch.setattr(yf, "download", download)
+    monkeypatch.setattr(module, "price_history", {})
+    return calls
+
+
+def test_handlers_return_partial_results_before_the_deadline(risk_manager, monkeypatch):
+    monkeypatch.setattr(FakeTicker, "delays", {"SPY": 2.0})
+    monkeypatch.setattr(FakeTicker, "articles", {"SPY": ["Stocks rally"], "QQQ": ["Tech earnings beat"]})
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+    # 2.3s left minus the 2s reserve leaves every fetch 0.3s
+    context = FakeContext(2300)
+
+    started = time.perf_counter()
+    output = invoke(risk_manager, "get_risk_context", context=context, tickers='["SPY", "QQQ"]')
+    assert time.perf_counter() - started < 1.0
+    assert [article["title"] for article in output["result"]["news"]] == ["Tech earnings beat"]
+    assert output["incomplete"] is True and output["timed_out"] == ["news for SPY"]
+
+    assert invoke(risk_manager, "get_product_news", context=context, ticker="SPY") == {
+        "result": {"ticker": "SPY", "news": []}, "incomplete": True, "timed_out": ["news for SPY"]
+    }
+
+    patch_history(risk_manager, monkeypatch, make_history())
+    fast_download = yf.download
+    monkeypatch.setattr(yf, "download", lambda *args, **kwargs: time.sleep(2.0) or fast_download(*args, **kwargs))
+    allocation = '{"SPY": 60, "TLT": 40}'
+    started = time.perf_counter()
+    output = invoke(risk_manager, "stress_test_portfolio", session_id="s1", context=context, allocation=allocation)
+    assert time.perf_counter() - started < 1.0
+    assert output["incomplete"] is True and "error" in output
+
+    # Partial outputs are not memoized, so the next call in the session fetches again
+    monkeypatch.setattr(yf, "download", fast_download)
+    output = invoke(risk_manager, "stress_test_portfolio", session_id="s1", context=context, allocation=allocation)
+    assert "incomplete" not in output and "scenarios" in output
+
+
+def test_stress_test_portfolio(risk_manager, monkeypatch):
+    closes = make_history()
+    calls = patch_history(risk_manager, monkeypatch, closes)
+
+    output = invoke(risk_manager, "stress_test_portfolio", allocation='{"SPY": 50, "TLT": 30, "NEW": 20}', amount="10000")
+    scenarios = output["scenarios"]
+
+    assert len(calls) == 1
+    assert output["allocation_pct"] == {"SPY": 50.0, "TLT": 30.0, "NEW": 20.0}
+
+    covid = scenarios["covid_crash_2020"]
+    window = closes.loc["2020-02-19":"2020-03-23", ["SPY", "TLT", "NEW"]]
+    expected = (window.iloc[-1] / window.iloc[0] - 1) @ np.array([0.5, 0.3, 0.2])
+    assert covid["pnl_pct"] == pytest.approx(expected * 100, abs=0.01)
+    assert covid["pnl_amount"] == pytest.approx(expected * 10000, abs=1)
+    assert covid["max_drawdown_pct"] <= min(covid["pnl_pct"], 0)
+
+    # NEW did not trade in 2008, so that scenario re-weights over the other holdings
+    gfc = scenarios["global_financial_crisis_2008"]
+    assert gfc["coverage_pct"] == 80.0
+    assert set(gfc["contributions_pct"]) == {"SPY", "TLT"}
+
+    # TLT loses ~5% per 100bp and carries 30% of the portfolio
+    assert scenarios["rate_spike"]["contributions_pct"]["TLT"] == pytest.approx(-1.5, abs=0.2)
+
+    # A second call in the same warm container reuses the downloaded history
+    invoke(risk_manager, "stress_test_portfolio", allocation='{"SPY": 100}')
+    assert len(calls) == 1
+
+    assert "error" in invoke(risk_manager, "stress_test_portfolio", allocation='{"XYZ": 100}')
+
+
+def test_close_history_missing_the_last_session_is_fetched_again(risk_manager, monkeypatch):
+    calls = patch_history(risk_manager, monkeypatch, make_history().iloc[:-1])
+
+    invoke(risk_manager, "stress_test_portfolio", allocation='{"SPY": 100}')
+    invoke(risk_manager, "stress_test_portfolio", allocation='{"SPY": 100}')
+    assert len(calls) == 2
+
+
+def test_risk_metrics_historical_simulation(risk_manager, monkeypatch):
+    closes = make_history()
+    patch_history(risk_manager, monkeypatch, closes)
+
+    output = invoke(risk_manager, "get_risk_metrics", allocation='{"SPY": 60, "TLT": 40}', confidence_levels="[95, 99, 97.5]", lookback_years="3", amount="100000")
+
+    start = pd.Timestamp(date.today()) - pd.DateOffset(years=3)
+    returns = closes.loc[start:, ["SPY", "TLT"]].pct_change().dropna() @ np.array([0.6, 0.4])
+    losses = -returns.to_numpy()
+    var_99 = np.quantile(losses, 0.99)
+
+    metrics = output["metrics"]
+    assert list(metrics) == ["95%", "97.5%", "99%"]
+    assert metrics["99%"]["var_1d_pct"] == pytest.approx(var_99 * 100, abs=0.01)
+    assert metrics["99%"]["es_1d_pct"] == pytest.approx(losses[losses >= var_99].mean() * 100, abs=0.01)
+    assert metrics["99%"]["var_1d_amount"] == pytest.approx(var_99 * 100000, abs=1)
+
+    ten_day = -(np.exp(np.log1p(returns).rolling(10).sum().dropna()) - 1).to_numpy()
+    assert metrics["95%"]["var_10d_pct"] == pytest.approx(np.quantile(ten_day, 0.95) * 100, abs=0.01)
+    for level in metrics.values():
+        assert level["es_1d_pct"] >= level["var_1d_pct"] and level["es_10d_pct"] >= level["var_10d_pct"]
+
+    assert "error" in invoke(risk_manager, "get_risk_metrics", allocation='{"SPY": 100}', confidence_levels="[0.2]")
@@ -0,0 +1,32 @@
+import filecmp
+import os
+
+from tests.unit.conftest import FILES_DIR, SHARED_LAYER_DIR
+
+STREAMLIT_DIR = os.path.abspath(os.path.join(FILES_DIR, "..", "..", "streamlit", "en"))
+LAMBDA_DIRS = ["lambda_portfolio_architect", "lambda_risk_manager"]
+
+
+def shared_modules():
+    return sorted(name for name in os.listdir(SHARED_LAYER_DIR) if name.endswith(".py"))
+
+
+def test_lambdas_do_not_shadow_the_shared_layer():
+    # A copy next to lambda_function.py would be imported instead of the layer's and drift from it
+    for directory in LAMBDA_DIRS:
+        copies = set(os.listdir(os.path.join(FILES_DIR, directory))) & set(shared_modules())
+        assert not copies, f"{directory} has its own copy of {sorted(copies)}"
+
+
+def test_streamlit_copies_match_the_shared_layer():
+    # The Streamlit apps deploy on their own, so they carry copies; those must stay byte-identical
+    checked = 0
+    for app in sorted(os.listdir(STREAMLIT_DIR)):
+        for name in shared_modules():
+            copy = os.path.join(STREAMLIT_DIR, app, name)
+            if os.path.exists(copy):
+                assert filecmp.cmp(copy, os.path.join(SHARED_LAYER_DIR, name), shallow=False), (
+                    f"streamlit/en/{app}/{name} differs from files/shared_layer/python/{name}"
+                )
+                checked += 1
+    assert checked
@@ -3,12 +3,13 @@ import json
 import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import timedelta
 import pandas as pd
 import itertools
 import re
 import os
+from market_calendar import DATA_SETTLE_DELAY, last_completed_session
+from market_data import provider_from_environment
 
 
 # Config
@@ -51,16 +52,27 @@ def display_financial_analysis(place_holder, input_content):
         st.info(data["return_rate_reason"])
 
 
-def get_product_chart_data(ticker):
-    end_date = datetime.today().date()
+@st.cache_resource
+def get_data_provider():
+    """One provider per server process, so its HTTP session is shared across reruns"""
+    return provider_from_environment()
+
+
+@st.cache_data(max_entries=256)
+def load_product_chart_data(ticker, last_session):
+    """Price history up to last_session; the session is part of the cache key, so entries expire at the next market close"""
+    end_date = last_session + timedelta(days=1)
     start_date = end_date - timedelta(days=100)
 
-    etf = yf.Ticker(ticker)
-    hist = etf.history(start=start_date, end=end_date)
+    hist = get_data_provider().history(ticker, start_date, end_date)
 
     return hist
 
 
+def get_product_chart_data(ticker):
+    return load_product_chart_data(ticker, last_completed_session(settle=DATA_SETTLE_DELAY))
+
+
 def display_portfolio_suggestion(place_holder, input_content):
     """Display portfolio suggestion results function"""
     data = json.loads(input_content, strict=False)
@@ -107,8 +119,7 @@ def get_market_data():
 
     data = {}
     for key, info in market_info.items():
-        ticker = yf.Ticker(info["ticker"])
-        market_price = ticker.info.get('regularMarketPreviousClose', 0)
+        market_price = get_data_provider().quote(info["ticker"]).get('regularMarketPreviousClose', 0)
 
         data[key] = {
             "description": info["description"],
@@ -119,8 +130,7 @@ def get_market_data():
 
 
 def get_product_news(ticker, top_n=5):
-    stock = yf.Ticker(ticker)
-    news = stock.news[:top_n]
+    news = get_data_provider().news(ticker)[:top_n]
 
     formatted_news = []
     for item in news:
@@ -0,0 +1,115 @@
+"""US equity market (NYSE) trading calendar used to expire cached price data.
+
+Daily closes only change when a trading session closes, so cached price-derived
+data is keyed by the last completed session: it stays valid across weekends and
+holidays and expires exactly at the next close. Yahoo publishes a session's
+final close some time after the bell, so callers that fetch data for the session
+pass `settle=DATA_SETTLE_DELAY` and only count it as completed once that has passed.
+"""
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+
+EXCHANGE_TIMEZONE = ZoneInfo('America/New_York')
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+DATA_SETTLE_DELAY = timedelta(minutes=45)
+
+
+def _nth_weekday(year, month, weekday, n):
+    # n-th given weekday (Mon=0) of the month; n=-1 is the last one
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    j, k = c // 4, c % 4
+    m = (a + 11 * h) // 319
+    r = (2 * e + 2 * j - k - h + m + 32) % 7
+    n = (h - m + r + 90) // 25
+    p = (h - m + r + n + 19) % 32
+    return date(year, n, p)
+
+
+def _observed(day):
+    # Saturday holidays are observed on Friday, Sunday holidays on Monday
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def market_holidays(year):
+    """Full-day NYSE closures of a year (regular holiday rules, no one-off closures)"""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),                 # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),                 # Washington's Birthday
+        _easter(year) - timedelta(days=2),           # Good Friday
+        _nth_weekday(year, 5, 0, -1),                # Memorial Day
+        _observed(date(year, 7, 4)),                 # Independence Day
+        _nth_weekday(year, 9, 0, 1),                 # Labor Day
+        _nth_weekday(year, 11, 3, 4),                # Thanksgiving
+        _observed(date(year, 12, 25)),               # Christmas
+    }
+    # New Year's Day on a Saturday is not observed on the Friday before (that Friday ends the prior year)
+    if date(year, 1, 1).weekday() != 5:
+        holidays.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))   # Juneteenth
+    return frozenset(holidays)
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in market_holidays(day.year)
+
+
+def close_time(day):
+    """Exchange-local close of a trading day; 1pm on the early-close days around July 4th, Thanksgiving and Christmas"""
+    early = (
+        day == _nth_weekday(day.year, 11, 3, 4) + timedelta(days=1)
+        or (day.month, day.day) == (12, 24)
+        or ((day.month, day.day) == (7, 3) and date(day.year, 7, 4).weekday() < 5)
+    )
+    return datetime.combine(day, EARLY_CLOSE if early else REGULAR_CLOSE, tzinfo=EXCHANGE_TIMEZONE)
+
+
+def _now(now):
+    return (now or datetime.now(EXCHANGE_TIMEZONE)).astimezone(EXCHANGE_TIMEZONE)
+
+
+def last_completed_session(now=None, settle=timedelta(0)):
+    """Most recent trading day whose close, plus `settle`, has already passed"""
+    now = _now(now)
+    day = now.date()
+    while not is_trading_day(day) or close_time(day) + settle > now:
+        day -= timedelta(days=1)
+    return day
+
+
+def next_close(now=None, settle=timedelta(0)):
+    """First close (plus `settle`) strictly after now: the moment data keyed by last_completed_session() expires"""
+    now = _now(now)
+    day = now.date()
+    while not is_trading_day(day) or close_time(day) + settle <= now:
+        day += timedelta(days=1)
+    return close_time(day) + settle
+
+
+def trading_days_between(start, end):
+    """Number of trading sessions in [start, end)"""
+    count, day = 0, start
+    while day < end:
+        count += is_trading_day(day)
+        day += timedelta(days=1)
+    return count
@@ -4,6 +4,7 @@ import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
+import itertools
 import os
 import uuid
 
@@ -13,13 +14,20 @@ PORTFOLIO_ARCHITECT_AGENT_ALIAS_ID = ""
 
 
 # Functions
+def load_tool_output(text):
+    """Parse a tool response; responses over the size budget, or cut short by the Lambda deadline, are wrapped in "result" """
+    data = json.loads(text)
+    if isinstance(data, dict) and ("truncation" in data or data.get("incomplete")) and "result" in data:
+        data = data["result"]
+    return data
+
 def display_available_products(trace_container, trace):
     """Display available investment products in table format"""
     products_text = trace.get('observation', {}).get('actionGroupInvocationOutput', {}).get('text')
-    products = json.loads(products_text)
+    products = load_tool_output(products_text)
     
     df = pd.DataFrame(
-        [[ticker, str(desc)] for ticker, desc in products.items()],
+        [[product.get('ticker') or product.get('name'), str(product.get('description', ''))] for product in products.get('products', [])],
         columns=['Ticker', 'Description']
     )
     
@@ -34,12 +42,53 @@ def display_available_products(trace_container, trace):
         }
     )
 
+def display_products_with_data(trace_container, trace):
+    """Display available investment products with their summary statistics in table format"""
+    data_text = trace.get('observation', {}).get('actionGroupInvocationOutput', {}).get('text')
+    data = load_tool_output(data_text)
+
+    products = data.get("products", {})
+    df = pd.DataFrame.from_dict(
+        {ticker: {**product, "description": str(product.get("description", ""))} for ticker, product in products.items()},
+        orient='index'
+    )
+    df.index.name = 'Ticker'
+
+    trace_container.markdown("**Available Investment Products**")
+    trace_container.dataframe(df, use_container_width=True)
+    if data.get("omitted"):
+        trace_container.caption(f"Omitted for size: {', '.join(data['omitted'])}")
+
+def decode_price_series(prices):
+    """Decode a compact/delta price series from get_product_data into {date: price}"""
+    if not isinstance(prices, dict) or ("closes" not in prices and "deltas" not in prices):
+        return prices
+
+    if "closes" in prices:
+        closes = prices["closes"]
+    else:
+        closes = [cents / 100 for cents in itertools.accumulate(prices["deltas"])]
+
+    if "gaps" in prices:
+        days = pd.Timestamp(prices["start"]) + pd.to_timedelta(list(itertools.accumulate([0] + prices["gaps"])), unit="D")
+        return {day.strftime('%Y-%m-%d'): round(close, 2) for day, close in zip(days, closes)}
+
+    periods = len(closes) + len(prices["skip"])
+    if prices["calendar"] == "weekdays":
+        days = pd.bdate_range(prices["start"], periods=periods)
+    else:
+        days = pd.date_range(prices["start"], periods=periods)
+    days = days.delete(prices["skip"])
+
+    return {day.strftime('%Y-%m-%d'): round(close, 2) for day, close in zip(days, closes)}
+
 def display_product_data(trace_container, trace):
     """Display price history charts for investment products"""
     data_text = trace.get('observation', {}).get('actionGroupInvocationOutput', {}).get('text')
-    data = json.loads(data_text)
+    data = load_tool_output(data_text)
     
     for ticker, prices in data.items():
+        prices = decode_price_series(prices)
         if isinstance(prices, dict) and prices:
             df = pd.DataFrame.from_dict(prices, orient='index', columns=['Price'])
             df.index = pd.to_datetime(df.index)
@@ -70,6 +119,22 @@ def display_product_data(trace_container, trace):
         
         trace_container.plotly_chart(fig, use_container_width=True)
 
+def display_product_indicators(trace_container, trace):
+    """Display the latest technical indicators of investment products in table format"""
+    data_text = trace.get('observation', {}).get('actionGroupInvocationOutput', {}).get('text')
+    data = load_tool_output(data_text)
+
+    indicators = data.get("indicators", {})
+    if not indicators:
+        trace_container.write("No indicator data available")
+        return
+
+    df = pd.DataFrame.from_dict(indicators, orient='index')
+    df.index.name = 'Ticker'
+
+    trace_container.markdown("**Technical Indicators**")
+    trace_container.dataframe(df, use_container_width=True)
+
 def create_pie_chart(data, chart_title=""):
     """Create a pie chart for portfolio allocation"""
     if isinstance(data, str):
@@ -167,8 +232,12 @@ if submitted and financial_analysis:
                     elif function_name != "":
                         if function_name == "get_available_products":
                             display_available_products(placeholder, trace)
-                        elif function_name == "get_product_data":
+                        elif function_name == "get_products_with_data":
+                            display_products_with_data(placeholder, trace)
+                        elif function_name in ("get_product_data", "get_product_data_batch"):
                             display_product_data(placeholder, trace)
+                        elif function_name == "get_product_indicators":
+                            display_product_indicators(placeholder, trace)
                         
                         function_name = ""
                     
@@ -13,10 +13,17 @@ RISK_MANAGER_AGENT_ID = ""
 RISK_MANAGER_AGENT_ALIAS_ID = ""
 
 # Functions
+def load_tool_output(text):
+    """Parse a tool response; responses over the size budget, or cut short by the Lambda deadline, are wrapped in "result" """
+    data = json.loads(text)
+    if isinstance(data, dict) and ("truncation" in data or data.get("incomplete")) and "result" in data:
+        data = data["result"]
+    return data
+
 def display_market_data(trace_container, trace):
     """Display market data"""
     data_text = trace.get('observation', {}).get('actionGroupInvocationOutput', {}).get('text')
-    market_data = json.loads(data_text)
+    market_data = load_tool_output(data_text)
     
     trace_container.markdown("**Key Market Indicators**")
     for i in range(0, len(market_data), 3):
@@ -28,17 +35,43 @@ def display_market_data(trace_container, trace):
 def display_product_news(trace_container, trace):
     """Display news for investment products"""
     news_text = trace.get('observation', {}).get('actionGroupInvocationOutput', {}).get('text')
-    news_data = json.loads(news_text)
+    news_data = load_tool_output(news_text)
     
     ticker = news_data["ticker"]
     trace_container.markdown(f"**Recent News for {ticker}**")
-    news_df = pd.DataFrame(news_data["news"])
+    # Articles already shown for another product only carry a reference
+    news = [article for article in news_data["news"] if "already_sent_with" not in article]
+    news_df = pd.DataFrame(news, columns=['publish_date', 'title', 'summary'])
     trace_container.dataframe(
         news_df[['publish_date', 'title', 'summary']],
         hide_index=True,
         use_container_width=True
     )
 
+def display_risk_context(trace_container, trace):
+    """Display market data and the combined news of every portfolio product"""
+    context_text = trace.get('observation', {}).get('actionGroupInvocationOutput', {}).get('text')
+    context = load_tool_output(context_text)
+
+    market_data = context.get("market_data", {})
+    trace_container.markdown("**Key Market Indicators**")
+    for i in range(0, len(market_data), 3):
+        cols = trace_container.columns(3)
+        for j, (key, info) in enumerate(itertools.islice(market_data.items(), i, i + 3)):
+            with cols[j]:
+                st.metric(info['description'], f"{info['value']}")
+
+    if context.get("news"):
+        trace_container.markdown("**Recent News**")
+        news = [article for article in context["news"] if "already_sent_with" not in article]
+        news_df = pd.DataFrame(news, columns=['publish_date', 'tickers', 'title', 'summary'])
+        news_df['tickers'] = news_df['tickers'].apply(", ".join)
+        trace_container.dataframe(
+            news_df[['publish_date', 'tickers', 'title', 'summary']],
+            hide_index=True,
+            use_container_width=True
+        )
+
 def create_pie_chart(data, chart_title=""):
     """Create a pie chart for portfolio allocation"""
     fig = go.Figure(data=[go.Pie(
@@ -133,6 +166,8 @@ if submitted and portfolio_design:
                             display_market_data(placeholder, trace)
                         elif function_name == "get_product_news":
                             display_product_news(placeholder, trace)
+                        elif function_name == "get_risk_context":
+                            display_risk_context(placeholder, trace)
 
                         function_name = ""
                     